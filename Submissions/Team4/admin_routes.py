@@ -1,10 +1,13 @@
 # admin_routes.py
 
-from flask import Blueprint, request, jsonify, render_template
-import psycopg2
+from flask import Blueprint, Response, request, jsonify, render_template, session
+from database import db_connection, db_cursor, get_pool_stats
 from web3 import Web3
 from decimal import Decimal
+from datetime import date, datetime, timedelta
 import os
+import csv
+import io
 from dotenv import load_dotenv
 import json
 import logging
@@ -23,7 +26,17 @@ admin_bp = Blueprint("admin", __name__)
 CONTRACT_ADDRESS = os.getenv("CONTRACT_ADDRESS")
 ADMIN_WALLET = os.getenv("ADMIN_WALLET")
 AMOY_RPC_URL = os.getenv("POLYGON_RPC_URL")
-DB_URL = os.getenv("DATABASE_URL")
+
+# Admin dashboard policy list page sizes
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+# Policy export: columns written, and rows fetched from the server-side cursor per round trip
+EXPORT_COLUMNS = [
+    "id", "wallet_address", "flight_id", "departure_date", "premium", "premium_wei", "payout_wei",
+    "status", "transaction_id", "blockchain_policy_id", "created_at"
+]
+EXPORT_ITERSIZE = 2000
 
 logger.info(f"Starting with CONTRACT_ADDRESS: {CONTRACT_ADDRESS}")
 logger.info(f"AMOY_RPC_URL: {AMOY_RPC_URL}")
@@ -32,13 +45,6 @@ logger.info(f"AMOY_RPC_URL: {AMOY_RPC_URL}")
 w3 = Web3(Web3.HTTPProvider(AMOY_RPC_URL))
 logger.info(f"Web3 connected to node: {w3.is_connected()}")
 
-# Database connection
-def get_db_connection():
-    """Create and return a database connection"""
-    conn = psycopg2.connect(DB_URL)
-    conn.autocommit = True
-    return conn
-
 @admin_bp.route('/admindashboard')
 def admin_dashboard():
     """Render admin dashboard"""
@@ -46,32 +52,47 @@ def admin_dashboard():
 
 @admin_bp.route('/admin_stats')
 def admin_stats():
-    """Get admin dashboard statistics"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get total policies
-    cursor.execute("SELECT COUNT(*) FROM policies")
-    total_policies = cursor.fetchone()[0]
+    """
+    Get admin dashboard statistics and one page of policies, newest departure first.
     
-    # Get pending claims (policies with delay status)
-    cursor.execute("SELECT COUNT(*) FROM policies WHERE status = 'DELAYED'")
-    pending_claims = cursor.fetchone()[0]
-    
-    # Get total premium
-    cursor.execute("SELECT SUM(CAST(REPLACE(premium, 'MATIC', '') AS DECIMAL)) FROM policies")
-    total_premium_result = cursor.fetchone()[0]
-    total_premium = total_premium_result if total_premium_result else 0
+    Totals come from the policy_stats counters, so the cost does not grow with history.
+    Pass the returned next_cursor as ?after= to get the following page.
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        after = request.args.get('after')
+        if after:
+            after_date, after_id = after.rsplit('_', 1)
+            after = (datetime.fromisoformat(after_date), int(after_id))
+    except ValueError:
+        return jsonify({"status": "error", "error": "Invalid limit or after cursor"}), 400
     
-    # Get all policies
-    cursor.execute("""
-        SELECT id, flight_id, departure_date, premium, status, transaction_id
-        FROM policies
-        ORDER BY departure_date DESC
-    """)
+    with db_cursor(autocommit=True) as cursor:
+        cursor.execute("SELECT status, policy_count, premium_wei, payout_wei FROM policy_stats")
+        status_counts = {}
+        total_premium_wei = 0
+        total_payout_wei = 0
+        for status, policy_count, premium_wei, payout_wei in cursor.fetchall():
+            status_counts[status] = policy_count
+            total_premium_wei += premium_wei
+            total_payout_wei += payout_wei
+        
+        # Keyset pagination: seek past the last row of the previous page instead of using OFFSET
+        query = """
+            SELECT id, flight_id, departure_date, premium, status, transaction_id, payout_wei
+            FROM policies
+            {where}
+            ORDER BY departure_date DESC, id DESC
+            LIMIT %s
+        """
+        if after:
+            cursor.execute(query.format(where="WHERE (departure_date, id) < (%s, %s)"), (*after, limit))
+        else:
+            cursor.execute(query.format(where=""), (limit,))
+        rows = cursor.fetchall()
     
     policies = []
-    for row in cursor.fetchall():
+    for row in rows:
         # Format date for display
         departure_date = row[2].strftime("%d %b %Y") if row[2] else "N/A"
         
@@ -81,19 +102,112 @@ def admin_stats():
             "departure_date": departure_date,
             "premium": row[3],
             "status": row[4],
-            "transaction_id": row[5]
+            "transaction_id": row[5],
+            "payout": f"{w3.from_wei(int(row[6]), 'ether')} MATIC" if row[6] is not None else None
         })
     
-    cursor.close()
-    conn.close()
+    next_cursor = f"{rows[-1][2].isoformat()}_{rows[-1][0]}" if len(rows) == limit else None
     
     return jsonify({
-        "total_policies": total_policies,
-        "pending_claims": pending_claims,
-        "total_premium": float(Decimal(total_premium).quantize(Decimal("0.0001"))),
-        "policies": policies
+        "total_policies": sum(status_counts.values()),
+        "pending_claims": status_counts.get('DELAYED', 0),
+        "status_counts": status_counts,
+        "total_premium": float(Decimal(w3.from_wei(int(total_premium_wei), 'ether')).quantize(Decimal("0.0001"))),
+        "total_payout": float(Decimal(w3.from_wei(int(total_payout_wei), 'ether')).quantize(Decimal("0.0001"))),
+        "policies": policies,
+        "next_cursor": next_cursor
     })
 
+@admin_bp.route('/admin/policies/export')
+def export_policies():
+    """
+    Stream policies as CSV, or NDJSON with ?format=ndjson, newest departure first.
+    Optional filters: ?from=YYYY-MM-DD&to=YYYY-MM-DD (departure dates, inclusive) and ?status=
+    (repeatable or comma-separated).
+    """
+    if "admin_logged_in" not in session:
+        return jsonify({"status": "error", "error": "Unauthorized"}), 401
+    
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({"status": "error", "error": "format must be csv or ndjson"}), 400
+    
+    conditions = []
+    params = []
+    try:
+        if request.args.get('from'):
+            conditions.append("departure_date >= %s")
+            params.append(date.fromisoformat(request.args['from']))
+        if request.args.get('to'):
+            conditions.append("departure_date < %s")
+            params.append(date.fromisoformat(request.args['to']) + timedelta(days=1))
+    except ValueError:
+        return jsonify({"status": "error", "error": "from and to must be dates (YYYY-MM-DD)"}), 400
+    
+    statuses = [status for value in request.args.getlist('status') for status in value.split(',') if status]
+    if statuses:
+        conditions.append("status = ANY(%s)")
+        params.append(statuses)
+    
+    query = f"""
+        SELECT {', '.join(EXPORT_COLUMNS)}
+        FROM policies
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+        ORDER BY departure_date DESC, id DESC
+    """
+    
+    chunks = _export_chunks(query, params, export_format)
+    # Start the query before responding, so a database error is still a normal 500
+    first_chunk = next(chunks)
+    
+    def stream():
+        yield first_chunk
+        yield from chunks
+    
+    return Response(
+        stream(),
+        mimetype="text/csv" if export_format == 'csv' else "application/x-ndjson",
+        headers={"Content-Disposition": f"attachment; filename=policies.{export_format}"}
+    )
+
+def _export_chunks(query, params, export_format):
+    """
+    Yields the export header, then the rows EXPORT_ITERSIZE at a time. A named cursor keeps the
+    result on the database server, so memory use does not grow with the number of policies.
+    """
+    with db_connection() as conn:
+        # A named cursor only exists inside its transaction, which db_connection keeps open until the end
+        with conn.cursor(name="policy_export") as cursor:
+            cursor.itersize = EXPORT_ITERSIZE
+            cursor.execute(query, params)
+            
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if export_format == 'csv':
+                writer.writerow(EXPORT_COLUMNS)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            
+            for count, row in enumerate(cursor, 1):
+                # Wei amounts are written as strings, since they overflow JSON numbers
+                values = [
+                    value.isoformat() if isinstance(value, datetime) else
+                    str(value) if isinstance(value, Decimal) else value
+                    for value in row
+                ]
+                if export_format == 'csv':
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, values))) + "\n")
+                
+                if count % EXPORT_ITERSIZE == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            
+            yield buffer.getvalue()
+
 @admin_bp.route('/update_policy_status', methods=['POST'])
 def update_policy_status():
     """Update policy status"""
@@ -104,27 +218,28 @@ def update_policy_status():
     if not policy_id or not new_status:
         return jsonify({"status": "error", "error": "Missing policy_id or status"}), 400
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute(
-            "UPDATE policies SET status = %s WHERE id = %s RETURNING id",
-            (new_status, policy_id)
-        )
-        
-        result = cursor.fetchone()
-        if not result:
-            return jsonify({"status": "error", "error": "Policy not found"}), 404
+        with db_cursor() as cursor:
+            cursor.execute(
+                "UPDATE policies SET status = %s WHERE id = %s RETURNING id",
+                (new_status, policy_id)
+            )
+            
+            result = cursor.fetchone()
+            if not result:
+                return jsonify({"status": "error", "error": "Policy not found"}), 404
         
-        conn.commit()
         return jsonify({"status": "success", "message": f"Policy status updated to {new_status}"})
         
     except Exception as e:
         return jsonify({"status": "error", "error": str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
+
+@admin_bp.route('/db_stats', methods=['GET'])
+def db_stats():
+    """Get database pool wait-time and query-time statistics"""
+    if "admin_logged_in" not in session:
+        return jsonify({"status": "error", "error": "Unauthorized"}), 401
+    return jsonify(get_pool_stats())
 
 @admin_bp.route('/contract_funds', methods=['GET'])
 def contract_funds():
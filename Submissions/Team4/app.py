@@ -1,6 +1,7 @@
 from flask import Flask, jsonify, request, render_template, redirect, url_for, session
 from flask_cors import CORS
-from database import get_db_connection
+from database import db_cursor
+from migrations import run_migrations
 from policy_routes import policy_bp
 from admin_routes import admin_bp
 from flight_api import FlightAPI
@@ -19,6 +20,9 @@ CORS(app, supports_credentials=True)
 app.register_blueprint(policy_bp)
 app.register_blueprint(admin_bp)
 
+# Bring the database schema up to date once, instead of checking it on every request
+run_migrations()
+
 # Initialize Flight API with DecentraFlight API key
 flight_api = FlightAPI(api_key=None)
 
@@ -58,12 +62,9 @@ def login():
     username = data.get("username")
     password = data.get("password")
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM admins WHERE username = %s AND password = %s", (username, password))
-    admin = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    with db_cursor() as cursor:
+        cursor.execute("SELECT * FROM admins WHERE username = %s AND password = %s", (username, password))
+        admin = cursor.fetchone()
 
     if admin:
         session["admin_logged_in"] = True
@@ -91,15 +92,12 @@ def get_policies():
     if not wallet_address:
         return jsonify({"error": "Connect your wallet to view policies."}), 401
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT id, flight_id, departure_date, premium, status FROM policies WHERE wallet_address = %s",
-        (wallet_address,)
-    )
-    policies = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    with db_cursor() as cursor:
+        cursor.execute(
+            "SELECT id, flight_id, departure_date, premium, status FROM policies WHERE wallet_address = %s",
+            (wallet_address,)
+        )
+        policies = cursor.fetchall()
 
     return jsonify([
         {"id": row[0], "flight_id": row[1], "departure_date": row[2], "premium": row[3], "status": row[4]}
@@ -119,15 +117,11 @@ def purchase_insurance():
     departure_date = data['departure_date']
     premium_amount = data['premium']
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO policies (wallet_address, flight_id, departure_date, premium, status) VALUES (%s, %s, %s, %s, 'Pending')",
-        (wallet_address, flight_id, departure_date, premium_amount)
-    )
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with db_cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO policies (wallet_address, flight_id, departure_date, premium, premium_wei, status) VALUES (%s, %s, %s, %s, matic_to_wei(%s), 'Pending')",
+            (wallet_address, flight_id, departure_date, premium_amount, premium_amount)
+        )
 
     return jsonify({'status': 'success', 'message': 'Insurance purchased successfully!'})
 
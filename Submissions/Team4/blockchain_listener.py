@@ -2,7 +2,8 @@ import json
 import time
 import os
 from web3 import Web3
-import psycopg2
+from database import db_cursor
+from migrations import run_migrations
 from datetime import datetime
 import logging
 import os
@@ -24,7 +25,6 @@ logger = logging.getLogger("blockchain_listener")
 # Environment variables
 CONTRACT_ADDRESS = os.getenv('CONTRACT_ADDRESS')
 POLYGON_AMOY_RPC = os.getenv('POLYGON_RPC_URL') 
-DB_URL = os.getenv('DATABASE_URL')  
 
 # Connect to blockchain
 w3 = Web3(Web3.HTTPProvider(POLYGON_AMOY_RPC))
@@ -87,64 +87,38 @@ contract_abi = load_contract_abi()
 contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=contract_abi)
 logger.info(f"Contract initialized at address: {CONTRACT_ADDRESS}")
 
-# Database connection
-def get_db_connection():
-    try:
-        conn = psycopg2.connect(DB_URL)
-        conn.autocommit = True
-        return conn
-    except Exception as e:
-        logger.error(f"Database connection error: {e}")
-        raise
-
 # Ensure the database has the necessary tables
 def setup_database():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Create app_settings table if it doesn't exist
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS app_settings (
-            key TEXT PRIMARY KEY,
-            value TEXT NOT NULL
-        )
-    """)
+    # Create or upgrade the policies and app_settings tables
+    run_migrations()
     
-    # Check if last_processed_block exists, if not insert it
-    cursor.execute("SELECT value FROM app_settings WHERE key = 'last_processed_block'")
-    if not cursor.fetchone():
-        # Start from current block minus 10000 to catch recent events
-        current_block = w3.eth.block_number
-        start_block = max(0, current_block - 10000)
-        cursor.execute(
-            "INSERT INTO app_settings (key, value) VALUES ('last_processed_block', %s)",
-            (str(start_block),)
-        )
-        logger.info(f"Initialized last_processed_block to {start_block}")
-    
-    cursor.close()
-    conn.close()
+    with db_cursor() as cursor:
+        # Check if last_processed_block exists, if not insert it
+        cursor.execute("SELECT value FROM app_settings WHERE key = 'last_processed_block'")
+        if not cursor.fetchone():
+            # Start from current block minus 10000 to catch recent events
+            current_block = w3.eth.block_number
+            start_block = max(0, current_block - 10000)
+            cursor.execute(
+                "INSERT INTO app_settings (key, value) VALUES ('last_processed_block', %s)",
+                (str(start_block),)
+            )
+            logger.info(f"Initialized last_processed_block to {start_block}")
 
 # Get the last processed block
 def get_last_processed_block():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT value FROM app_settings WHERE key = 'last_processed_block'")
-    result = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    with db_cursor() as cursor:
+        cursor.execute("SELECT value FROM app_settings WHERE key = 'last_processed_block'")
+        result = cursor.fetchone()
     return int(result[0]) if result else 0
 
 # Update the last processed block
 def update_last_processed_block(block_number):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE app_settings SET value = %s WHERE key = 'last_processed_block'",
-        (str(block_number),)
-    )
-    cursor.close()
-    conn.close()
+    with db_cursor() as cursor:
+        cursor.execute(
+            "UPDATE app_settings SET value = %s WHERE key = 'last_processed_block'",
+            (str(block_number),)
+        )
     logger.info(f"Updated last processed block to {block_number}")
 
 def process_policy_purchased_event(event):
@@ -164,167 +138,150 @@ def process_policy_purchased_event(event):
         logger.info(f"  Flight: {flight_number}")
         logger.info(f"  Transaction: {tx_hash}")
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # First, check if a policy already exists with this exact combination (case-insensitive)
-        cursor.execute(
-            """
-            SELECT id, blockchain_policy_id FROM policies 
-            WHERE LOWER(wallet_address) = LOWER(%s) 
-            AND LOWER(flight_id) = LOWER(%s)
-            """,
-            (user, flight_number)
-        )
-        
-        existing_policy = cursor.fetchone()
-        
-        if existing_policy:
-            db_policy_id, existing_blockchain_policy_id = existing_policy
-            
-            # If blockchain_policy_id is already set, do nothing
-            if existing_blockchain_policy_id:
-                logger.info(f"Policy already exists with blockchain ID for flight {flight_number}")
-                cursor.close()
-                conn.close()
-                return
-            
-            # Update existing policy with blockchain details
+        with db_cursor() as cursor:
+            # First, check if a policy already exists with this exact combination (case-insensitive)
             cursor.execute(
                 """
-                UPDATE policies 
-                SET blockchain_policy_id = %s,
-                    transaction_id = %s,
-                    status = 'ACTIVE'
-                WHERE id = %s
+                SELECT id, blockchain_policy_id FROM policies 
+                WHERE LOWER(wallet_address) = LOWER(%s) 
+                AND LOWER(flight_id) = LOWER(%s)
                 """,
-                (policy_id_hex, tx_hash, db_policy_id)
+                (user, flight_number)
             )
-            logger.info(f"Updated existing policy {db_policy_id} with blockchain details")
-        else:
-            # Log a warning instead of creating a new policy
-            logger.warning(f"No matching policy found for user {user} and flight {flight_number}")
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
+            
+            existing_policy = cursor.fetchone()
+            
+            if existing_policy:
+                db_policy_id, existing_blockchain_policy_id = existing_policy
+                
+                # If blockchain_policy_id is already set, do nothing
+                if existing_blockchain_policy_id:
+                    logger.info(f"Policy already exists with blockchain ID for flight {flight_number}")
+                    return
+                
+                # Update existing policy with blockchain details, unless another row (e.g. one stored
+                # by /store_policy) already holds this policy ID or transaction
+                cursor.execute(
+                    """
+                    UPDATE policies 
+                    SET blockchain_policy_id = %s,
+                        transaction_id = %s,
+                        status = 'ACTIVE'
+                    WHERE id = %s
+                    AND NOT EXISTS (
+                        SELECT 1 FROM policies other
+                        WHERE other.id <> %s
+                        AND (normalize_policy_id(other.blockchain_policy_id) = normalize_policy_id(%s)
+                             OR other.transaction_id = %s)
+                    )
+                    """,
+                    (policy_id_hex, tx_hash, db_policy_id, db_policy_id, policy_id_hex, tx_hash)
+                )
+                if cursor.rowcount:
+                    logger.info(f"Updated existing policy {db_policy_id} with blockchain details")
+                else:
+                    logger.info(f"Policy {policy_id_hex} is already recorded on another row, leaving policy {db_policy_id} unchanged")
+            else:
+                # Log a warning instead of creating a new policy
+                logger.warning(f"No matching policy found for user {user} and flight {flight_number}")
+    
     except Exception as e:
         logger.error(f"Error processing PolicyPurchased event: {e}")
-        if conn:
-            conn.rollback()
-            cursor.close()
-            conn.close()
 
 def update_policy_by_blockchain_id(blockchain_policy_id, new_status, additional_data=None):
+    additional_data = additional_data or {}
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Convert bytes32 policy_id to hex string, ensuring '0x' prefix
-        if isinstance(blockchain_policy_id, bytes):
-            policy_id_hex = '0x' + blockchain_policy_id.hex()
-        else:
-            # Ensure '0x' prefix
-            policy_id_hex = blockchain_policy_id if blockchain_policy_id.startswith('0x') else '0x' + blockchain_policy_id
-            
-        logger.info(f"Looking for policy with blockchain_policy_id: {policy_id_hex}")
-        
-        # Remove '0x' for comparison to handle both formats
-        policy_id_no_prefix = policy_id_hex[2:] if policy_id_hex.startswith('0x') else policy_id_hex
-        
-        # Additional matching strategies
-        matching_strategies = [
-            # Strategy 1: Exact blockchain_policy_id match (with '0x')
-            f"""
-            SELECT id, status FROM policies 
-            WHERE blockchain_policy_id = '{policy_id_hex}'
-            """,
+        with db_cursor() as cursor:
+            # Convert bytes32 policy_id to hex string, ensuring '0x' prefix
+            if isinstance(blockchain_policy_id, bytes):
+                policy_id_hex = '0x' + blockchain_policy_id.hex()
+            else:
+                # Ensure '0x' prefix
+                policy_id_hex = blockchain_policy_id if blockchain_policy_id.startswith('0x') else '0x' + blockchain_policy_id
             
-            # Strategy 2: Match without '0x' prefix
-            f"""
-            SELECT id, status FROM policies 
-            WHERE blockchain_policy_id = '{policy_id_no_prefix}'
-            """,
+            logger.info(f"Looking for policy with blockchain_policy_id: {policy_id_hex}")
             
-            # Strategy 3: Match by flight number and wallet address
-            f"""
-            SELECT id, status FROM policies 
-            WHERE flight_id = '{additional_data.get('flight_id', '')}' 
-            AND wallet_address = '{additional_data.get('policyholder', '')}'
-            """
-        ]
-        
-        policy = None
-        for strategy in matching_strategies:
-            cursor.execute(strategy)
-            result = cursor.fetchone()
-            if result:
-                policy = result
-                break
-        
-        if policy:
-            db_policy_id = policy[0]
-            current_status = policy[1]
+            # Additional matching strategies, each backed by an index (see migrations.py)
+            matching_strategies = [
+                # Strategy 1: blockchain_policy_id match, stored with or without the '0x' prefix
+                ("""
+                SELECT id, status FROM policies 
+                WHERE normalize_policy_id(blockchain_policy_id) = normalize_policy_id(%s)
+                """, (policy_id_hex,)),
+                
+                # Strategy 2: Match by flight number and wallet address (case-insensitive)
+                ("""
+                SELECT id, status FROM policies 
+                WHERE LOWER(wallet_address) = LOWER(%s) 
+                AND LOWER(flight_id) = LOWER(%s)
+                """, (additional_data.get('policyholder', ''), additional_data.get('flight_id', '')))
+            ]
             
-            logger.info(f"Found policy ID {db_policy_id} with current status {current_status}")
+            policy = None
+            for strategy, params in matching_strategies:
+                cursor.execute(strategy, params)
+                result = cursor.fetchone()
+                if result:
+                    policy = result
+                    break
             
-            # Don't downgrade status (e.g., from COMPENSATED to DELAYED)
-            if current_status == 'COMPENSATED' and new_status != 'COMPENSATED':
-                logger.info(f"Policy {db_policy_id} is already COMPENSATED. Not downgrading to {new_status}.")
+            if policy:
+                db_policy_id = policy[0]
+                current_status = policy[1]
+                
+                logger.info(f"Found policy ID {db_policy_id} with current status {current_status}")
+                
+                # Don't downgrade status (e.g., from COMPENSATED to DELAYED)
+                if current_status == 'COMPENSATED' and new_status != 'COMPENSATED':
+                    logger.info(f"Policy {db_policy_id} is already COMPENSATED. Not downgrading to {new_status}.")
+                    return True
+                
+                # Prepare update query and parameters
+                update_params = []
+                update_columns = []
+                
+                # Always update status
+                update_columns.append("status = %s")
+                update_params.append(new_status)
+                
+                # Set blockchain_policy_id if not already set
+                if not policy[1] or policy[1] == '':
+                    update_columns.append("blockchain_policy_id = %s")
+                    update_params.append(policy_id_hex)
+                
+                # Record the payout in wei for COMPENSATED status; premium keeps the amount paid for the policy
+                if new_status == 'COMPENSATED' and additional_data and 'payout_wei' in additional_data:
+                    update_columns.append("payout_wei = %s")
+                    update_params.append(additional_data['payout_wei'])
+                
+                # Add transaction_id if provided
+                if additional_data and 'tx_hash' in additional_data:
+                    update_columns.append("transaction_id = %s")
+                    update_params.append(additional_data['tx_hash'])
+                
+                # Add policy ID for WHERE clause
+                update_params.append(db_policy_id)
+                
+                # Construct and execute update query
+                query = f"""
+                UPDATE policies 
+                SET {', '.join(update_columns)} 
+                WHERE id = %s
+                """
+                
+                cursor.execute(query, update_params)
+                rows_updated = cursor.rowcount
+                
+                logger.info(f"Updated policy {db_policy_id} to status {new_status}, rows affected: {rows_updated}")
                 return True
-            
-            # Prepare update query and parameters
-            update_params = []
-            update_columns = []
-            
-            # Always update status
-            update_columns.append("status = %s")
-            update_params.append(new_status)
-            
-            # Set blockchain_policy_id if not already set
-            if not policy[1] or policy[1] == '':
-                update_columns.append("blockchain_policy_id = %s")
-                update_params.append(policy_id_hex)
-            
-            # Add payout amount if provided for COMPENSATED status
-            if new_status == 'COMPENSATED' and additional_data and 'payout_amount' in additional_data:
-                update_columns.append("premium = %s")
-                update_params.append(f"{additional_data['payout_amount']} MATIC")
-            
-            # Add transaction_id if provided
-            if additional_data and 'tx_hash' in additional_data:
-                update_columns.append("transaction_id = %s")
-                update_params.append(additional_data['tx_hash'])
-            
-            # Add policy ID for WHERE clause
-            update_params.append(db_policy_id)
-            
-            # Construct and execute update query
-            query = f"""
-            UPDATE policies 
-            SET {', '.join(update_columns)} 
-            WHERE id = %s
-            """
-            
-            cursor.execute(query, update_params)
-            rows_updated = cursor.rowcount
-            conn.commit()
-            
-            logger.info(f"Updated policy {db_policy_id} to status {new_status}, rows affected: {rows_updated}")
-            return True
-        else:
-            # Instead of creating a new policy, log a warning
-            logger.warning(f"No matching policy found for blockchain_policy_id {policy_id_hex}")
-            return False
+            else:
+                # Instead of creating a new policy, log a warning
+                logger.warning(f"No matching policy found for blockchain_policy_id {policy_id_hex}")
+                return False
             
     except Exception as e:
         logger.error(f"Error updating policy status: {e}")
         return False
-    finally:
-        if conn:
-            cursor.close()
-            conn.close()
 def process_flight_status_event(event):
     try:
         # Extract event data
@@ -387,7 +344,7 @@ def process_policy_claimed_event(event):
         
         # Update policy status to COMPENSATED
         additional_data = {
-            'payout_amount': str(payout_matic),  # Convert to string to preserve full precision
+            'payout_wei': payout_amount,  # Keep wei so the stored payout is exact
             'policyholder': policyholder,
             'tx_hash': tx_hash
         }
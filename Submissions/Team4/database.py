@@ -1,12 +1,184 @@
 import psycopg2
+import psycopg2.pool
+import psycopg2.extras
+import psycopg2.extensions
+from contextlib import contextmanager
 from dotenv import load_dotenv
+import threading
+import logging
+import time
 import os
 
 # Load environment variables from .env
 load_dotenv()
 
-def get_db_connection():
-    db_url = os.getenv("DATABASE_URL")
-    if not db_url:
-        raise ValueError("DATABASE_URL is not set in the environment variables")
-    return psycopg2.connect(db_url)
+logger = logging.getLogger("database")
+
+# Connection pool settings
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "5"))  # Connections kept open between requests (extra ones are closed when returned)
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))  # Connections open at most; further requests wait
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # Seconds to wait for a free connection
+DB_HEALTHCHECK_IDLE_SECONDS = float(os.getenv("DB_HEALTHCHECK_IDLE_SECONDS", "30"))  # Idle time after which a connection is pinged before reuse
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+_last_used = {}  # id(connection) -> time it was returned to the pool
+
+_stats_lock = threading.Lock()
+_stats = {
+    "checkouts": 0,
+    "checkout_timeouts": 0,
+    "wait_seconds_total": 0.0,
+    "wait_seconds_max": 0.0,
+    "reconnects": 0,
+    "queries": 0,
+    "query_errors": 0,
+    "query_seconds_total": 0.0,
+    "query_seconds_max": 0.0,
+}
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Raised when no pooled connection becomes free within DB_POOL_TIMEOUT."""
+
+def _record(total_key, max_key, seconds):
+    with _stats_lock:
+        _stats[total_key] += seconds
+        _stats[max_key] = max(_stats[max_key], seconds)
+
+class _TimedCursorMixin:
+    """Records the time spent in every execute() in the pool statistics."""
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        except Exception:
+            with _stats_lock:
+                _stats["query_errors"] += 1
+            raise
+        finally:
+            with _stats_lock:
+                _stats["queries"] += 1
+            _record("query_seconds_total", "query_seconds_max", time.perf_counter() - start)
+
+class TimedCursor(_TimedCursorMixin, psycopg2.extensions.cursor):
+    pass
+
+class TimedDictCursor(_TimedCursorMixin, psycopg2.extras.DictCursor):
+    pass
+
+def _get_pool():
+    """Creates the connection pool on first use, so importing this module never connects."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                db_url = os.getenv("DATABASE_URL")
+                if not db_url:
+                    raise ValueError("DATABASE_URL is not set in the environment variables")
+                _pool = psycopg2.pool.ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, db_url)
+                logger.info(f"Database pool created (min {DB_POOL_MIN}, max {DB_POOL_MAX})")
+    return _pool
+
+def _is_healthy(conn):
+    """Pings a connection that has been idle for a while; fresh ones are trusted."""
+    if conn.closed:
+        return False
+    if time.monotonic() - _last_used.get(id(conn), 0) < DB_HEALTHCHECK_IDLE_SECONDS:
+        return True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+def acquire_connection(autocommit=False):
+    """
+    Takes a healthy connection from the pool, waiting up to DB_POOL_TIMEOUT seconds.
+    Every connection must be given back with release_connection().
+
+    With autocommit, each statement commits on its own, which saves the BEGIN and COMMIT
+    round trips for single-statement work.
+    """
+    pool = _get_pool()
+    start = time.perf_counter()
+    if not _slots.acquire(timeout=DB_POOL_TIMEOUT):
+        with _stats_lock:
+            _stats["checkout_timeouts"] += 1
+        raise PoolTimeout(f"No database connection free after {DB_POOL_TIMEOUT}s (pool max {DB_POOL_MAX})")
+
+    try:
+        conn = pool.getconn()
+        while not _is_healthy(conn):
+            logger.warning("Discarding broken database connection and reconnecting")
+            with _stats_lock:
+                _stats["reconnects"] += 1
+            _last_used.pop(id(conn), None)
+            pool.putconn(conn, close=True)
+            conn = pool.getconn()
+    except Exception:
+        _slots.release()
+        raise
+
+    conn.cursor_factory = TimedCursor
+    conn.autocommit = autocommit
+    with _stats_lock:
+        _stats["checkouts"] += 1
+    _record("wait_seconds_total", "wait_seconds_max", time.perf_counter() - start)
+    return conn
+
+def release_connection(conn):
+    """Returns a connection to the pool, rolling back anything left uncommitted."""
+    broken = conn.closed
+    if not broken and conn.autocommit:
+        conn.autocommit = False
+    elif not broken and conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            broken = True
+
+    if broken:
+        _last_used.pop(id(conn), None)
+    else:
+        _last_used[id(conn)] = time.monotonic()
+    try:
+        _get_pool().putconn(conn, close=broken)
+    finally:
+        _slots.release()
+
+@contextmanager
+def db_connection(autocommit=False):
+    """Yields a pooled connection; commits on success, rolls back on error, and always returns it."""
+    conn = acquire_connection(autocommit)
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        release_connection(conn)
+
+@contextmanager
+def db_cursor(dict_rows=False, autocommit=False):
+    """Yields a cursor on a pooled connection, with the same transaction handling as db_connection()."""
+    with db_connection(autocommit) as conn:
+        with conn.cursor(cursor_factory=TimedDictCursor if dict_rows else TimedCursor) as cursor:
+            yield cursor
+
+def get_pool_stats():
+    """Returns pool wait-time and query-time statistics."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["pool_min"] = DB_POOL_MIN
+    stats["pool_max"] = DB_POOL_MAX
+    stats["in_use"] = len(_pool._used) if _pool is not None else 0
+    stats["idle"] = len(_pool._pool) if _pool is not None else 0
+    stats["wait_seconds_avg"] = stats["wait_seconds_total"] / stats["checkouts"] if stats["checkouts"] else 0.0
+    stats["query_seconds_avg"] = stats["query_seconds_total"] / stats["queries"] if stats["queries"] else 0.0
+    return stats
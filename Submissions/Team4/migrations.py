@@ -0,0 +1,226 @@
+from database import db_cursor
+import threading
+import logging
+import sys
+
+logger = logging.getLogger("migrations")
+
+# Any constant works; it only has to be the same for every process applying migrations
+MIGRATION_LOCK_ID = 20250401
+
+# Versioned schema migrations, applied once each, in order, and recorded in schema_migrations
+MIGRATIONS = [
+    (1, "create_policies", """
+        CREATE TABLE IF NOT EXISTS policies (
+            id SERIAL PRIMARY KEY,
+            wallet_address TEXT NOT NULL,
+            flight_id TEXT NOT NULL,
+            departure_date TIMESTAMP NOT NULL,
+            premium TEXT NOT NULL,
+            status TEXT NOT NULL,
+            transaction_id TEXT,
+            blockchain_policy_id TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        ALTER TABLE policies ADD COLUMN IF NOT EXISTS transaction_id TEXT;
+        ALTER TABLE policies ADD COLUMN IF NOT EXISTS blockchain_policy_id TEXT;
+        ALTER TABLE policies ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+    """),
+    (2, "create_app_settings", """
+        CREATE TABLE IF NOT EXISTS app_settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """),
+    (3, "unique_policy_transaction_id", """
+        -- A policy without an on-chain transaction has a NULL transaction_id rather than ''
+        ALTER TABLE policies ALTER COLUMN transaction_id DROP NOT NULL;
+        UPDATE policies SET transaction_id = NULL WHERE transaction_id = '';
+        -- Keep the first copy of any policy stored twice by concurrent purchases
+        DELETE FROM policies duplicate USING policies original
+        WHERE duplicate.transaction_id = original.transaction_id AND duplicate.id > original.id;
+        CREATE UNIQUE INDEX IF NOT EXISTS policies_transaction_id_key ON policies (transaction_id);
+    """),
+    (4, "index_policy_lookups", """
+        -- On-chain policy IDs are stored with or without '0x'; compare them in one canonical form
+        CREATE OR REPLACE FUNCTION normalize_policy_id(policy_id TEXT) RETURNS TEXT
+            LANGUAGE sql IMMUTABLE PARALLEL SAFE
+            AS $$ SELECT LOWER(REGEXP_REPLACE(policy_id, '^0x', '', 'i')) $$;
+        UPDATE policies SET blockchain_policy_id = NULL WHERE blockchain_policy_id = '';
+        -- Keep an on-chain policy ID only on the first row it was recorded on
+        UPDATE policies duplicate SET blockchain_policy_id = NULL FROM policies original
+        WHERE normalize_policy_id(duplicate.blockchain_policy_id) = normalize_policy_id(original.blockchain_policy_id)
+        AND duplicate.id > original.id;
+        CREATE UNIQUE INDEX IF NOT EXISTS policies_blockchain_policy_id_key
+            ON policies (normalize_policy_id(blockchain_policy_id));
+        -- Serves wallet lookups alone (get_policies) and wallet + flight lookups (blockchain_listener.py)
+        CREATE INDEX IF NOT EXISTS policies_wallet_flight_idx
+            ON policies (LOWER(wallet_address), LOWER(flight_id));
+    """),
+    (5, "numeric_amounts_and_policy_stats", """
+        -- Parses amounts such as '0.00001 MATIC' into wei; anything unparseable becomes NULL
+        CREATE OR REPLACE FUNCTION matic_to_wei(amount TEXT) RETURNS NUMERIC
+            LANGUAGE sql IMMUTABLE PARALLEL SAFE
+            AS $$ SELECT ROUND(SUBSTRING(amount FROM '^[[:space:]]*([0-9]+(?:[.][0-9]*)?|[.][0-9]+)')::NUMERIC * 1000000000000000000) $$;
+        ALTER TABLE policies ADD COLUMN IF NOT EXISTS premium_wei NUMERIC(78, 0);
+        ALTER TABLE policies ADD COLUMN IF NOT EXISTS payout_wei NUMERIC(78, 0);
+        -- The listener used to overwrite premium with the payout of compensated policies,
+        -- so for those rows the text is the payout and the premium paid is unknown
+        UPDATE policies SET premium_wei = matic_to_wei(premium) WHERE status <> 'COMPENSATED';
+        UPDATE policies SET payout_wei = matic_to_wei(premium) WHERE status = 'COMPENSATED';
+
+        -- Per-status totals for the admin dashboard, kept current by the trigger below
+        CREATE TABLE IF NOT EXISTS policy_stats (
+            status TEXT PRIMARY KEY,
+            policy_count BIGINT NOT NULL DEFAULT 0,
+            premium_wei NUMERIC(78, 0) NOT NULL DEFAULT 0,
+            payout_wei NUMERIC(78, 0) NOT NULL DEFAULT 0
+        );
+        DELETE FROM policy_stats;
+        INSERT INTO policy_stats (status, policy_count, premium_wei, payout_wei)
+        SELECT status, COUNT(*), COALESCE(SUM(premium_wei), 0), COALESCE(SUM(payout_wei), 0)
+        FROM policies GROUP BY status;
+
+        CREATE OR REPLACE FUNCTION track_policy_stats() RETURNS TRIGGER
+            LANGUAGE plpgsql
+            AS $$
+            BEGIN
+                IF TG_OP = 'UPDATE' AND (NEW.status, NEW.premium_wei, NEW.payout_wei)
+                        IS NOT DISTINCT FROM (OLD.status, OLD.premium_wei, OLD.payout_wei) THEN
+                    RETURN NULL;
+                END IF;
+                -- Apply the row's old values as a decrement and its new values as an increment, in
+                -- status order so concurrent status changes always lock the counter rows in the same order
+                INSERT INTO policy_stats AS stats (status, policy_count, premium_wei, payout_wei)
+                SELECT delta.status, SUM(delta.policy_count), SUM(delta.premium_wei), SUM(delta.payout_wei)
+                FROM (
+                    SELECT NEW.status, 1, COALESCE(NEW.premium_wei, 0), COALESCE(NEW.payout_wei, 0)
+                    WHERE TG_OP <> 'DELETE'
+                    UNION ALL
+                    SELECT OLD.status, -1, -COALESCE(OLD.premium_wei, 0), -COALESCE(OLD.payout_wei, 0)
+                    WHERE TG_OP <> 'INSERT'
+                ) AS delta (status, policy_count, premium_wei, payout_wei)
+                GROUP BY delta.status
+                ORDER BY delta.status
+                ON CONFLICT (status) DO UPDATE SET
+                    policy_count = stats.policy_count + EXCLUDED.policy_count,
+                    premium_wei = stats.premium_wei + EXCLUDED.premium_wei,
+                    payout_wei = stats.payout_wei + EXCLUDED.payout_wei;
+                RETURN NULL;
+            END
+            $$;
+        DROP TRIGGER IF EXISTS policies_track_stats ON policies;
+        CREATE TRIGGER policies_track_stats
+            AFTER INSERT OR DELETE OR UPDATE OF status, premium_wei, payout_wei ON policies
+            FOR EACH ROW EXECUTE FUNCTION track_policy_stats();
+
+        -- Serves the admin dashboard's newest-departure-first keyset pagination
+        CREATE INDEX IF NOT EXISTS policies_departure_date_idx ON policies (departure_date, id);
+    """),
+]
+
+# Hot queries that must be answered from an index, with sample parameters for EXPLAIN
+INDEXED_QUERIES = {
+    "policies by wallet": (
+        "SELECT id FROM policies WHERE LOWER(wallet_address) = LOWER(%s)",
+        ("0xWallet",)
+    ),
+    "policy by wallet and flight": (
+        "SELECT id FROM policies WHERE LOWER(wallet_address) = LOWER(%s) AND LOWER(flight_id) = LOWER(%s)",
+        ("0xWallet", "AV43")
+    ),
+    "policy by transaction": (
+        "SELECT id FROM policies WHERE transaction_id = %s",
+        ("0xTransaction",)
+    ),
+    "policy by blockchain policy ID": (
+        "SELECT id FROM policies WHERE normalize_policy_id(blockchain_policy_id) = normalize_policy_id(%s)",
+        ("0xPolicy",)
+    ),
+    "policy already stored for a purchase": (
+        "SELECT id FROM policies WHERE transaction_id = %s "
+        "OR normalize_policy_id(blockchain_policy_id) = normalize_policy_id(%s) LIMIT 1",
+        ("0xTransaction", "0xPolicy")
+    ),
+    "admin dashboard page": (
+        "SELECT id FROM policies WHERE (departure_date, id) < (%s, %s) ORDER BY departure_date DESC, id DESC LIMIT 10",
+        ("2025-01-01", 1)
+    ),
+}
+
+_capabilities = {}
+_capabilities_lock = threading.Lock()
+
+def run_migrations():
+    """Applies pending migrations in a single transaction and refreshes the cached schema capabilities."""
+    with db_cursor() as cursor:
+        # Serialize the app and the listener when they start at the same time
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("SELECT version FROM schema_migrations")
+        applied = {row[0] for row in cursor.fetchall()}
+
+        for version, name, sql in MIGRATIONS:
+            if version in applied:
+                continue
+            logger.info(f"Applying migration {version}: {name}")
+            cursor.execute(sql)
+            cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+
+    with _capabilities_lock:
+        _capabilities.clear()
+    capabilities = get_schema_capabilities()
+    logger.info(f"Database schema at version {capabilities['schema_version']}")
+    return capabilities
+
+def check_query_plans():
+    """
+    EXPLAINs every query in INDEXED_QUERIES and returns {name: plan} for those that scan the
+    whole policies table. Sequential scans are disabled for the check, so a small table still
+    shows whether an index can serve the query at all.
+    """
+    failures = {}
+    with db_cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        for name, (query, params) in INDEXED_QUERIES.items():
+            cursor.execute(f"EXPLAIN {query}", params)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+            if "Seq Scan on policies" in plan:
+                failures[name] = plan
+    return failures
+
+def get_schema_capabilities():
+    """Returns the schema version and policies columns, read from the database once and cached."""
+    with _capabilities_lock:
+        if not _capabilities:
+            with db_cursor() as cursor:
+                cursor.execute("""
+                    SELECT
+                        (SELECT COALESCE(MAX(version), 0) FROM schema_migrations),
+                        ARRAY(
+                            SELECT column_name::TEXT FROM information_schema.columns
+                            WHERE table_schema = current_schema() AND table_name = 'policies'
+                        )
+                """)
+                schema_version, policy_columns = cursor.fetchone()
+            _capabilities["schema_version"] = schema_version
+            _capabilities["policy_columns"] = frozenset(policy_columns)
+        return dict(_capabilities)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    # Apply pending migrations, then fail if any hot query would scan the whole table
+    run_migrations()
+    failures = check_query_plans()
+    for name, plan in failures.items():
+        print(f"FAIL: '{name}' scans the whole policies table:\n{plan}\n")
+    if failures:
+        sys.exit(1)
+    print(f"OK: all {len(INDEXED_QUERIES)} policy lookups use an index")
@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify
-import psycopg2
-import psycopg2.extras
+from database import acquire_connection, release_connection, db_cursor
+from migrations import get_schema_capabilities
 import os
 from datetime import datetime
 from dotenv import load_dotenv
@@ -12,15 +12,6 @@ load_dotenv()
 # Initialize Flask Blueprint
 policy_bp = Blueprint("policy", __name__)
 
-# Database connection string from environment
-DB_URL = os.getenv('DATABASE_URL')
-
-def get_db_connection():
-    """Create and return a database connection"""
-    conn = psycopg2.connect(DB_URL)
-    conn.autocommit = True
-    return conn
-
 @policy_bp.route('/store_policy', methods=['POST'])
 def store_policy():
     """
@@ -105,7 +96,7 @@ def store_policy():
         # Connect to database with detailed error handling
         try:
             print("Attempting to connect to the database...")
-            conn = get_db_connection()
+            conn = acquire_connection(autocommit=True)
             print("Database connection successful")
         except Exception as e:
             print(f"CRITICAL ERROR - Database connection failed: {str(e)}")
@@ -133,124 +124,48 @@ def store_policy():
         # Create cursor
         cursor = conn.cursor()
         
-        # Check if transaction_id already exists with error handling
+        # Insert in a single round trip; the unique indexes on transaction_id and blockchain_policy_id
+        # turn a repeated or concurrent store of the same purchase into a no-op instead of a duplicate row
         try:
-            print(f"Checking if transaction ID exists: {transaction_id}")
-            cursor.execute("SELECT id FROM policies WHERE transaction_id = %s", (transaction_id,))
-            existing_policy = cursor.fetchone()
+            query = """
+                INSERT INTO policies (
+                    wallet_address, 
+                    flight_id, 
+                    departure_date, 
+                    premium, 
+                    premium_wei,
+                    status, 
+                    transaction_id,
+                    blockchain_policy_id
+                ) VALUES (%s, %s, %s, %s, matic_to_wei(%s), 'ACTIVE', %s, %s)
+                ON CONFLICT DO NOTHING
+                RETURNING id
+            """
+            params = (wallet_address, flight_id, departure_date, premium, premium, transaction_id or None, blockchain_policy_id or None)
+            
+            print(f"SQL Query: {query}")
+            print(f"Parameters: {params}")
             
-            if existing_policy:
-                policy_id = existing_policy[0]
+            # Execute the query to insert the policy
+            cursor.execute(query, params)
+            inserted = cursor.fetchone()
+            
+            if inserted is None:
+                cursor.execute("""
+                    SELECT id FROM policies
+                    WHERE transaction_id = %s
+                    OR normalize_policy_id(blockchain_policy_id) = normalize_policy_id(%s)
+                    LIMIT 1
+                """, (transaction_id, blockchain_policy_id))
+                policy_id = cursor.fetchone()[0]
                 print(f"Policy already exists with ID: {policy_id}")
-                cursor.close()
-                conn.close()
                 return jsonify({
                     'status': 'success', 
                     'message': 'Policy already exists',
                     'policy_id': policy_id
                 })
-            else:
-                print("No existing policy found with this transaction ID")
-        except Exception as e:
-            print(f"Error checking for existing policy: {str(e)}")
-            # Continue anyway since we're debugging
-        
-        # Check for the policies table and create it if it doesn't exist
-        try:
-            cursor.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_name = 'policies'
-                )
-            """)
-            table_exists = cursor.fetchone()[0]
-            
-            if not table_exists:
-                print("Policies table does not exist. Creating it...")
-                cursor.execute("""
-                    CREATE TABLE policies (
-                        id SERIAL PRIMARY KEY,
-                        wallet_address TEXT NOT NULL,
-                        flight_id TEXT NOT NULL,
-                        departure_date TIMESTAMP NOT NULL,
-                        premium TEXT NOT NULL,
-                        status TEXT NOT NULL,
-                        transaction_id TEXT NOT NULL,
-                        blockchain_policy_id TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                conn.commit()
-                print("Created policies table successfully")
-        except Exception as e:
-            print(f"Error checking/creating policies table: {str(e)}")
-            # Continue anyway
-        
-        # Check if blockchain_policy_id column exists
-        try:
-            cursor.execute("""
-                SELECT column_name
-                FROM information_schema.columns
-                WHERE table_name = 'policies' AND column_name = 'blockchain_policy_id'
-            """)
-            has_blockchain_column = cursor.fetchone() is not None
-            print(f"blockchain_policy_id column exists: {has_blockchain_column}")
-            
-            # Add the column if it doesn't exist
-            if not has_blockchain_column:
-                try:
-                    cursor.execute("ALTER TABLE policies ADD COLUMN blockchain_policy_id TEXT")
-                    conn.commit()
-                    has_blockchain_column = True
-                    print("Added blockchain_policy_id column to policies table")
-                except Exception as e:
-                    print(f"Error adding blockchain_policy_id column: {str(e)}")
-                    # Continue without the column
-            
-        except Exception as e:
-            print(f"Error checking for blockchain_policy_id column: {str(e)}")
-            has_blockchain_column = False
-        
-        # Build query based on available columns
-        try:
-            if has_blockchain_column and blockchain_policy_id:
-                query = """
-                    INSERT INTO policies (
-                        wallet_address, 
-                        flight_id, 
-                        departure_date, 
-                        premium, 
-                        status, 
-                        transaction_id,
-                        blockchain_policy_id
-                    ) VALUES (%s, %s, %s, %s, 'ACTIVE', %s, %s)
-                    RETURNING id
-                """
-                params = (wallet_address, flight_id, departure_date, premium, transaction_id, blockchain_policy_id)
-                print("Using query with blockchain_policy_id")
-            else:
-                query = """
-                    INSERT INTO policies (
-                        wallet_address, 
-                        flight_id, 
-                        departure_date, 
-                        premium, 
-                        status, 
-                        transaction_id
-                    ) VALUES (%s, %s, %s, %s, 'ACTIVE', %s)
-                    RETURNING id
-                """
-                params = (wallet_address, flight_id, departure_date, premium, transaction_id)
-                print("Using query without blockchain_policy_id")
-            
-            print(f"SQL Query: {query}")
-            print(f"Parameters: {params}")
-            
-            # Execute the query to insert the policy
-            cursor.execute(query, params)
-            policy_id = cursor.fetchone()[0]
-            conn.commit()
             
+            policy_id = inserted[0]
             print(f"Successfully inserted policy with ID: {policy_id}")
             
             return jsonify({
@@ -259,7 +174,6 @@ def store_policy():
                 'policy_id': policy_id
             })
         except Exception as e:
-            conn.rollback()
             print(f"ERROR storing policy: {str(e)}")
             
             # Try to get more details about the error
@@ -272,8 +186,8 @@ def store_policy():
             }), 500
         finally:
             cursor.close()
-            conn.close()
-            print("Database connection closed")
+            release_connection(conn)
+            print("Database connection returned to pool")
             
     except Exception as e:
         print(f"CRITICAL ERROR in store_policy: {str(e)}")
@@ -294,48 +208,39 @@ def get_policies():
     if not wallet_address:
         return jsonify({"error": "Connect your wallet to view policies."}), 401
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     # Check if blockchain_policy_id column exists
-    cursor.execute("""
-        SELECT column_name
-        FROM information_schema.columns
-        WHERE table_name = 'policies' AND column_name = 'blockchain_policy_id'
-    """)
-    has_blockchain_column = cursor.fetchone() is not None
-    
-    # Build query dynamically based on available columns
-    if has_blockchain_column:
-        query = """
-            SELECT 
-                id, 
-                flight_id, 
-                departure_date, 
-                premium, 
-                status, 
-                transaction_id,
-                blockchain_policy_id
-            FROM policies 
-            WHERE LOWER(wallet_address) = LOWER(%s)
-        """
-    else:
-        query = """
-            SELECT 
-                id, 
-                flight_id, 
-                departure_date, 
-                premium, 
-                status, 
-                transaction_id
-            FROM policies 
-            WHERE LOWER(wallet_address) = LOWER(%s)
-        """
+    has_blockchain_column = "blockchain_policy_id" in get_schema_capabilities()["policy_columns"]
     
-    cursor.execute(query, (wallet_address,))
-    policies = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    with db_cursor(autocommit=True) as cursor:
+        # Build query dynamically based on available columns
+        if has_blockchain_column:
+            query = """
+                SELECT 
+                    id, 
+                    flight_id, 
+                    departure_date, 
+                    premium, 
+                    status, 
+                    transaction_id,
+                    blockchain_policy_id
+                FROM policies 
+                WHERE LOWER(wallet_address) = LOWER(%s)
+            """
+        else:
+            query = """
+                SELECT 
+                    id, 
+                    flight_id, 
+                    departure_date, 
+                    premium, 
+                    status, 
+                    transaction_id
+                FROM policies 
+                WHERE LOWER(wallet_address) = LOWER(%s)
+            """
+        
+        cursor.execute(query, (wallet_address,))
+        policies = cursor.fetchall()
 
     result = []
     for row in policies:
@@ -370,18 +275,14 @@ def check_policy_status():
         if not policy_id:
             return jsonify({"error": "Policy ID is required"}), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        
-        # FIXED: Use "id" column instead of "policy_id"
-        cur.execute(
-            "SELECT id, status, flight_id, departure_date FROM policies WHERE id = %s",
-            (policy_id,)
-        )
-        
-        policy = cur.fetchone()
-        cur.close()
-        conn.close()
+        with db_cursor(dict_rows=True) as cur:
+            # FIXED: Use "id" column instead of "policy_id"
+            cur.execute(
+                "SELECT id, status, flight_id, departure_date FROM policies WHERE id = %s",
+                (policy_id,)
+            )
+            
+            policy = cur.fetchone()
         
         if not policy:
             return jsonify({"error": "Policy not found"}), 404
@@ -410,18 +311,14 @@ def update_policy_status():
         if not policy_id or not new_status:
             return jsonify({"error": "Policy ID and status are required"}), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # FIXED: Use "id" column instead of "policy_id"
-        cur.execute(
-            "UPDATE policies SET status = %s WHERE id = %s RETURNING id",
-            (new_status, policy_id)
-        )
-        
-        updated = cur.fetchone()
-        cur.close()
-        conn.close()
+        with db_cursor() as cur:
+            # FIXED: Use "id" column instead of "policy_id"
+            cur.execute(
+                "UPDATE policies SET status = %s WHERE id = %s RETURNING id",
+                (new_status, policy_id)
+            )
+            
+            updated = cur.fetchone()
         
         if not updated:
             return jsonify({"error": "Policy not found or not updated"}), 404
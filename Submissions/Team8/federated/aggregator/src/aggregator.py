@@ -1,14 +1,26 @@
 import os
+import re
 import json
 import time
 import requests
 import websocket
 import numpy as np
 import tensorflow as tf
-import hashlib
+import heapq
 from datetime import datetime, timedelta
 import logging
 import threading
+import cProfile
+import pstats
+import tracemalloc
+from model_upload import upload_file
+from server_optimizer import (
+    SUPPORTED_OPTIMIZERS,
+    init_optimizer_state,
+    apply_server_update,
+    save_optimizer_state,
+    load_optimizer_state
+)
 
 # Configure logging
 logging.basicConfig(
@@ -41,19 +53,75 @@ REPUTATION_PENALTY_NONPARTICIPATION = float(os.getenv("REPUTATION_PENALTY_NONPAR
 
 # Round Tracking Configuration
 ROUND_TIMEOUT_MINUTES = int(os.getenv("ROUND_TIMEOUT_MINUTES", "3"))  # Minutes to wait for submissions before timeout
-DEFAULT_PARTICIPANTS = ["dbs", "ing", "ocbc"]  # Default list of banks expected to participate
+EARLY_CLOSE_ON_PREDICTED_MISS = os.getenv("EARLY_CLOSE_ON_PREDICTED_MISS", "false").lower() == "true"  # Stop waiting for banks predicted to miss the deadline
+
+# Weight client models by their reported training-set size (FedAvg n_k) in addition to reputation
+SAMPLE_COUNT_WEIGHTING = os.getenv("SAMPLE_COUNT_WEIGHTING", "true").lower() == "true"
+DEFAULT_PARTICIPANTS = ["dbs", "ing", "ocbc"]  # Bootstrap list of banks, used until the ledger registry is available
+
+# Participant Registry and Selection Configuration
+REGISTRY_CACHE_TTL_SECONDS = int(os.getenv("REGISTRY_CACHE_TTL_SECONDS", "300"))  # Seconds before the cached registry is reloaded
+ROUND_SAMPLE_SIZE = int(os.getenv("ROUND_SAMPLE_SIZE", "0"))  # Participants selected per round (0 = all registered)
+PARTICIPANT_STATS_DECAY = float(os.getenv("PARTICIPANT_STATS_DECAY", "0.3"))  # EMA factor for latency, duration and data volume
+
+# Profiling Configuration
+PROFILE_NEXT_ROUND = os.getenv("PROFILE_NEXT_ROUND", "false").lower() in ("1", "true", "yes")  # Profile the first round after startup
+PROFILE_TRIGGER_FILE = os.path.join(MODEL_DIR, "profiles", "PROFILE_NEXT_ROUND")  # Touch this file to profile the next round
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "50"))  # Entries in the timing and allocation reports
+
+# Asynchronous (FedBuff-style) Aggregation Configuration
+AGGREGATION_MODE = os.getenv("AGGREGATION_MODE", "sync").lower()  # sync (wait for all participants) or async (buffered)
+ASYNC_BUFFER_SIZE = int(os.getenv("ASYNC_BUFFER_SIZE", "3"))  # Number of updates that trigger a new global version
+ASYNC_STALENESS_EXPONENT = float(os.getenv("ASYNC_STALENESS_EXPONENT", "0.5"))  # Update weight = 1 / (1 + staleness)^exponent
+ASYNC_MAX_STALENESS = int(os.getenv("ASYNC_MAX_STALENESS", "10"))  # Updates older than this many versions are dropped
+
+# Server Optimizer Configuration
+SERVER_OPTIMIZER = os.getenv("SERVER_OPTIMIZER", "fedavg").lower()  # fedavg, fedavgm, fedadam or fedyogi
+SERVER_LEARNING_RATE = float(os.getenv("SERVER_LEARNING_RATE")) if os.getenv("SERVER_LEARNING_RATE") else None  # Defaults per optimizer
+SERVER_MOMENTUM = float(os.getenv("SERVER_MOMENTUM", "0.9"))  # Momentum for FedAvgM
+SERVER_BETA1 = float(os.getenv("SERVER_BETA1", "0.9"))  # First moment decay for FedAdam/FedYogi
+SERVER_BETA2 = float(os.getenv("SERVER_BETA2", "0.99"))  # Second moment decay for FedAdam/FedYogi
+SERVER_TAU = float(os.getenv("SERVER_TAU", "0.001"))  # Adaptivity constant for FedAdam/FedYogi
+
+if SERVER_OPTIMIZER not in SUPPORTED_OPTIMIZERS:
+    raise ValueError(f"SERVER_OPTIMIZER must be one of {SUPPORTED_OPTIMIZERS}, got '{SERVER_OPTIMIZER}'")
 
 # Global state for threshold and reputation management
 threshold_state = {
     "current_threshold": INITIAL_THRESHOLD,
     "round_history": [],  # Will store metrics from previous rounds
     "participant_history": {},  # Will store performance history per participant
-    "reputation_scores": {}  # Will store reputation scores per participant
+    "reputation_scores": {},  # Will store reputation scores per participant
+    "participant_stats": {}  # Will store submission latency and data volume per participant
 }
+# Guards reputation scores, participant history and stats, which async submissions update concurrently
+reputation_lock = threading.RLock()
+
+# Global state for the server optimizer (persisted next to threshold_state)
+optimizer_state = init_optimizer_state(SERVER_OPTIMIZER)
+optimizer_lock = threading.Lock()
+
+# Profiling requests (armed by env var, control message or trigger file)
+profile_state = {"armed": PROFILE_NEXT_ROUND}
 
 # Global state for round tracking
 active_rounds = {}  # Map of round_id -> round_info
-round_locks = {}  # Locks to prevent race conditions
+round_locks = {}  # Map of round_id -> lock held while the round is aggregated
+completed_rounds = set()  # Rounds already aggregated; late events never recreate them
+active_rounds_lock = threading.Lock()  # Guards active_rounds, round_locks and completed_rounds
+
+# Cached participant registry loaded from the ledger
+participant_registry = {
+    "participants": [],
+    "loaded_at": 0.0,
+    "valid": False,
+    "refreshing": False
+}
+registry_lock = threading.Lock()
+
+# Global state for asynchronous aggregation
+async_sessions = {}  # Map of round_id -> buffered async session
+async_sessions_lock = threading.Lock()
 
 def fetch_model_from_minio(round_id, participant_id):
     """Requests a pre-signed download URL from MinIO-Handler and downloads the model."""
@@ -102,31 +170,34 @@ def load_model_weights(model_path):
 
 def get_participant_reputation(participant_id):
     """Gets the current reputation score for a participant."""
-    if participant_id not in threshold_state["reputation_scores"]:
-        # Initialize new participant
-        threshold_state["reputation_scores"][participant_id] = REPUTATION_INIT
-        logger.info(f"🆕 [AGGREGATOR] Initialized reputation for {participant_id}: {REPUTATION_INIT}")
-    
-    return threshold_state["reputation_scores"][participant_id]
+    with reputation_lock:
+        if participant_id not in threshold_state["reputation_scores"]:
+            # Initialize new participant
+            threshold_state["reputation_scores"][participant_id] = REPUTATION_INIT
+            logger.info(f"🆕 [AGGREGATOR] Initialized reputation for {participant_id}: {REPUTATION_INIT}")
+        
+        return threshold_state["reputation_scores"][participant_id]
 
 def update_participant_reputation(participant_id, quality_score, accepted, reason="Model quality evaluation", round_id="unknown"):
     """Updates a participant's reputation based on model quality and acceptance."""
-    current_rep = get_participant_reputation(participant_id)
-    
-    if accepted:
-        # Reward for accepted models, higher reward for higher quality
-        reward = REPUTATION_REWARD * (1 + quality_score)
-        new_rep = min(current_rep + reward, REPUTATION_MAX)
-        logger.info(f"⬆️ [AGGREGATOR] Increasing reputation for {participant_id}: {current_rep:.2f} -> {new_rep:.2f}")
-    else:
-        # Penalty for rejected models, reduced for higher quality (near threshold)
-        penalty_factor = 1.0 - (quality_score / threshold_state["current_threshold"])
-        penalty = REPUTATION_PENALTY * max(0.2, penalty_factor)  # At least 20% of penalty
-        new_rep = max(current_rep - penalty, REPUTATION_MIN)
-        logger.info(f"⬇️ [AGGREGATOR] Decreasing reputation for {participant_id}: {current_rep:.2f} -> {new_rep:.2f}")
-    
-    # Update reputation score
-    threshold_state["reputation_scores"][participant_id] = new_rep
+    # Read and write under one lock so concurrent updates for the same participant are not lost
+    with reputation_lock:
+        current_rep = get_participant_reputation(participant_id)
+        
+        if accepted:
+            # Reward for accepted models, higher reward for higher quality
+            reward = REPUTATION_REWARD * (1 + quality_score)
+            new_rep = min(current_rep + reward, REPUTATION_MAX)
+            logger.info(f"⬆️ [AGGREGATOR] Increasing reputation for {participant_id}: {current_rep:.2f} -> {new_rep:.2f}")
+        else:
+            # Penalty for rejected models, reduced for higher quality (near threshold)
+            penalty_factor = 1.0 - (quality_score / threshold_state["current_threshold"])
+            penalty = REPUTATION_PENALTY * max(0.2, penalty_factor)  # At least 20% of penalty
+            new_rep = max(current_rep - penalty, REPUTATION_MIN)
+            logger.info(f"⬇️ [AGGREGATOR] Decreasing reputation for {participant_id}: {current_rep:.2f} -> {new_rep:.2f}")
+        
+        # Update reputation score
+        threshold_state["reputation_scores"][participant_id] = new_rep
     
     # Write to blockchain
     record_reputation_update(participant_id, new_rep, reason, round_id)
@@ -135,12 +206,12 @@ def update_participant_reputation(participant_id, quality_score, accepted, reaso
 
 def check_for_non_participants(round_id, submitted_participants, expected_participants):
     """
-    Identifies banks that didn't participate in a training round and penalizes them.
+    Identifies banks that were selected for a training round but didn't participate, and penalizes them.
     
     Args:
         round_id: The ID of the current training round
         submitted_participants: List of participants who submitted models
-        expected_participants: List of all participants expected to submit models
+        expected_participants: List of participants selected for the round
     
     Returns:
         List of participants who did not submit models
@@ -159,16 +230,17 @@ def check_for_non_participants(round_id, submitted_participants, expected_partic
         
         # Apply penalty to each non-participant
         for participant_id in non_participants:
-            current_rep = get_participant_reputation(participant_id)
-            
-            # Higher penalty for non-participation than poor model quality
-            penalty = REPUTATION_PENALTY_NONPARTICIPATION
-            new_rep = max(current_rep - penalty, REPUTATION_MIN)
-            
-            logger.info(f"⬇️ [AGGREGATOR] Decreasing reputation for non-participant {participant_id}: {current_rep:.2f} -> {new_rep:.2f}")
-            
-            # Update reputation score
-            threshold_state["reputation_scores"][participant_id] = new_rep
+            with reputation_lock:
+                current_rep = get_participant_reputation(participant_id)
+                
+                # Higher penalty for non-participation than poor model quality
+                penalty = REPUTATION_PENALTY_NONPARTICIPATION
+                new_rep = max(current_rep - penalty, REPUTATION_MIN)
+                
+                logger.info(f"⬇️ [AGGREGATOR] Decreasing reputation for non-participant {participant_id}: {current_rep:.2f} -> {new_rep:.2f}")
+                
+                # Update reputation score
+                threshold_state["reputation_scores"][participant_id] = new_rep
             
             # Record on blockchain
             record_reputation_update(
@@ -248,6 +320,24 @@ def evaluate_model_quality(model, weights, participant_id, round_id, model_uri):
             metrics["has_inf"] = accuracy_metrics.get("has_inf_predictions", False)
             metrics["self_certified"] = accuracy_metrics.get("self_certified", False)
             
+            # Client-measured training telemetry (values are strings on the ledger)
+            training_stats = contribution_data.get("trainingStats") or {}
+            metrics["num_samples"] = int(parse_training_stat(training_stats, "num_samples"))
+            duration = sum(parse_training_stat(training_stats, key)
+                           for key in ("data_load_seconds", "train_seconds", "upload_seconds"))
+            
+            # Subsampled contributions report the full training set size, their update is inverse-probability weighted
+            if training_stats.get("sampler"):
+                logger.info(f"🎯 [AGGREGATOR] {participant_id} trained on a {training_stats['sampler']} subset of "
+                            f"{int(parse_training_stat(training_stats, 'sampled_samples'))} of {metrics['num_samples']} rows")
+            
+            # Track data volume and time to submit for participant selection and deadline prediction
+            update_participant_stats(
+                participant_id,
+                data_volume=metrics["num_samples"] or metrics["validation_samples"],
+                duration_seconds=duration
+            )
+            
             logger.info(f"📊 [AGGREGATOR] Using self-reported metrics for {participant_id}: accuracy={metrics['accuracy']:.4f}")
         else:
             # No reported metrics, do basic structural checks
@@ -306,15 +396,22 @@ def evaluate_model_quality(model, weights, participant_id, round_id, model_uri):
         logger.error(f"❌ [AGGREGATOR] Error evaluating model: {e}")
         return {"quality_score": 0.0, "error": str(e), "reputation": get_participant_reputation(participant_id)}
 
+def parse_training_stat(training_stats, key):
+    """Parses a numeric trainingStats value, returning 0.0 if it is missing or malformed."""
+    try:
+        return float(training_stats.get(key, 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
 def update_participant_history(participant_id, metrics):
     """Updates historical performance metrics for a participant."""
-    if participant_id not in threshold_state["participant_history"]:
-        threshold_state["participant_history"][participant_id] = []
-    
-    # Add new metrics, keeping only the last THRESHOLD_HISTORY_SIZE entries
-    threshold_state["participant_history"][participant_id].append(metrics)
-    if len(threshold_state["participant_history"][participant_id]) > THRESHOLD_HISTORY_SIZE:
-        threshold_state["participant_history"][participant_id].pop(0)
+    with reputation_lock:
+        history = threshold_state["participant_history"].setdefault(participant_id, [])
+        
+        # Add new metrics, keeping only the last THRESHOLD_HISTORY_SIZE entries
+        history.append(metrics)
+        if len(history) > THRESHOLD_HISTORY_SIZE:
+            history.pop(0)
 
 def get_dynamic_threshold(round_id):
     """Calculates the dynamic threshold based on historical performance and participant reputations."""
@@ -518,11 +615,15 @@ def federated_averaging_with_reputation(model_paths, participant_ids, model_uris
     accepted_weights = []
     reputation_weights = []
     
-    for participant_id in accepted_models:
+    # FedAvg weights each client by its training-set size; only used when every accepted client reported it
+    sample_counts = [model_metrics[participant_id].get("num_samples", 0) for participant_id in accepted_models]
+    use_sample_counts = SAMPLE_COUNT_WEIGHTING and all(count > 0 for count in sample_counts)
+    
+    for participant_id, num_samples in zip(accepted_models, sample_counts):
         accepted_weights.append(model_data[participant_id])
         # Use reputation as aggregation weight
         reputation = get_participant_reputation(participant_id)
-        reputation_weights.append(reputation)
+        reputation_weights.append(reputation * num_samples if use_sample_counts else reputation)
     
     # Normalize reputation weights
     sum_weights = sum(reputation_weights)
@@ -532,7 +633,8 @@ def federated_averaging_with_reputation(model_paths, participant_ids, model_uris
         # Fallback to equal weighting if all reputations are zero
         norm_weights = [1.0 / len(accepted_models)] * len(accepted_models)
     
-    logger.info(f"⚖️ [AGGREGATOR] Aggregating with reputation weights: {list(zip(accepted_models, norm_weights))}")
+    weighting = "reputation x sample count" if use_sample_counts else "reputation"
+    logger.info(f"⚖️ [AGGREGATOR] Aggregating with {weighting} weights: {list(zip(accepted_models, norm_weights))}")
     
     # Weighted averaging of each layer
     avg_weights = []
@@ -545,60 +647,59 @@ def federated_averaging_with_reputation(model_paths, participant_ids, model_uris
             
         avg_weights.append(weighted_sum)
     
+    # Apply the server optimizer to the aggregated pseudo-gradient
+    with optimizer_lock:
+        avg_weights = apply_server_update(
+            optimizer_state,
+            avg_weights,
+            optimizer=SERVER_OPTIMIZER,
+            learning_rate=SERVER_LEARNING_RATE,
+            momentum=SERVER_MOMENTUM,
+            beta1=SERVER_BETA1,
+            beta2=SERVER_BETA2,
+            tau=SERVER_TAU
+        )
+    logger.info(f"🧭 [AGGREGATOR] Applied server optimizer {SERVER_OPTIMIZER} (step {optimizer_state['step']})")
+    
     # Save the aggregated model
     aggregated_model_path = os.path.join(MODEL_DIR, f"{round_id}_aggregated_model.h5")
+    save_aggregated_model(avg_weights, aggregated_model_path)
     
+    logger.info(f"✅ [AGGREGATOR] Aggregated model saved: {aggregated_model_path}")
+    return aggregated_model_path
+
+def save_aggregated_model(weights, model_path):
+    """Builds a model with the client architecture, loads the given weights and saves it."""
     # Create a model with the same architecture
     model = tf.keras.Sequential()
-    input_shape = accepted_weights[0][0].shape[0]  # Get input shape from first weight matrix
+    input_shape = weights[0].shape[0]  # Get input shape from first weight matrix
     
     model.add(tf.keras.layers.Dense(64, activation='relu', input_shape=(input_shape,)))
     model.add(tf.keras.layers.Dense(32, activation='relu'))
     model.add(tf.keras.layers.Dense(1, activation='sigmoid'))
     
     model.compile(optimizer="adam", loss="binary_crossentropy", metrics=["accuracy"])
-    model.set_weights(avg_weights)
-    model.save(aggregated_model_path)
-    
-    logger.info(f"✅ [AGGREGATOR] Aggregated model saved: {aggregated_model_path}")
-    return aggregated_model_path
+    model.set_weights(weights)
+    model.save(model_path)
+    return model_path
 
 def upload_model_to_minio(model_path, round_id):
-    """Uploads the aggregated model to MinIO via MinIO-Handler."""
-    logger.info(f"📤 [AGGREGATOR] Requesting upload URL for final model (round {round_id})...")
-
-    response = requests.post(
-        f"{MINIO_HANDLER_URL}/upload",
-        json={"roundId": round_id, "bankId": "aggregator"}
-    )
-
-    if response.status_code != 200:
-        logger.error(f"❌ [AGGREGATOR] Failed to get upload URL: {response.text}")
-        return None
-
-    upload_url = response.json()["uploadUrl"]
-    logger.info(f"📤 [AGGREGATOR] Uploading aggregated model to MinIO...")
+    """Streams the aggregated model to MinIO via MinIO-Handler; returns (object_path, weight_hash)."""
+    logger.info(f"📤 [AGGREGATOR] Uploading aggregated model to MinIO (round {round_id})...")
 
-    with open(model_path, "rb") as file:
-        upload_response = requests.put(upload_url, data=file)
+    # The SHA-256 is computed while streaming, so the model is read from disk once
+    object_path, weight_hash = upload_file(MINIO_HANDLER_URL, model_path, round_id, "aggregator", "[AGGREGATOR]", logger.info)
 
-    if upload_response.status_code == 200:
+    if object_path:
         logger.info(f"✅ [AGGREGATOR] Aggregated model successfully uploaded to MinIO.")
-        return response.json()["objectPath"]
     else:
-        logger.error(f"❌ [AGGREGATOR] Failed to upload aggregated model: {upload_response.text}")
-        return None
+        logger.error(f"❌ [AGGREGATOR] Failed to upload aggregated model")
+    return object_path, weight_hash
 
-def submit_final_model(round_id, model_uri, quality_data):
+def submit_final_model(round_id, model_uri, quality_data, weight_hash):
     """Submits the final aggregated model to Fabric API with quality metrics."""
     logger.info(f"📩 [AGGREGATOR] Submitting final aggregated model for round {round_id}...")
 
-    # Calculate a hash for the aggregated model
-    aggregated_model_path = os.path.join(MODEL_DIR, f"{round_id}_aggregated_model.h5")
-    with open(aggregated_model_path, "rb") as f:
-        model_data = f.read()
-        weight_hash = hashlib.sha256(model_data).hexdigest()
-
     # Add reputation data to quality data
     reputation_data = {
         participant_id: get_participant_reputation(participant_id)
@@ -621,25 +722,196 @@ def submit_final_model(round_id, model_uri, quality_data):
     else:
         logger.error(f"❌ [AGGREGATOR] Failed to submit final model: {response.text}")
 
-def get_round_info(round_id):
-    """Get information about an active round, creating it if it doesn't exist."""
-    if round_id not in active_rounds:
-        active_rounds[round_id] = {
-            "start_time": datetime.now(),
-            "expected_participants": DEFAULT_PARTICIPANTS.copy(),
-            "submissions": {},
-            "processing": False
-        }
-        logger.info(f"🆕 [AGGREGATOR] Created new round tracking for {round_id} with expected participants: {active_rounds[round_id]['expected_participants']}")
-    return active_rounds[round_id]
+def load_participant_registry():
+    """Reloads the registered participants from the ledger. Makes an HTTP call, so it runs on a background thread."""
+    participants = set(DEFAULT_PARTICIPANTS)
+    loaded = False
+    try:
+        response = requests.get(f"{FABRIC_API_URL}/reputations")
+        if response.status_code == 200:
+            for record in response.json() or []:
+                participant_id = record.get("participantID")
+                if participant_id:
+                    participants.add(participant_id)
+            loaded = True
+        else:
+            logger.warning(f"⚠️ [AGGREGATOR] Failed to load participant registry: {response.text}")
+    except Exception as e:
+        logger.warning(f"⚠️ [AGGREGATOR] Error loading participant registry: {e}")
+    
+    with registry_lock:
+        participant_registry["refreshing"] = False
+        # Keep the previous registry if the ledger could not be read
+        if not loaded and participant_registry["participants"]:
+            participants = set(participant_registry["participants"])
+        participant_registry["participants"] = sorted(participants)
+        participant_registry["loaded_at"] = time.time()
+        participant_registry["valid"] = True
+    logger.info(f"📇 [AGGREGATOR] Loaded participant registry with {len(participants)} participants")
+
+def schedule_registry_refresh():
+    """Starts a background reload of the registry unless one is already running."""
+    with registry_lock:
+        if participant_registry["refreshing"]:
+            return
+        participant_registry["refreshing"] = True
+    threading.Thread(target=load_participant_registry, daemon=True).start()
+
+def get_participant_registry():
+    """
+    Returns the cached registered participants without blocking on the ledger. A stale or
+    invalidated cache is refreshed in the background and used by the next round.
+    """
+    with registry_lock:
+        age = time.time() - participant_registry["loaded_at"]
+        participants = list(participant_registry["participants"]) or list(DEFAULT_PARTICIPANTS)
+        stale = not participant_registry["valid"] or age >= REGISTRY_CACHE_TTL_SECONDS
+    
+    if stale:
+        schedule_registry_refresh()
+    return participants
+
+def invalidate_participant_registry(reason):
+    """Marks the cached registry as stale and reloads it in the background before the next round."""
+    with registry_lock:
+        was_valid = participant_registry["valid"]
+        participant_registry["valid"] = False
+    if was_valid:
+        logger.info(f"📇 [AGGREGATOR] Participant registry invalidated: {reason}")
+    schedule_registry_refresh()
+
+def is_registered_participant(participant_id):
+    """Checks the cached registry without triggering a reload."""
+    with registry_lock:
+        return participant_id in participant_registry["participants"]
+
+def update_participant_stats(participant_id, latency_seconds=None, data_volume=None, duration_seconds=None):
+    """Tracks exponentially weighted submission latency, reported training duration and data volume for a participant."""
+    with reputation_lock:
+        stats = threshold_state["participant_stats"].setdefault(participant_id, {})
+        
+        for key, value in (("avg_latency", latency_seconds), ("data_volume", data_volume), ("avg_duration", duration_seconds)):
+            if value is None or value <= 0:
+                continue
+            if key in stats:
+                stats[key] = (1 - PARTICIPANT_STATS_DECAY) * stats[key] + PARTICIPANT_STATS_DECAY * float(value)
+            else:
+                stats[key] = float(value)
+
+def get_selection_weight(participant_id, median_volume):
+    """Computes a participant's selection weight from reputation, historical latency and data volume."""
+    stats = threshold_state["participant_stats"].get(participant_id, {})
+    reputation = threshold_state["reputation_scores"].get(participant_id, REPUTATION_INIT)
+    
+    # Slow participants are less likely to be picked (unknown latency counts as on time)
+    latency_factor = 1.0 / (1.0 + stats.get("avg_latency", 0.0) / (ROUND_TIMEOUT_MINUTES * 60))
+    
+    # Participants with more data are more likely to be picked (clipped to avoid domination)
+    if "data_volume" in stats and median_volume > 0:
+        volume_factor = min(max(np.sqrt(stats["data_volume"] / median_volume), 0.5), 2.0)
+    else:
+        volume_factor = 1.0
+    
+    return max(reputation * latency_factor * volume_factor, 1e-6)
+
+def predict_submission_seconds(participant_id):
+    """Predicts seconds from round start to a participant's submission, or None without history."""
+    stats = threshold_state["participant_stats"].get(participant_id, {})
+    # Prefer the client's own load + train + upload telemetry over the observed arrival latency
+    return stats.get("avg_duration", stats.get("avg_latency"))
+
+def select_round_participants(round_id):
+    """Selects the participants for a round, sampling ROUND_SAMPLE_SIZE of them weighted by selection score."""
+    registry = get_participant_registry()
+    
+    if ROUND_SAMPLE_SIZE <= 0 or ROUND_SAMPLE_SIZE >= len(registry):
+        return registry
+    
+    volumes = [s["data_volume"] for s in threshold_state["participant_stats"].values() if "data_volume" in s]
+    median_volume = float(np.median(volumes)) if volumes else 0.0
+    
+    # Weighted sampling without replacement (Efraimidis-Spirakis): keep the k largest u^(1/w) keys
+    keys = (
+        (np.random.random() ** (1.0 / get_selection_weight(pid, median_volume)), pid)
+        for pid in registry
+    )
+    selected = sorted(pid for _, pid in heapq.nlargest(ROUND_SAMPLE_SIZE, keys))
+    
+    logger.info(f"🎯 [AGGREGATOR] Selected {len(selected)}/{len(registry)} participants for round {round_id}: {selected}")
+    return selected
+
+def announce_round_participants(round_id, participants):
+    """Records the selected participants in the round metadata on the ledger."""
+    try:
+        response = requests.post(
+            f"{FABRIC_API_URL}/rounds/participants",
+            json={"roundId": round_id, "participants": participants}
+        )
+        
+        if response.status_code == 200:
+            logger.info(f"✅ [AGGREGATOR] Announced {len(participants)} selected participants for round {round_id}")
+        else:
+            logger.warning(f"⚠️ [AGGREGATOR] Failed to announce participants for round {round_id}: {response.text}")
+    except Exception as e:
+        logger.error(f"❌ [AGGREGATOR] Error announcing participants: {e}")
+
+def get_round_info(round_id, deadline=None):
+    """Get information about an active round, creating it if it doesn't exist. Returns None for rounds already aggregated."""
+    created = False
+    with active_rounds_lock:
+        if round_id in completed_rounds:
+            return None
+        
+        if round_id not in active_rounds:
+            start_time = datetime.now()
+            active_rounds[round_id] = {
+                "start_time": start_time,
+                "deadline": start_time + timedelta(minutes=ROUND_TIMEOUT_MINUTES),
+                "expected_participants": select_round_participants(round_id),
+                "submissions": {},
+                "processing": False
+            }
+            round_locks[round_id] = threading.Lock()
+            created = True
+            logger.info(f"🆕 [AGGREGATOR] Created new round tracking for {round_id} with expected participants: {active_rounds[round_id]['expected_participants']}")
+        
+        round_info = active_rounds[round_id]
+        # Prefer the deadline recorded on the ledger, which clients budget their training against
+        if deadline is not None:
+            round_info["deadline"] = datetime.fromtimestamp(deadline)
+    
+    if created:
+        # Announce the selection without blocking the event listener
+        threading.Thread(
+            target=announce_round_participants,
+            args=(round_id, round_info["expected_participants"]),
+            daemon=True
+        ).start()
+    return round_info
 
 def handle_model_submission(round_id, participant_id, model_uri):
     """Handle a model submission from a participant."""
     round_info = get_round_info(round_id)
+    if round_info is None:
+        logger.info(f"ℹ️ [AGGREGATOR] Ignoring late submission from {participant_id}: round {round_id} has already been aggregated")
+        return False
+    if round_info["processing"]:
+        logger.info(f"ℹ️ [AGGREGATOR] Ignoring late submission from {participant_id}: round {round_id} is already being aggregated")
+        return False
+    
+    if not is_registered_participant(participant_id):
+        invalidate_participant_registry(f"submission from unregistered participant {participant_id}")
+    
+    # Only selected participants contribute when rounds are sampled
+    if ROUND_SAMPLE_SIZE > 0 and participant_id not in round_info["expected_participants"]:
+        logger.info(f"🚫 [AGGREGATOR] Ignoring submission from {participant_id}: not selected for round {round_id}")
+        return False
     
     # Add submission
     round_info["submissions"][participant_id] = model_uri
-    logger.info(f"📬 [AGGREGATOR] Model submission from {participant_id} for round {round_id}")
+    latency = (datetime.now() - round_info["start_time"]).total_seconds()
+    update_participant_stats(participant_id, latency_seconds=latency)
+    logger.info(f"📬 [AGGREGATOR] Model submission from {participant_id} for round {round_id} after {latency:.1f}s")
     
     # Check if all expected participants have submitted
     all_submitted = all(p in round_info["submissions"] for p in round_info["expected_participants"])
@@ -653,12 +925,12 @@ def handle_model_submission(round_id, participant_id, model_uri):
     else:
         # Check if we should start a timeout timer
         if "timeout_timer" not in round_info:
-            logger.info(f"⏱️ [AGGREGATOR] Starting timeout timer for round {round_id}: {ROUND_TIMEOUT_MINUTES} minutes")
-            timeout_time = round_info["start_time"] + timedelta(minutes=ROUND_TIMEOUT_MINUTES)
+            timeout_time = round_info["deadline"]
             round_info["timeout_timer"] = timeout_time
             
-            # Schedule a check after the timeout
-            timeout_seconds = ROUND_TIMEOUT_MINUTES * 60
+            # Schedule a check at the round deadline
+            timeout_seconds = max(0.0, (timeout_time - datetime.now()).total_seconds())
+            logger.info(f"⏱️ [AGGREGATOR] Starting timeout timer for round {round_id}: deadline in {timeout_seconds:.0f}s")
             # Start a thread that will check the round status after the timeout
             t = threading.Thread(target=check_round_timeout, args=(round_id, timeout_seconds), daemon=True)
             t.start()
@@ -667,6 +939,19 @@ def handle_model_submission(round_id, participant_id, model_uri):
         missing = [p for p in round_info["expected_participants"] if p not in round_info["submissions"]]
         logger.info(f"⏳ [AGGREGATOR] Waiting for submissions from: {', '.join(missing)} for round {round_id}")
         
+        # Stop waiting early if every missing participant is predicted to miss the deadline
+        if EARLY_CLOSE_ON_PREDICTED_MISS:
+            predictions = {p: predict_submission_seconds(p) for p in missing}
+            if all(seconds is not None for seconds in predictions.values()):
+                deadline_seconds = (round_info["deadline"] - round_info["start_time"]).total_seconds()
+                if all(seconds > deadline_seconds for seconds in predictions.values()):
+                    predicted = ", ".join(f"{p}~{seconds:.0f}s" for p, seconds in predictions.items())
+                    logger.info(f"🔮 [AGGREGATOR] Remaining participants predicted to miss the {deadline_seconds:.0f}s deadline ({predicted}). Aggregating now.")
+                    # Their slot was closed by a prediction, not by the deadline, so they are not penalized
+                    round_info["closed_early"] = list(missing)
+                    threading.Thread(target=process_round, args=(round_id,), daemon=True).start()
+                    return True
+        
         return False
 
 def check_round_timeout(round_id, timeout_seconds):
@@ -675,100 +960,379 @@ def check_round_timeout(round_id, timeout_seconds):
     time.sleep(timeout_seconds)
     
     # Check if the round is still active and not fully submitted
-    if round_id in active_rounds:
-        round_info = active_rounds[round_id]
+    with active_rounds_lock:
+        round_info = active_rounds.get(round_id)
+    if round_info is not None:
         all_submitted = all(p in round_info["submissions"] for p in round_info["expected_participants"])
         
         if not all_submitted and not round_info.get("processing", False):
-            logger.warning(f"⏰ [AGGREGATOR] Round {round_id} timed out after {ROUND_TIMEOUT_MINUTES} minutes")
+            logger.warning(f"⏰ [AGGREGATOR] Round {round_id} reached its deadline after {timeout_seconds:.0f}s")
             # Process the round with whatever submissions we have
             process_round(round_id)
 
+def request_round_profile(source):
+    """Arms profiling for the next processed round."""
+    profile_state["armed"] = True
+    logger.info(f"🔬 [AGGREGATOR] Profiling armed for the next round (requested by {source})")
+
+def consume_profile_request(round_id):
+    """Returns True (once) if the next round should be profiled."""
+    # Cheap check on the hot path: one flag and one stat() call per round
+    if os.path.exists(PROFILE_TRIGGER_FILE):
+        try:
+            os.remove(PROFILE_TRIGGER_FILE)
+        except OSError:
+            pass
+        profile_state["armed"] = True
+    
+    if not profile_state["armed"]:
+        return False
+    
+    profile_state["armed"] = False
+    logger.info(f"🔬 [AGGREGATOR] Profiling round {round_id}")
+    return True
+
+def run_profiled(round_id, func, *args):
+    """Runs func under cProfile and tracemalloc and writes reports to MODEL_DIR/profiles/<round_id>/."""
+    profile_dir = os.path.join(MODEL_DIR, "profiles", round_id)
+    os.makedirs(profile_dir, exist_ok=True)
+    
+    profiler = cProfile.Profile()
+    tracemalloc.start(25)
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        return func(*args)
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        snapshot = tracemalloc.take_snapshot()
+        current_mem, peak_mem = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        try:
+            # Raw profile, loadable with pstats / snakeviz
+            profiler.dump_stats(os.path.join(profile_dir, "profile.prof"))
+            
+            # Per-function timing summary
+            with open(os.path.join(profile_dir, "timing_summary.txt"), "w") as f:
+                f.write(f"Round: {round_id}\nWall time: {elapsed:.3f}s\n\n")
+                stats = pstats.Stats(profiler, stream=f)
+                stats.sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+                stats.sort_stats("tottime").print_stats(PROFILE_TOP_N)
+            
+            # Top allocations by source line
+            with open(os.path.join(profile_dir, "top_allocations.txt"), "w") as f:
+                f.write(f"Round: {round_id}\nCurrent traced memory: {current_mem / 1024 / 1024:.2f} MiB\n")
+                f.write(f"Peak traced memory: {peak_mem / 1024 / 1024:.2f} MiB\n\n")
+                for stat in snapshot.statistics("lineno")[:PROFILE_TOP_N]:
+                    f.write(f"{stat}\n")
+            
+            logger.info(f"🔬 [AGGREGATOR] Profile for round {round_id} written to {profile_dir} ({elapsed:.2f}s, peak {peak_mem / 1024 / 1024:.1f} MiB)")
+        except Exception as e:
+            logger.error(f"❌ [AGGREGATOR] Failed to write profile for round {round_id}: {e}")
+
 def process_round(round_id):
     """Process a round by downloading models, aggregating them, and submitting the result."""
-    # Check if the round exists and is not already being processed
-    if round_id not in active_rounds:
+    with active_rounds_lock:
+        if round_id in completed_rounds:
+            logger.info(f"ℹ️ [AGGREGATOR] Round {round_id} has already been aggregated")
+            return
+        round_info = active_rounds.get(round_id)
+        round_lock = round_locks.get(round_id)
+    
+    if round_info is None:
         logger.error(f"❌ [AGGREGATOR] Cannot process round {round_id}: round not found")
         return
     
-    round_info = active_rounds[round_id]
-    
-    # Prevent duplicate processing
-    if round_info.get("processing", False):
+    # Only one thread aggregates a round; the submission, early-close and timeout paths may all try
+    if not round_lock.acquire(blocking=False):
         logger.warning(f"⚠️ [AGGREGATOR] Round {round_id} is already being processed")
         return
     
-    round_info["processing"] = True
-    
     try:
-        logger.info(f"🚀 [AGGREGATOR] Processing round {round_id}")
-        
-        # Get submissions and expected participants
-        submissions = round_info["submissions"]
-        expected_participants = round_info["expected_participants"]
-        
-        # Check for non-participants and penalize them
-        non_participants = check_for_non_participants(round_id, list(submissions.keys()), expected_participants)
+        if round_info.get("completed", False):
+            logger.info(f"ℹ️ [AGGREGATOR] Round {round_id} has already been aggregated")
+            return
         
-        # Download all models from participants who submitted
-        model_paths = []
-        participant_ids = []
-        model_uris = []
+        round_info["processing"] = True
+        try:
+            if consume_profile_request(round_id):
+                run_profiled(round_id, aggregate_round, round_id, round_info)
+            else:
+                aggregate_round(round_id, round_info)
+        except Exception as e:
+            logger.error(f"❌ [AGGREGATOR] Error processing round {round_id}: {e}")
+        finally:
+            # Always mark processing as done, even if we fail
+            round_info["processing"] = False
         
-        for participant_id, model_uri in submissions.items():
-            model_path = fetch_model_from_minio(round_id, participant_id)
-            if model_path:
-                model_paths.append(model_path)
-                participant_ids.append(participant_id)
-                model_uris.append(model_uri)
+        # A failed round stays active so another submission can retry it with the same participants
+        if round_info.get("completed", False):
+            with active_rounds_lock:
+                active_rounds.pop(round_id, None)
+                round_locks.pop(round_id, None)
+            logger.info(f"🧹 [AGGREGATOR] Removed round {round_id} from active rounds")
+    finally:
+        round_lock.release()
 
-        if not model_paths:
-            logger.error(f"❌ [AGGREGATOR] No models downloaded. Aborting aggregation for round {round_id}.")
-            return
+def aggregate_round(round_id, round_info):
+    """Downloads the round's models, aggregates them, and submits the result."""
+    logger.info(f"🚀 [AGGREGATOR] Processing round {round_id}")
+    
+    # Get submissions (a snapshot; the event listener keeps adding to the dict) and expected participants
+    submissions = dict(round_info["submissions"])
+    expected_participants = round_info["expected_participants"]
+    
+    # Check for non-participants and penalize them, except banks whose slot was closed early by prediction
+    closed_early = [p for p in round_info.get("closed_early", []) if p not in submissions]
+    if closed_early:
+        logger.info(f"🔮 [AGGREGATOR] Not penalizing {', '.join(closed_early)}: round {round_id} closed before the deadline")
+    penalized_participants = [p for p in expected_participants if p not in closed_early]
+    non_participants = check_for_non_participants(round_id, list(submissions.keys()), penalized_participants)
+    
+    # Download all models from participants who submitted
+    model_paths = []
+    participant_ids = []
+    model_uris = []
+    
+    for participant_id, model_uri in submissions.items():
+        model_path = fetch_model_from_minio(round_id, participant_id)
+        if model_path:
+            model_paths.append(model_path)
+            participant_ids.append(participant_id)
+            model_uris.append(model_uri)
+    
+    if not model_paths:
+        logger.error(f"❌ [AGGREGATOR] No models downloaded. Aborting aggregation for round {round_id}.")
+        return
+    
+    # Perform aggregation with quality filtering and reputation weighting
+    aggregated_model_path = federated_averaging_with_reputation(model_paths, participant_ids, model_uris, round_id)
+    if not aggregated_model_path:
+        logger.error(f"❌ [AGGREGATOR] Failed to aggregate models. Aborting.")
+        return
+    
+    # Upload aggregated model
+    final_model_uri, weight_hash = upload_model_to_minio(aggregated_model_path, round_id)
+    if not final_model_uri:
+        logger.error(f"❌ [AGGREGATOR] Failed to upload aggregated model. Aborting.")
+        return
+    
+    # Prepare quality data for blockchain
+    quality_data = {
+        "threshold": threshold_state["current_threshold"],
+        "round_history": threshold_state["round_history"][-1] if threshold_state["round_history"] else None,
+        "participants_accepted": len(model_paths),
+        "total_participants": len(submissions),
+        "non_participants": len(non_participants),
+        "avg_reputation": sum(threshold_state["reputation_scores"].values()) / len(threshold_state["reputation_scores"]) if threshold_state["reputation_scores"] else 0.0
+    }
+    
+    # Submit final model to blockchain
+    submit_final_model(round_id, final_model_uri, quality_data, weight_hash)
+    
+    # Mark round as complete, so late events for it are ignored from now on
+    round_info["completed"] = True
+    with active_rounds_lock:
+        completed_rounds.add(round_id)
+    
+    # Persist threshold, reputation and server optimizer state after every round
+    save_state()
+    logger.info(f"✅ [AGGREGATOR] Round {round_id} processing completed successfully")
 
-        # Perform aggregation with quality filtering and reputation weighting
-        aggregated_model_path = federated_averaging_with_reputation(model_paths, participant_ids, model_uris, round_id)
-        if not aggregated_model_path:
-            logger.error(f"❌ [AGGREGATOR] Failed to aggregate models. Aborting.")
-            return
+def new_async_session(version, global_weights):
+    """Builds an async session at a given global version with its retained per-version weights."""
+    return {
+        "version": version,  # Global model version
+        "global_weights": global_weights,  # Map of version -> weights, kept for ASYNC_MAX_STALENESS versions
+        "buffer": [],  # Pending updates: dicts with participant_id, model_path, base_version, metrics
+        "lock": threading.Lock(),  # Guards version and buffer
+        "publish_lock": threading.Lock()  # Serializes publication of new versions
+    }
 
-        # Upload aggregated model
-        final_model_uri = upload_model_to_minio(aggregated_model_path, round_id)
-        if not final_model_uri:
-            logger.error(f"❌ [AGGREGATOR] Failed to upload aggregated model. Aborting.")
-            return
+def get_async_session(round_id):
+    """Get the buffered async session for a round, creating it if it doesn't exist."""
+    with async_sessions_lock:
+        if round_id not in async_sessions:
+            # Version 0 is the latest published global model, which clients start their first jobs from
+            with optimizer_lock:
+                initial_weights = optimizer_state["global_weights"]
+                initial_weights = [w.copy() for w in initial_weights] if initial_weights is not None else None
+            async_sessions[round_id] = new_async_session(0, {0: initial_weights} if initial_weights is not None else {})
+            logger.info(f"🆕 [AGGREGATOR] Created async session for round {round_id} (buffer size: {ASYNC_BUFFER_SIZE})")
+        return async_sessions[round_id]
 
-        # Prepare quality data for blockchain
-        quality_data = {
-            "threshold": threshold_state["current_threshold"],
-            "round_history": threshold_state["round_history"][-1] if threshold_state["round_history"] else None,
-            "participants_accepted": len(model_paths),
-            "total_participants": len(submissions),
-            "non_participants": len(non_participants),
-            "avg_reputation": sum(threshold_state["reputation_scores"].values()) / len(threshold_state["reputation_scores"]) if threshold_state["reputation_scores"] else 0.0
-        }
+def parse_base_version(model_uri):
+    """Extracts the global model version a client update started from (".../v<version>/...")."""
+    match = re.search(r"/v(\d+)/", model_uri or "")
+    return int(match.group(1)) if match else 0
+
+def staleness_weight(staleness):
+    """Polynomial staleness discount used to down-weight updates computed on old global versions."""
+    return 1.0 / ((1.0 + staleness) ** ASYNC_STALENESS_EXPONENT)
 
-        # Submit final model to blockchain
-        submit_final_model(round_id, final_model_uri, quality_data)
+def handle_async_submission(round_id, participant_id, model_uri):
+    """Handles a model submission in async mode: evaluates it and adds it to the round buffer."""
+    session = get_async_session(round_id)
+    base_version = parse_base_version(model_uri)
+    
+    with session["lock"]:
+        staleness = session["version"] - base_version
+        # Without its base weights an update cannot be turned into a delta; only a session with no
+        # global model at all (whose first version averages full models) can use it
+        known_base = base_version in session["global_weights"] or not session["global_weights"]
+    
+    if staleness > ASYNC_MAX_STALENESS or not known_base:
+        logger.warning(f"⚠️ [AGGREGATOR] Dropping stale update from {participant_id} (base v{base_version}, staleness {staleness})")
+        return
+    
+    # Async uploads are stored under "<round>/async/v<base>/<model_id>.weights"
+    model_path = fetch_model_from_minio(os.path.dirname(model_uri), os.path.splitext(os.path.basename(model_uri))[0])
+    if not model_path:
+        return
+    
+    result = load_model_weights(model_path)
+    if result is None:
+        return
+    weights, model = result
+    
+    # Evaluate and accept or reject the update against the current threshold
+    metrics = evaluate_model_quality(model, weights, participant_id, round_id, model_uri)
+    reputation = metrics.get("reputation", get_participant_reputation(participant_id))
+    adjusted_threshold = max(threshold_state["current_threshold"] * (1 - reputation * 0.1), MIN_THRESHOLD)
+    accepted = metrics["quality_score"] >= adjusted_threshold
+    
+    if accepted:
+        reason = f"Model accepted (quality score: {metrics['quality_score']:.4f})"
+    else:
+        reason = f"Model rejected (quality score: {metrics['quality_score']:.4f}, below threshold: {adjusted_threshold:.4f})"
+    update_participant_reputation(participant_id, metrics["quality_score"], accepted, reason, round_id)
+    
+    if not accepted:
+        logger.info(f"🔍 [AGGREGATOR] Rejected async update from {participant_id} for round {round_id}")
+        return
+    
+    with session["lock"]:
+        session["buffer"].append({
+            "participant_id": participant_id,
+            "model_uri": model_uri,
+            "weights": weights,
+            "base_version": base_version,
+            "metrics": metrics
+        })
+        buffered = len(session["buffer"])
+        logger.info(f"📥 [AGGREGATOR] Buffered update from {participant_id} (base v{base_version}, {buffered}/{ASYNC_BUFFER_SIZE}) for round {round_id}")
         
-        # Mark round as complete
-        round_info["completed"] = True
-        logger.info(f"✅ [AGGREGATOR] Round {round_id} processing completed successfully")
+        if buffered < ASYNC_BUFFER_SIZE:
+            return
         
-    except Exception as e:
-        logger.error(f"❌ [AGGREGATOR] Error processing round {round_id}: {e}")
-    finally:
-        # Always mark processing as done, even if we fail
-        round_info["processing"] = False
-        
-        # Remove the round from active rounds after a delay to avoid processing it again
-        def remove_round():
-            time.sleep(60)  # Wait 1 minute before removing
-            if round_id in active_rounds:
-                del active_rounds[round_id]
-                logger.info(f"🧹 [AGGREGATOR] Removed round {round_id} from active rounds")
-                
-        threading.Thread(target=remove_round, daemon=True).start()
+        updates = session["buffer"][:ASYNC_BUFFER_SIZE]
+        session["buffer"] = session["buffer"][ASYNC_BUFFER_SIZE:]
+    
+    publish_async_version(round_id, updates)
+
+def publish_async_version(round_id, updates):
+    """Aggregates a full buffer with staleness-discounted weighting and publishes a new global version."""
+    session = get_async_session(round_id)
+    
+    with session["publish_lock"]:
+        try:
+            current_version = session["version"]
+            current_weights = session["global_weights"].get(current_version)
+            
+            # Updates whose base version has been pruned (or never existed) cannot contribute a delta
+            if current_weights is not None:
+                for update in updates:
+                    if update["base_version"] not in session["global_weights"]:
+                        logger.warning(f"⚠️ [AGGREGATOR] Dropping update from {update['participant_id']}: base v{update['base_version']} is no longer available")
+                updates = [update for update in updates if update["base_version"] in session["global_weights"]]
+                if not updates:
+                    return
+            
+            # Weight each update by reputation and staleness
+            update_weights = []
+            for update in updates:
+                staleness = current_version - update["base_version"]
+                weight = get_participant_reputation(update["participant_id"]) * staleness_weight(staleness)
+                update_weights.append(weight)
+                logger.info(f"⚖️ [AGGREGATOR] Update from {update['participant_id']}: staleness {staleness}, weight {weight:.4f}")
+            
+            sum_weights = sum(update_weights)
+            if sum_weights > 0:
+                norm_weights = [w / sum_weights for w in update_weights]
+            else:
+                norm_weights = [1.0 / len(updates)] * len(updates)
+            
+            proposal = []
+            for layer_idx in range(len(updates[0]["weights"])):
+                if current_weights is None:
+                    # First version: plain weighted average of the full client models
+                    layer = sum(update["weights"][layer_idx] * norm_weights[idx] for idx, update in enumerate(updates))
+                else:
+                    # Average the client deltas relative to the version each update started from
+                    layer = current_weights[layer_idx].copy()
+                    for idx, update in enumerate(updates):
+                        base_weights = session["global_weights"][update["base_version"]]
+                        layer += (update["weights"][layer_idx] - base_weights[layer_idx]) * norm_weights[idx]
+                proposal.append(layer)
+            
+            # Apply the server optimizer to the buffered pseudo-gradient
+            with optimizer_lock:
+                new_weights = apply_server_update(
+                    optimizer_state,
+                    proposal,
+                    optimizer=SERVER_OPTIMIZER,
+                    learning_rate=SERVER_LEARNING_RATE,
+                    momentum=SERVER_MOMENTUM,
+                    beta1=SERVER_BETA1,
+                    beta2=SERVER_BETA2,
+                    tau=SERVER_TAU
+                )
+            
+            new_version = current_version + 1
+            model_path = os.path.join(MODEL_DIR, f"{round_id}_v{new_version}_aggregated_model.h5")
+            save_aggregated_model(new_weights, model_path)
+            logger.info(f"✅ [AGGREGATOR] Async global model v{new_version} saved: {model_path}")
+            
+            # Record quality history for this version (latest update per participant)
+            model_metrics = {update["participant_id"]: update["metrics"] for update in updates}
+            accepted_models = list(model_metrics.keys())
+            round_data = update_round_history(round_id, model_metrics, accepted_models)
+            record_quality_metrics(round_id, round_data, model_metrics, accepted_models, [])
+            
+            # Publish the new version under "<round>/async/v<version>/aggregator.weights"
+            final_model_uri, weight_hash = upload_model_to_minio(model_path, f"{round_id}/async/v{new_version}")
+            if not final_model_uri:
+                logger.error(f"❌ [AGGREGATOR] Failed to upload async global model v{new_version}")
+                return
+            
+            quality_data = {
+                "threshold": threshold_state["current_threshold"],
+                "round_history": round_data,
+                "participants_accepted": len(updates),
+                "total_participants": len(updates),
+                "non_participants": 0,
+                "avg_reputation": sum(threshold_state["reputation_scores"].values()) / len(threshold_state["reputation_scores"]) if threshold_state["reputation_scores"] else 0.0,
+                "model_version": new_version,
+                "max_staleness": max(current_version - update["base_version"] for update in updates)
+            }
+            
+            with session["lock"]:
+                session["version"] = new_version
+                session["global_weights"][new_version] = new_weights
+                # Keep only versions that can still be used as a base
+                for version in list(session["global_weights"].keys()):
+                    if version < new_version - ASYNC_MAX_STALENESS:
+                        del session["global_weights"][version]
+            
+            # Persist the version before announcing it, so clients never build on a version lost in a restart
+            save_state()
+            submit_final_model(round_id, final_model_uri, quality_data, weight_hash)
+            logger.info(f"🔁 [AGGREGATOR] Published global version {new_version} for round {round_id}")
+            
+        except Exception as e:
+            logger.error(f"❌ [AGGREGATOR] Error publishing async version for round {round_id}: {e}")
 
 def on_message(ws, message):
     """Handles incoming WebSocket messages."""
@@ -785,12 +1349,21 @@ def on_message(ws, message):
             round_id = event_data.get("round_id")
             initiator = event_data.get("initiator")
             description = event_data.get("description")
+            deadline = float(event_data["deadline"]) if event_data.get("deadline") else None
             
             logger.info(f"🚀 [AGGREGATOR] New training round started: {round_id}")
             
-            # Initialize round tracking with default participants
-            round_info = get_round_info(round_id)
-            logger.info(f"🔍 [AGGREGATOR] Tracking round {round_id} with expected participants: {round_info['expected_participants']}")
+            if AGGREGATION_MODE == "async":
+                # Open a buffered session that publishes a new global version every ASYNC_BUFFER_SIZE updates
+                session = get_async_session(round_id)
+                logger.info(f"🔁 [AGGREGATOR] Async session for round {round_id} at global version {session['version']}")
+            else:
+                # Initialize round tracking with default participants
+                round_info = get_round_info(round_id, deadline)
+                if round_info is None:
+                    logger.info(f"ℹ️ [AGGREGATOR] Round {round_id} has already been aggregated")
+                    return
+                logger.info(f"🔍 [AGGREGATOR] Tracking round {round_id} with expected participants: {round_info['expected_participants']} (deadline {round_info['deadline']:%H:%M:%S})")
             
         elif event_type == "MODEL_UPLOADED":
             # Parse event data
@@ -802,23 +1375,36 @@ def on_message(ws, message):
             logger.info(f"📬 [AGGREGATOR] Model uploaded for round {round_id} by {participant_id}: {model_uri}")
             
             # Handle the model submission
-            handle_model_submission(round_id, participant_id, model_uri)
+            if AGGREGATION_MODE == "async":
+                threading.Thread(target=handle_async_submission, args=(round_id, participant_id, model_uri), daemon=True).start()
+            else:
+                handle_model_submission(round_id, participant_id, model_uri)
             
-        # Legacy support for direct aggregation command (deprecated)
-        elif event_type == "START_AGGREGATION":
-            # Parse command data
-            round_id = data.get("round_id")
-            submissions = data.get("submissions", {})
+        elif event_type == "REPUTATION_UPDATED":
+            # A reputation record for an unknown participant means membership changed
+            event_data = json.loads(data.get("data", "{}"))
+            participant_id = event_data.get("participant_id")
+            if participant_id and not is_registered_participant(participant_id):
+                invalidate_participant_registry(f"reputation record created for {participant_id}")
             
-            logger.warning(f"⚠️ [AGGREGATOR] Received legacy START_AGGREGATION command for round {round_id}")
+        elif event_type == "ROUND_PARTICIPANTS_UPDATED":
+            # Our own announcement echoes back; any other change (bank opt-in/opt-out) alters membership
+            event_data = json.loads(data.get("data", "{}"))
+            round_id = event_data.get("round_id")
+            participants = sorted(event_data.get("participants") or [])
+            with active_rounds_lock:
+                round_info = active_rounds.get(round_id)
+                announced = round_info is not None and participants == sorted(round_info["expected_participants"])
+            if not announced:
+                invalidate_participant_registry(f"participants of round {round_id} changed on the ledger")
             
-            # Update round tracking
-            round_info = get_round_info(round_id)
-            for participant_id, model_uri in submissions.items():
-                round_info["submissions"][participant_id] = model_uri
-                
-            # Process the round
-            process_round(round_id)
+        elif event_type == "PROFILE_NEXT_ROUND":
+            # Control message: profile the next processed round
+            request_round_profile("control message")
+            
+        # Legacy aggregation command; rounds are now driven by the forwarded MODEL_UPLOADED events
+        elif event_type == "START_AGGREGATION":
+            logger.info(f"ℹ️ [AGGREGATOR] Ignoring legacy START_AGGREGATION command for round {data.get('round_id')}")
 
     except json.JSONDecodeError as e:
         logger.error(f"❌ [AGGREGATOR] Failed to parse WebSocket message: {e}")
@@ -852,17 +1438,81 @@ def start_websocket_listener():
             logger.error(f"❌ [AGGREGATOR] WebSocket error: {e}. Retrying in 5s...")
             time.sleep(5)
 
+def save_async_sessions(path):
+    """Persists each async session's version and retained global weights to an .npz file with a JSON sidecar."""
+    with async_sessions_lock:
+        sessions = list(async_sessions.items())
+    
+    arrays = {}
+    index = {}
+    for session_idx, (round_id, session) in enumerate(sessions):
+        with session["lock"]:
+            version = session["version"]
+            global_weights = dict(session["global_weights"])
+        index[round_id] = {"key": f"s{session_idx}", "version": version, "versions": sorted(global_weights)}
+        for weights_version, weights in global_weights.items():
+            for layer_idx, array in enumerate(weights):
+                arrays[f"s{session_idx}_v{weights_version}_{layer_idx}"] = array
+    
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+    
+    with open(f"{path}.json.tmp", "w") as f:
+        json.dump(index, f)
+    os.replace(f"{path}.json.tmp", f"{path}.json")
+
+def load_async_sessions(path):
+    """Restores async sessions saved by save_async_sessions, so clients can keep building on their last version."""
+    if not os.path.exists(path) or not os.path.exists(f"{path}.json"):
+        return
+    
+    with open(f"{path}.json", "r") as f:
+        index = json.load(f)
+    
+    with np.load(path) as data:
+        for round_id, entry in index.items():
+            global_weights = {}
+            for weights_version in entry["versions"]:
+                prefix = f"{entry['key']}_v{weights_version}_"
+                layers = sorted(
+                    (name for name in data.files if name.startswith(prefix)),
+                    key=lambda name: int(name.rsplit("_", 1)[1])
+                )
+                if layers:
+                    global_weights[weights_version] = [data[name] for name in layers]
+            with async_sessions_lock:
+                async_sessions[round_id] = new_async_session(entry["version"], global_weights)
+            logger.info(f"🔁 [AGGREGATOR] Restored async session for round {round_id} at global version {entry['version']}")
+
 def save_state():
     """Save threshold and reputation state to disk."""
     try:
         threshold_path = os.path.join(MODEL_DIR, "threshold_state.json")
-        with open(threshold_path, 'w') as f:
-            json.dump({
+        with active_rounds_lock:
+            finished_rounds = sorted(completed_rounds)
+        # Serialize under the lock so concurrent submissions cannot change the dicts mid-dump
+        with reputation_lock:
+            state_json = json.dumps({
                 "current_threshold": threshold_state["current_threshold"],
                 "round_history": threshold_state["round_history"],
-                "reputation_scores": threshold_state["reputation_scores"]
-            }, f)
+                "reputation_scores": threshold_state["reputation_scores"],
+                "participant_stats": threshold_state["participant_stats"],
+                "completed_rounds": finished_rounds
+            })
+        with open(threshold_path, 'w') as f:
+            f.write(state_json)
         logger.info(f"💾 [AGGREGATOR] Saved threshold and reputation state")
+        
+        # Save server optimizer tensors alongside the threshold state
+        with optimizer_lock:
+            if optimizer_state["global_weights"] is not None:
+                save_optimizer_state(optimizer_state, os.path.join(MODEL_DIR, "optimizer_state.npz"))
+                logger.info(f"💾 [AGGREGATOR] Saved server optimizer state ({optimizer_state['optimizer']}, step {optimizer_state['step']})")
+        
+        # Save async versions so a restart does not strand clients on a version the aggregator forgot
+        if async_sessions:
+            save_async_sessions(os.path.join(MODEL_DIR, "async_sessions.npz"))
     except Exception as e:
         logger.error(f"❌ [AGGREGATOR] Failed to save state: {e}")
 
@@ -876,10 +1526,20 @@ def load_state():
                 threshold_state["current_threshold"] = saved_state.get("current_threshold", INITIAL_THRESHOLD)
                 threshold_state["round_history"] = saved_state.get("round_history", [])
                 threshold_state["reputation_scores"] = saved_state.get("reputation_scores", {})
+                threshold_state["participant_stats"] = saved_state.get("participant_stats", {})
+                completed_rounds.update(saved_state.get("completed_rounds", []))
                 logger.info(f"📈 [AGGREGATOR] Loaded threshold state: {threshold_state['current_threshold']:.4f}")
                 logger.info(f"📊 [AGGREGATOR] Loaded reputation for {len(threshold_state['reputation_scores'])} participants")
         else:
             logger.info("📝 [AGGREGATOR] No saved state found, using initial values")
+        
+        # Load server optimizer tensors if available
+        saved_optimizer_state = load_optimizer_state(os.path.join(MODEL_DIR, "optimizer_state.npz"))
+        if saved_optimizer_state is not None:
+            optimizer_state.update(saved_optimizer_state)
+            logger.info(f"🧭 [AGGREGATOR] Loaded server optimizer state ({optimizer_state['optimizer']}, step {optimizer_state['step']})")
+        
+        load_async_sessions(os.path.join(MODEL_DIR, "async_sessions.npz"))
     except Exception as e:
         logger.warning(f"⚠️ [AGGREGATOR] Could not load state: {e}")
 
@@ -890,9 +1550,14 @@ if __name__ == "__main__":
     # Load previous threshold and reputation state
     load_state()
     
+    # Load the participant registry in the background before the first round
+    schedule_registry_refresh()
+    
     logger.info(f"🏗️ [AGGREGATOR] Starting event listener with dynamic threshold and reputation system...")
     logger.info(f"⏱️ [AGGREGATOR] Round timeout set to {ROUND_TIMEOUT_MINUTES} minutes")
-    logger.info(f"👥 [AGGREGATOR] Default participants: {DEFAULT_PARTICIPANTS}")
+    logger.info(f"🔁 [AGGREGATOR] Aggregation mode: {AGGREGATION_MODE}" + (f" (buffer size {ASYNC_BUFFER_SIZE})" if AGGREGATION_MODE == "async" else ""))
+    logger.info(f"👥 [AGGREGATOR] Bootstrap participants: {DEFAULT_PARTICIPANTS}, sample size per round: {ROUND_SAMPLE_SIZE or 'all'}")
+    logger.info(f"🧭 [AGGREGATOR] Server optimizer: {SERVER_OPTIMIZER}")
     
     # Save state periodically
     def save_state_periodically():
@@ -0,0 +1,173 @@
+"""Single-pass streaming uploads of model files to MinIO. Kept identical in the aggregator and client src directories."""
+
+import os
+import json
+import time
+import hashlib
+import requests
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # Bytes hashed and sent per read
+MULTIPART_THRESHOLD_BYTES = int(os.getenv("MULTIPART_THRESHOLD_BYTES", str(64 * 1024 * 1024)))  # Use multipart above this size
+MULTIPART_PART_SIZE = max(5 * 1024 * 1024, int(os.getenv("MULTIPART_PART_SIZE", str(16 * 1024 * 1024))))  # S3 minimum is 5MB
+UPLOAD_MAX_RETRIES = int(os.getenv("UPLOAD_MAX_RETRIES", "3"))  # Attempts per PUT
+UPLOAD_RETRY_BACKOFF_SECONDS = float(os.getenv("UPLOAD_RETRY_BACKOFF_SECONDS", "2"))
+
+class HashingReader:
+    """File-like wrapper that updates a SHA-256 with every chunk requests streams from it."""
+
+    def __init__(self, f, length):
+        self.f = f
+        self.length = length
+        self.sha256 = hashlib.sha256()
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = UPLOAD_CHUNK_SIZE
+        chunk = self.f.read(min(size, UPLOAD_CHUNK_SIZE))
+        self.sha256.update(chunk)
+        return chunk
+
+def put_with_retry(url, data_factory, log):
+    """PUTs to a presigned URL, retrying with backoff; data_factory() returns a fresh body per attempt."""
+    for attempt in range(1, UPLOAD_MAX_RETRIES + 1):
+        try:
+            response = requests.put(url, data=data_factory())
+            if response.status_code == 200:
+                return response
+            log(f"⚠️ Upload attempt {attempt}/{UPLOAD_MAX_RETRIES} failed: {response.status_code} {response.text[:200]}")
+        except requests.RequestException as e:
+            log(f"⚠️ Upload attempt {attempt}/{UPLOAD_MAX_RETRIES} failed: {e}")
+        if attempt < UPLOAD_MAX_RETRIES:
+            time.sleep(UPLOAD_RETRY_BACKOFF_SECONDS * attempt)
+    return None
+
+def upload_single(handler_url, model_path, round_id, object_id, size, log):
+    """Streams a file to a single presigned PUT; returns (object_path, sha256) or (None, None)."""
+    response = requests.post(f"{handler_url}/upload", json={"roundId": round_id, "bankId": object_id})
+    if response.status_code != 200:
+        log(f"❌ Failed to get upload URL: {response.text}")
+        return None, None
+    upload_data = response.json()
+
+    with open(model_path, "rb") as f:
+        readers = []
+
+        def fresh_body():
+            # A retry restarts the stream (and the hash) from the beginning of the file
+            f.seek(0)
+            readers.append(HashingReader(f, size))
+            return readers[-1]
+
+        if put_with_retry(upload_data["uploadUrl"], fresh_body, log) is None:
+            return None, None
+
+    return upload_data["objectPath"], readers[-1].sha256.hexdigest()
+
+def upload_multipart(handler_url, model_path, round_id, object_id, size, log):
+    """Uploads a file in parts, resuming a previous attempt; returns (object_path, sha256) or (None, None)."""
+    request = {"roundId": round_id, "bankId": object_id}
+    state_path = f"{model_path}.upload.json"
+    stat = os.stat(model_path)
+
+    # Resume the previous upload of this exact file, if any
+    state = None
+    if os.path.exists(state_path):
+        with open(state_path, "r") as f:
+            state = json.load(f)
+        if (state.get("roundId"), state.get("bankId"), state.get("size"), state.get("mtime_ns"), state.get("part_size")) != \
+                (round_id, object_id, stat.st_size, stat.st_mtime_ns, MULTIPART_PART_SIZE):
+            state = None
+
+    uploaded = {}
+    if state is not None:
+        response = requests.post(f"{handler_url}/upload/multipart/parts", json={**request, "uploadId": state["uploadId"]})
+        if response.status_code == 200:
+            uploaded = {part["partNumber"]: part["etag"].strip('"') for part in response.json().get("parts", [])}
+            log(f"🔁 Resuming multipart upload with {len(uploaded)} parts already stored")
+        else:
+            state = None
+
+    if state is None:
+        response = requests.post(f"{handler_url}/upload/multipart/start", json=request)
+        if response.status_code != 200:
+            log(f"❌ Failed to start multipart upload: {response.text}")
+            return None, None
+        state = {
+            **request,
+            "uploadId": response.json()["uploadId"],
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "part_size": MULTIPART_PART_SIZE
+        }
+        with open(state_path, "w") as f:
+            json.dump(state, f)
+
+    sha256 = hashlib.sha256()
+    parts = []
+    with open(model_path, "rb") as f:
+        part_number = 1
+        while True:
+            part = f.read(MULTIPART_PART_SIZE)
+            if not part:
+                break
+            sha256.update(part)
+
+            # MinIO part ETags are the part's MD5, so stored parts are verified without re-sending them
+            part_md5 = hashlib.md5(part).hexdigest()
+            if uploaded.get(part_number) == part_md5:
+                parts.append({"partNumber": part_number, "etag": part_md5})
+                part_number += 1
+                continue
+
+            response = requests.post(f"{handler_url}/upload/multipart/part", json={
+                **request, "uploadId": state["uploadId"], "partNumber": part_number
+            })
+            if response.status_code != 200:
+                log(f"❌ Failed to get URL for part {part_number}: {response.text}")
+                return None, None
+
+            put_response = put_with_retry(response.json()["uploadUrl"], lambda: part, log)
+            if put_response is None:
+                log(f"❌ Part {part_number} failed after {UPLOAD_MAX_RETRIES} attempts, upload can be resumed")
+                return None, None
+
+            parts.append({"partNumber": part_number, "etag": put_response.headers.get("ETag", part_md5).strip('"')})
+            part_number += 1
+
+    response = requests.post(f"{handler_url}/upload/multipart/complete", json={
+        **request, "uploadId": state["uploadId"], "parts": parts
+    })
+    if response.status_code != 200:
+        log(f"❌ Failed to complete multipart upload: {response.text}")
+        return None, None
+
+    os.remove(state_path)
+    return response.json()["objectPath"], sha256.hexdigest()
+
+def upload_file(handler_url, model_path, round_id, object_id, label="", log=print):
+    """
+    Uploads a model file to "<round_id>/<object_id>.weights" in a single pass over the file.
+
+    Args:
+        handler_url: Base URL of the minio-handler
+        model_path: Local file to upload
+        round_id: Object prefix (round id, optionally with a sub-path)
+        object_id: Object name (bank id, model id or "aggregator")
+        label: Caller tag inserted into log lines, e.g. "[BANK dbs]"
+        log: Logging function (print or a logger method)
+
+    Returns:
+        (object_path, sha256 hex digest), or (None, None) if the upload failed
+    """
+    def emit(message):
+        # Insert the caller's label after the status emoji to match the caller's log format
+        emoji, _, text = message.partition(" ")
+        log(f"{emoji} {label} {text}" if label else message)
+
+    size = os.path.getsize(model_path)
+    if size > MULTIPART_THRESHOLD_BYTES:
+        return upload_multipart(handler_url, model_path, round_id, object_id, size, emit)
+    return upload_single(handler_url, model_path, round_id, object_id, size, emit)
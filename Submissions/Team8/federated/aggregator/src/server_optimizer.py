@@ -0,0 +1,139 @@
+"""Server-side optimizers (FedAvg, FedAvgM, FedAdam, FedYogi) applied to the aggregated pseudo-gradient."""
+
+import os
+import json
+import numpy as np
+
+SUPPORTED_OPTIMIZERS = ("fedavg", "fedavgm", "fedadam", "fedyogi")
+
+# Default server learning rates per optimizer (adaptive methods need a much smaller step)
+DEFAULT_LEARNING_RATES = {
+    "fedavg": 1.0,
+    "fedavgm": 1.0,
+    "fedadam": 0.01,
+    "fedyogi": 0.01,
+}
+
+def init_optimizer_state(optimizer="fedavg"):
+    """Creates an empty server optimizer state."""
+    return {
+        "optimizer": optimizer,
+        "step": 0,
+        "global_weights": None,  # Current global model weights (list of arrays)
+        "m": None,  # First moment / momentum buffers
+        "v": None   # Second moment buffers (adaptive optimizers only)
+    }
+
+def _shapes_match(weights_a, weights_b):
+    """Returns True if both weight lists have the same layer shapes."""
+    if weights_a is None or weights_b is None or len(weights_a) != len(weights_b):
+        return False
+    return all(a.shape == b.shape for a, b in zip(weights_a, weights_b))
+
+def apply_server_update(state, avg_weights, optimizer="fedavg", learning_rate=None,
+                        momentum=0.9, beta1=0.9, beta2=0.99, tau=1e-3):
+    """
+    Applies the configured server optimizer to the aggregated weights.
+
+    Args:
+        state: Optimizer state created by init_optimizer_state (updated in place)
+        avg_weights: Weighted average of the accepted client models
+        optimizer: One of SUPPORTED_OPTIMIZERS
+        learning_rate: Server learning rate (defaults per optimizer if None)
+        momentum: Momentum factor for fedavgm
+        beta1: First moment decay for fedadam/fedyogi
+        beta2: Second moment decay for fedadam/fedyogi
+        tau: Adaptivity / numerical stability constant
+
+    Returns:
+        List of arrays with the new global model weights
+    """
+    if optimizer not in SUPPORTED_OPTIMIZERS:
+        raise ValueError(f"Unsupported server optimizer: {optimizer}")
+
+    if learning_rate is None:
+        learning_rate = DEFAULT_LEARNING_RATES[optimizer]
+
+    avg_weights = [np.asarray(w, dtype=np.float32) for w in avg_weights]
+
+    # Reset buffers if the optimizer was switched between runs
+    if state.get("optimizer") != optimizer:
+        state["optimizer"] = optimizer
+        state["m"] = None
+        state["v"] = None
+        state["step"] = 0
+
+    # First round (or architecture change): the average becomes the global model
+    if optimizer == "fedavg" or not _shapes_match(state["global_weights"], avg_weights):
+        state["global_weights"] = [w.copy() for w in avg_weights]
+        state["m"] = None
+        state["v"] = None
+        state["step"] += 1
+        return [w.copy() for w in state["global_weights"]]
+
+    # Pseudo-gradient: direction from the current global model to the client average
+    deltas = [avg - glob for avg, glob in zip(avg_weights, state["global_weights"])]
+
+    if state["m"] is None:
+        state["m"] = [np.zeros_like(d) for d in deltas]
+    if optimizer in ("fedadam", "fedyogi") and state["v"] is None:
+        state["v"] = [np.full_like(d, tau ** 2) for d in deltas]
+
+    new_weights = []
+    for idx, delta in enumerate(deltas):
+        if optimizer == "fedavgm":
+            state["m"][idx] = momentum * state["m"][idx] + delta
+            update = state["m"][idx]
+        else:
+            state["m"][idx] = beta1 * state["m"][idx] + (1 - beta1) * delta
+            delta_sq = np.square(delta)
+            if optimizer == "fedadam":
+                state["v"][idx] = beta2 * state["v"][idx] + (1 - beta2) * delta_sq
+            else:
+                state["v"][idx] = state["v"][idx] - (1 - beta2) * delta_sq * np.sign(state["v"][idx] - delta_sq)
+            update = state["m"][idx] / (np.sqrt(state["v"][idx]) + tau)
+
+        new_weights.append((state["global_weights"][idx] + learning_rate * update).astype(np.float32))
+
+    state["global_weights"] = new_weights
+    state["step"] += 1
+    return [w.copy() for w in new_weights]
+
+def save_optimizer_state(state, path):
+    """Persists optimizer state tensors to an .npz file with a JSON sidecar for metadata."""
+    arrays = {}
+    for key in ("global_weights", "m", "v"):
+        if state.get(key) is not None:
+            for idx, array in enumerate(state[key]):
+                arrays[f"{key}_{idx}"] = array
+
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+    with open(f"{path}.json", "w") as f:
+        json.dump({"optimizer": state.get("optimizer"), "step": state.get("step", 0)}, f)
+
+def load_optimizer_state(path):
+    """Loads optimizer state saved by save_optimizer_state, or returns None if missing."""
+    if not os.path.exists(path):
+        return None
+
+    meta = {}
+    if os.path.exists(f"{path}.json"):
+        with open(f"{path}.json", "r") as f:
+            meta = json.load(f)
+
+    state = init_optimizer_state(meta.get("optimizer", "fedavg"))
+    state["step"] = meta.get("step", 0)
+
+    with np.load(path) as data:
+        for key in ("global_weights", "m", "v"):
+            layers = sorted(
+                (name for name in data.files if name.startswith(f"{key}_")),
+                key=lambda name: int(name.rsplit("_", 1)[1])
+            )
+            if layers:
+                state[key] = [data[name] for name in layers]
+
+    return state
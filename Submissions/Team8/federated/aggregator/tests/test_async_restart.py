@@ -0,0 +1,67 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import aggregator as agg
+
+
+@pytest.fixture
+def async_aggregator(tmp_path, monkeypatch):
+    """An async aggregator with one-update buffers and every network and TensorFlow call replaced."""
+    client_weights = {}
+    published = []
+
+    monkeypatch.setattr(agg, "MODEL_DIR", str(tmp_path))
+    monkeypatch.setattr(agg, "ASYNC_BUFFER_SIZE", 1)
+    monkeypatch.setattr(agg, "async_sessions", {})
+    monkeypatch.setattr(agg, "optimizer_state", agg.init_optimizer_state("fedavg"))
+    agg.optimizer_state["global_weights"] = [np.zeros(3)]
+
+    monkeypatch.setattr(agg, "fetch_model_from_minio", lambda round_id, model_id: f"{round_id}/{model_id}")
+    monkeypatch.setattr(agg, "load_model_weights", lambda path: (client_weights[path], None))
+    monkeypatch.setattr(agg, "evaluate_model_quality", lambda *args: {"quality_score": 1.0, "reputation": 1.0})
+    monkeypatch.setattr(agg, "update_participant_reputation", lambda *args: None)
+    monkeypatch.setattr(agg, "record_quality_metrics", lambda *args: None)
+    monkeypatch.setattr(agg, "save_aggregated_model", lambda weights, path: path)
+    monkeypatch.setattr(agg, "upload_model_to_minio", lambda path, object_dir: (f"{object_dir}/aggregator.weights", "hash"))
+    monkeypatch.setattr(agg, "submit_final_model", lambda round_id, uri, quality_data, weight_hash: published.append(quality_data["model_version"]))
+
+    def submit(base_version, weights):
+        model_uri = f"r1/async/v{base_version}/dbs"
+        client_weights[model_uri] = [np.array(weights, dtype=float)]
+        agg.handle_async_submission("r1", "dbs", model_uri)
+
+    return submit, published
+
+
+def test_async_session_survives_restart(async_aggregator):
+    submit, published = async_aggregator
+    submit(0, [1, 1, 1])
+    submit(1, [2, 2, 2])
+    assert published == [1, 2]
+
+    # Restart: drop the in-memory sessions and reload from disk
+    agg.async_sessions.clear()
+    agg.load_state()
+    session = agg.get_async_session("r1")
+    assert session["version"] == 2
+    np.testing.assert_allclose(session["global_weights"][2][0], [2, 2, 2])
+
+    # Clients keep building on the last version they were sent
+    submit(2, [3, 3, 3])
+    assert published == [1, 2, 3]
+    np.testing.assert_allclose(agg.get_async_session("r1")["global_weights"][3][0], [3, 3, 3])
+
+
+def test_unknown_base_is_dropped_after_restart(async_aggregator):
+    submit, published = async_aggregator
+    submit(0, [1, 1, 1])
+
+    # A session restored without history never accepts updates it cannot turn into deltas
+    agg.async_sessions.clear()
+    submit(5, [9, 9, 9])
+    assert published == [1]
@@ -1,4 +1,5 @@
 import os
+import re
 import json
 import time
 import requests
@@ -7,58 +8,567 @@ import websocket
 import tensorflow as tf
 import numpy as np
 import hashlib
+import resource
+import shutil
 import uuid
 import pandas as pd
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
+from model_upload import upload_file
+from subsample import SUPPORTED_SAMPLERS, select_training_subset, binary_crossentropy_per_row
 
 # Read environment variables
 BANK_ID = os.getenv("BANK_ID", "unknown_bank")
 FABRIC_API_URL = os.getenv("FABRIC_API_URL", f"http://hlf-gateway-{BANK_ID}:8888")  # Dynamic per bank
 FABRIC_API_WS = os.getenv("FABRIC_API_WS", f"ws://hlf-gateway-{BANK_ID}:8888/ws")
 MINIO_HANDLER_URL = os.getenv("MINIO_HANDLER_URL", "http://minio-handler:9002")
-MODEL_DIR = "/models"
-DATA_DIR = "/data"
+MODEL_DIR = os.getenv("MODEL_DIR", "/models")
+DATA_DIR = os.getenv("DATA_DIR", "/data")
+DATA_CACHE_DIR = os.getenv("DATA_CACHE_DIR", os.path.join(MODEL_DIR, "data_cache"))  # Preprocessed .npy cache
+DATA_CACHE_FORMAT = 3  # Bump when the cache layout or preprocessing changes; older caches and statistics are rebuilt
+
+# Input pipeline: "cache" (single shard, memory-mapped), "stream" (tf.data over all shards) or "auto"
+DATA_PIPELINE = os.getenv("DATA_PIPELINE", "auto").lower()
+STREAM_THRESHOLD_BYTES = int(os.getenv("STREAM_THRESHOLD_BYTES", str(512 * 1024 * 1024)))  # Auto-stream above this total size
+VALIDATION_SPLIT = float(os.getenv("VALIDATION_SPLIT", "0.2"))  # Fraction of rows used for validation
+SHUFFLE_BUFFER_SIZE = int(os.getenv("SHUFFLE_BUFFER_SIZE", "50000"))  # Rows held in the streaming shuffle buffer
+PARSE_BATCH_SIZE = int(os.getenv("PARSE_BATCH_SIZE", "4096"))  # CSV lines decoded per vectorized parse call
+STATS_CHUNK_ROWS = int(os.getenv("STATS_CHUNK_ROWS", "100000"))  # Rows per chunk when computing scaler statistics
+
+# Per-round training subset for very large in-memory datasets: off, stratified or importance
+TRAIN_SUBSAMPLE = os.getenv("TRAIN_SUBSAMPLE", "off").lower()
+TRAIN_SUBSAMPLE_SIZE = int(os.getenv("TRAIN_SUBSAMPLE_SIZE", "200000"))  # Training rows per round
+IMPORTANCE_UNIFORM_MIX = float(os.getenv("IMPORTANCE_UNIFORM_MIX", "0.1"))  # Uniform share of the importance distribution
+EXAMPLE_LOSSES_FILE = "example_losses.npy"  # Per-row losses from the previous round, kept in the data cache they were computed on
+
+# Aggregation mode must match the aggregator: sync (one job per round) or async (continuous buffered training)
+AGGREGATION_MODE = os.getenv("AGGREGATION_MODE", "sync").lower()
+ASYNC_MAX_LOCAL_JOBS = int(os.getenv("ASYNC_MAX_LOCAL_JOBS", "20"))  # Local training jobs per async round
+
+# Warm start: initialize local training from the latest published global model
+WARM_START = os.getenv("WARM_START", "true").lower() == "true"
+WARM_START_EPOCH_FACTOR = float(os.getenv("WARM_START_EPOCH_FACTOR", "0.4"))  # Fraction of the usual epochs when fine-tuning
+WARM_START_MIN_EPOCHS = int(os.getenv("WARM_START_MIN_EPOCHS", "1"))
+GLOBAL_MODEL_DIR = os.path.join(MODEL_DIR, "global")  # Local cache of downloaded global models
+LATEST_GLOBAL_FILE = os.path.join(GLOBAL_MODEL_DIR, "latest.json")  # Survives client restarts
+
+# Federated evaluation of each published global model on this bank's validation split
+GLOBAL_EVALUATION = os.getenv("GLOBAL_EVALUATION", "true").lower() == "true"
+EVAL_BATCH_SIZE = int(os.getenv("EVAL_BATCH_SIZE", "4096"))  # Rows per inference batch
+EVAL_THRESHOLDS = [round(0.1 * i, 1) for i in range(1, 10)]  # Decision thresholds reported with tp/fp counts
+
+# Deadline-aware training: finish local training and upload before the round deadline on the ledger
+DEADLINE_SAFETY_SECONDS = float(os.getenv("DEADLINE_SAFETY_SECONDS", "15"))  # Margin kept free before the deadline
+UPLOAD_TIME_ESTIMATE_SECONDS = float(os.getenv("UPLOAD_TIME_ESTIMATE_SECONDS", "10"))  # Until an upload has been measured
+EARLY_STOPPING_PATIENCE = int(os.getenv("EARLY_STOPPING_PATIENCE", "2"))  # Epochs without val_loss improvement
+MAX_TRAINING_BATCH_SIZE = int(os.getenv("MAX_TRAINING_BATCH_SIZE", "1024"))  # Upper bound when growing the batch to meet the deadline
+CALIBRATION_STEPS = int(os.getenv("CALIBRATION_STEPS", "5"))  # Timed steps per batch size candidate
+
+# Per-round training checkpoints, so a restarted client resumes the round instead of missing it
+CHECKPOINTS = os.getenv("CHECKPOINTS", "true").lower() == "true"
+CHECKPOINT_DIR = os.path.join(MODEL_DIR, "checkpoints")  # One directory per round
+CHECKPOINT_INTERVAL_EPOCHS = max(1, int(os.getenv("CHECKPOINT_INTERVAL_EPOCHS", "1")))
+
+# Last measured upload + submission time, used to reserve time before the deadline
+upload_timing = {"seconds": UPLOAD_TIME_ESTIMATE_SECONDS}
+
+# Latest global model published by the aggregator (from AGGREGATED_MODEL_SUBMITTED events)
+global_model_state = {
+    "round_id": None,
+    "version": 0,
+    "model_uri": None,
+    "weight_hash": None
+}
+global_model_lock = threading.Lock()
+
+# Single training worker: round jobs are queued, deduplicated by round and superseded by newer rounds
+training_state = {
+    "queue": [],                            # Pending ROUND_STARTED payloads
+    "running_round": None,                  # Round currently being trained
+    "cancel_event": None,                   # Set to cancel the running round
+    "finished_rounds": deque(maxlen=100),   # Recently trained, cancelled or dropped rounds (replay protection)
+    "evaluations": [],                      # Pending global model evaluations, run when no round is queued
+    "evaluated_models": deque(maxlen=100)   # Recently evaluated global model URIs (replay protection)
+}
+training_condition = threading.Condition()
+
+# Concurrent trainings allowed in this process; client_host.py replaces it with a semaphore shared by all banks
+training_slots = threading.BoundedSemaphore(1)
+
+# Local read-model of this bank's reputation and quality records, kept current from event deltas
+LEDGER_CACHE_TTL_SECONDS = float(os.getenv("LEDGER_CACHE_TTL_SECONDS", "600"))  # Full gateway query after this age
+ledger_cache = {
+    "reputation": {"data": None, "loaded_at": 0.0},
+    "quality": {"data": None, "loaded_at": 0.0}
+}
+ledger_cache_lock = threading.Lock()
+
+# Small pool for informational events (quality/reputation lookups), coalesced per event type
+INFO_WORKERS = int(os.getenv("INFO_WORKERS", "2"))
+info_executor = ThreadPoolExecutor(max_workers=INFO_WORKERS, thread_name_prefix="info")
+pending_info_jobs = set()
+pending_info_lock = threading.Lock()
+
+# Participants selected by the aggregator per round (from ROUND_PARTICIPANTS_UPDATED events)
+SELECTION_WAIT_SECONDS = float(os.getenv("SELECTION_WAIT_SECONDS", "10"))  # How long to wait for the selection before training anyway
+round_selections = {}
+round_selections_condition = threading.Condition()
 
 # Ensure model directory exists
 os.makedirs(MODEL_DIR, exist_ok=True)
 
+def compute_file_hash(path, chunk_size=1024 * 1024):
+    """Computes the SHA-256 of a file in fixed-size chunks."""
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def build_data_cache(csv_path, cache_dir, source_info):
+    """Parses and scales a CSV once and stores the train/validation split, labels and scaler parameters as .npy/.json."""
+    print(f"🛠️ [BANK {BANK_ID}] Building preprocessed data cache for {csv_path}")
+    os.makedirs(cache_dir, exist_ok=True)
+    
+    df = pd.read_csv(csv_path)
+    print(f"📊 [BANK {BANK_ID}] Loaded dataframe with shape: {df.shape}")
+    
+    # Basic preprocessing: assume last column is target; missing features are 0.0, as in the streaming pipeline
+    X = df.iloc[:, :-1].fillna(0.0).values.astype(np.float32)
+    y = df.iloc[:, -1].values.astype(np.float32)
+    del df
+    
+    # Normalize features
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X).astype(np.float32)
+    
+    # Split once, with a fixed seed, into contiguous train and validation files, so every round
+    # memory-maps both parts instead of copying the dataset to split it
+    shuffled = np.random.RandomState(42).permutation(len(y))
+    num_val = int(np.ceil(len(y) * VALIDATION_SPLIT))
+    parts = {"train": np.sort(shuffled[num_val:]), "val": np.sort(shuffled[:num_val])}
+    
+    # Losses recorded on the previous arrays do not describe the new rows
+    if os.path.exists(os.path.join(cache_dir, EXAMPLE_LOSSES_FILE)):
+        os.remove(os.path.join(cache_dir, EXAMPLE_LOSSES_FILE))
+    
+    # Write arrays first, manifest last, so a crash never leaves a manifest pointing at partial files
+    for part, indices in parts.items():
+        for name, source in (("X", X_scaled), ("y", y)):
+            tmp_path = os.path.join(cache_dir, f"{name}_{part}.npy.tmp")
+            with open(tmp_path, "wb") as f:
+                np.save(f, source[indices])
+            os.replace(tmp_path, os.path.join(cache_dir, f"{name}_{part}.npy"))
+    
+    # Caches from before the split was stored hold the whole dataset in X.npy/y.npy
+    for name in ("X.npy", "y.npy"):
+        if os.path.exists(os.path.join(cache_dir, name)):
+            os.remove(os.path.join(cache_dir, name))
+    
+    with open(os.path.join(cache_dir, "scaler.json"), "w") as f:
+        json.dump({
+            "mean": scaler.mean_.tolist(),
+            "scale": scaler.scale_.tolist(),
+            "var": scaler.var_.tolist(),
+            "n_samples_seen": int(scaler.n_samples_seen_)
+        }, f)
+    
+    tmp_manifest = os.path.join(cache_dir, "manifest.json.tmp")
+    with open(tmp_manifest, "w") as f:
+        json.dump(dict(source_info, samples=int(X_scaled.shape[0]), features=int(X_scaled.shape[1])), f)
+    os.replace(tmp_manifest, os.path.join(cache_dir, "manifest.json"))
+
+def load_cached_dataset(csv_path):
+    """
+    Returns memory-mapped (X_train, y_train, X_val, y_val) for a CSV, rebuilding the cache only if
+    the source, the validation split or the cache format changed.
+    """
+    cache_dir = os.path.join(DATA_CACHE_DIR, hashlib.sha1(os.path.abspath(csv_path).encode()).hexdigest()[:16])
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    
+    stat = os.stat(csv_path)
+    source_info = {
+        "path": os.path.abspath(csv_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "format": DATA_CACHE_FORMAT,
+        "validation_split": VALIDATION_SPLIT
+    }
+    
+    manifest = None
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+    
+    # Fast path: same path, size and mtime means the cache is current without hashing the file
+    cache_valid = manifest is not None and all(manifest.get(k) == v for k, v in source_info.items())
+    
+    if not cache_valid:
+        source_info["sha256"] = compute_file_hash(csv_path)
+        unchanged = manifest is not None and all(
+            manifest.get(k) == source_info[k] for k in ("sha256", "size", "format", "validation_split")
+        )
+        if unchanged:
+            # Only the mtime changed (e.g. file copied or touched): keep the cache, refresh the manifest
+            manifest.update(source_info)
+            with open(manifest_path, "w") as f:
+                json.dump(manifest, f)
+            print(f"♻️ [BANK {BANK_ID}] Source timestamp changed but content is identical, reusing data cache")
+        else:
+            build_data_cache(csv_path, cache_dir, source_info)
+    
+    return tuple(
+        np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode="r")
+        for name in ("X_train", "y_train", "X_val", "y_val")
+    )
+
+def list_data_shards():
+    """Returns all CSV shards in the data directory in a stable order."""
+    if not os.path.isdir(DATA_DIR):
+        return []
+    return sorted(os.path.join(DATA_DIR, f) for f in os.listdir(DATA_DIR) if f.endswith('.csv'))
+
+def use_streaming_pipeline(shards):
+    """Decides whether to stream the shards through tf.data instead of using the in-memory cache."""
+    if DATA_PIPELINE == "stream":
+        return True
+    if DATA_PIPELINE == "cache":
+        return False
+    return len(shards) > 1 or sum(os.path.getsize(p) for p in shards) > STREAM_THRESHOLD_BYTES
+
+def compute_shard_statistics(csv_path):
+    """Computes per-feature count, mean and M2 for a shard in chunks, cached by path, size and mtime."""
+    stats_dir = os.path.join(DATA_CACHE_DIR, "stats")
+    stats_path = os.path.join(stats_dir, hashlib.sha1(os.path.abspath(csv_path).encode()).hexdigest()[:16] + ".json")
+    stat = os.stat(csv_path)
+    
+    if os.path.exists(stats_path):
+        with open(stats_path, "r") as f:
+            cached = json.load(f)
+        if cached.get("size") == stat.st_size and cached.get("mtime_ns") == stat.st_mtime_ns and cached.get("format") == DATA_CACHE_FORMAT:
+            return cached
+    
+    count = 0
+    mean = None
+    m2 = None
+    for chunk in pd.read_csv(csv_path, chunksize=STATS_CHUNK_ROWS):
+        # Missing values count as 0.0, the default decode_csv fills in, so the scaler matches the training inputs
+        X = chunk.iloc[:, :-1].fillna(0.0).values.astype(np.float64)
+        n = X.shape[0]
+        if n == 0:
+            continue
+        chunk_mean = X.mean(axis=0)
+        chunk_m2 = ((X - chunk_mean) ** 2).sum(axis=0)
+        if mean is None:
+            count, mean, m2 = n, chunk_mean, chunk_m2
+        else:
+            # Chan et al. parallel combination of running statistics
+            delta = chunk_mean - mean
+            total = count + n
+            mean = mean + delta * n / total
+            m2 = m2 + chunk_m2 + delta ** 2 * count * n / total
+            count = total
+    
+    result = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "format": DATA_CACHE_FORMAT,
+        "count": int(count),
+        "mean": mean.tolist() if mean is not None else [],
+        "m2": m2.tolist() if m2 is not None else []
+    }
+    os.makedirs(stats_dir, exist_ok=True)
+    with open(stats_path, "w") as f:
+        json.dump(result, f)
+    return result
+
+def combine_shard_statistics(shard_stats):
+    """Combines per-shard statistics into global scaler mean and scale."""
+    count = 0
+    mean = None
+    m2 = None
+    for stats in shard_stats:
+        if not stats["count"]:
+            continue
+        n = stats["count"]
+        s_mean = np.array(stats["mean"])
+        s_m2 = np.array(stats["m2"])
+        if mean is None:
+            count, mean, m2 = n, s_mean, s_m2
+        else:
+            delta = s_mean - mean
+            total = count + n
+            mean = mean + delta * n / total
+            m2 = m2 + s_m2 + delta ** 2 * count * n / total
+            count = total
+    
+    scale = np.sqrt(m2 / max(count, 1))
+    scale[scale == 0] = 1.0  # Same convention as StandardScaler for constant features
+    return count, mean.astype(np.float32), scale.astype(np.float32)
+
+def make_streaming_datasets(shards, batch_size):
+    """Builds out-of-core tf.data pipelines over all shards with a deterministic hash-based validation split."""
+    # All shards share the same header: features followed by the target column
+    with open(shards[0], "r") as f:
+        num_columns = len(f.readline().strip().split(","))
+    num_features = num_columns - 1
+    
+    # Scaler parameters from streaming statistics (no full load)
+    total_rows, mean, scale = combine_shard_statistics([compute_shard_statistics(p) for p in shards])
+    record_defaults = [0.0] * num_columns
+    val_buckets = int(VALIDATION_SPLIT * 10000)
+    
+    def read_shard(path):
+        # Row id = (shard path, line number), used for the deterministic split
+        return tf.data.TextLineDataset(path).skip(1).enumerate().map(lambda idx, line: (path, idx, line))
+    
+    def parse_batch(paths, idxs, lines):
+        columns = tf.io.decode_csv(lines, record_defaults=record_defaults)
+        features = (tf.stack(columns[:-1], axis=1) - mean) / scale
+        labels = columns[-1]
+        row_ids = tf.strings.join([paths, tf.strings.as_string(idxs)], separator=":")
+        is_val = tf.strings.to_hash_bucket_fast(row_ids, 10000) < val_buckets
+        return features, labels, is_val
+    
+    def build(validation):
+        ds = tf.data.Dataset.from_tensor_slices(shards)
+        ds = ds.interleave(
+            read_shard,
+            cycle_length=len(shards),
+            num_parallel_calls=tf.data.AUTOTUNE,
+            deterministic=validation
+        )
+        ds = ds.batch(PARSE_BATCH_SIZE)
+        ds = ds.map(parse_batch, num_parallel_calls=tf.data.AUTOTUNE)
+        ds = ds.map(lambda X, y, is_val: (
+            tf.boolean_mask(X, is_val if validation else ~is_val),
+            tf.boolean_mask(y, is_val if validation else ~is_val)
+        ))
+        ds = ds.unbatch()
+        if not validation:
+            ds = ds.shuffle(SHUFFLE_BUFFER_SIZE)
+        return ds.batch(batch_size if not validation else max(batch_size, 1024)).prefetch(tf.data.AUTOTUNE)
+    
+    print(f"🌊 [BANK {BANK_ID}] Streaming {total_rows} rows from {len(shards)} shards ({num_features} features)")
+    return build(False), build(True), num_features, total_rows
+
+def prepare_training_data(batch_size):
+    """Returns (fit arguments, validation data, input shape, training rows) from streamed shards, the data cache or synthetic data."""
+    shards = list_data_shards()
+    
+    if shards and use_streaming_pipeline(shards):
+        try:
+            train_ds, val_ds, input_shape, total_rows = make_streaming_datasets(shards, batch_size)
+            return {"x": train_ds}, val_ds, input_shape, int(total_rows * (1 - VALIDATION_SPLIT))
+        except Exception as e:
+            print(f"❌ [BANK {BANK_ID}] Error building streaming pipeline: {e}")
+    
+    # Try to load real data, already split into memory-mapped train and validation parts
+    data = load_training_data()
+    
+    # Fall back to synthetic data if needed
+    if data is None:
+        print(f"⚠️ [BANK {BANK_ID}] Falling back to synthetic data")
+        X_data = np.random.rand(1000, 30)
+        y_data = np.random.randint(0, 2, 1000)
+        num_val = int(np.ceil(len(y_data) * VALIDATION_SPLIT))
+        data = (X_data[num_val:], y_data[num_val:], X_data[:num_val], y_data[:num_val])
+    
+    X_train, y_train, X_val, y_val = data
+    return {"x": X_train, "y": y_train, "batch_size": batch_size}, (X_val, y_val), X_train.shape[1], len(X_train)
+
+def example_losses_path(y_train):
+    """Returns where per-row losses for the training labels are kept: next to the cached arrays, or None for synthetic data."""
+    if isinstance(y_train, np.memmap) and y_train.filename:
+        return os.path.join(os.path.dirname(y_train.filename), EXAMPLE_LOSSES_FILE)
+    return None
+
+def load_example_losses(losses_path, num_rows):
+    """Returns the per-row losses recorded in the previous round, or all NaN if there are none for this data cache."""
+    if losses_path and os.path.exists(losses_path):
+        losses = np.load(losses_path)
+        if len(losses) == num_rows:
+            return losses
+    return np.full(num_rows, np.nan)
+
+def subsample_training_data(train_args, round_id):
+    """Replaces in-memory fit arguments with a weighted subset for this round; returns (fit arguments, subsample info)."""
+    X_train, y_train = train_args["x"], train_args["y"]
+    losses_path = example_losses_path(y_train)
+    losses = load_example_losses(losses_path, len(y_train)) if TRAIN_SUBSAMPLE == "importance" else None
+    
+    # A different, reproducible subset every round
+    seed = int(hashlib.sha1(f"{BANK_ID}:{round_id}".encode()).hexdigest()[:8], 16)
+    indices, weights, method = select_training_subset(
+        TRAIN_SUBSAMPLE, y_train, TRAIN_SUBSAMPLE_SIZE, losses, seed, IMPORTANCE_UNIFORM_MIX
+    )
+    
+    print(f"🎯 [BANK {BANK_ID}] Training on a {method} subset of {len(indices)} of {len(y_train)} rows")
+    subset_args = {
+        "x": X_train[indices],
+        "y": y_train[indices],
+        "sample_weight": weights.astype(np.float32),
+        "batch_size": train_args["batch_size"]
+    }
+    return subset_args, {"method": method, "indices": indices, "population": len(y_train), "losses_path": losses_path}
+
+def record_example_losses(model, train_args, subsample):
+    """Stores the trained model's loss on the sampled rows, for importance sampling in the next round."""
+    losses_path = subsample["losses_path"]
+    if losses_path is None:
+        return
+    losses = load_example_losses(losses_path, subsample["population"])
+    y_prob = model.predict(train_args["x"], batch_size=EVAL_BATCH_SIZE, verbose=0)
+    losses[subsample["indices"]] = binary_crossentropy_per_row(train_args["y"], y_prob)
+    
+    tmp_path = f"{losses_path}.tmp.npy"
+    np.save(tmp_path, losses)
+    os.replace(tmp_path, losses_path)
+
+def rebatch_training_data(train_args, batch_size):
+    """Changes the batch size of in-memory fit arguments or a streaming training dataset."""
+    if "batch_size" in train_args:
+        train_args["batch_size"] = batch_size
+    else:
+        train_args["x"] = train_args["x"].unbatch().batch(batch_size).prefetch(tf.data.AUTOTUNE)
+    return train_args
+
+def measure_step_time(model, input_shape, batch_size):
+    """Measures the seconds per training step at a batch size on a throwaway copy of the model."""
+    probe = tf.keras.models.clone_model(model)
+    probe.compile(optimizer="adam", loss="binary_crossentropy")
+    X = np.random.rand(batch_size, input_shape).astype(np.float32)
+    y = np.random.randint(0, 2, (batch_size, 1)).astype(np.float32)
+    
+    probe.train_on_batch(X, y)  # Warm-up (graph tracing)
+    start = time.perf_counter()
+    for _ in range(CALIBRATION_STEPS):
+        probe.train_on_batch(X, y)
+    return (time.perf_counter() - start) / CALIBRATION_STEPS
+
+def choose_batch_size(model, input_shape, num_rows, epochs, batch_size, time_budget):
+    """Grows the batch size until the measured training time fits the budget."""
+    while True:
+        step_time = measure_step_time(model, input_shape, batch_size)
+        estimated = epochs * int(np.ceil(num_rows / batch_size)) * step_time
+        if estimated <= time_budget or batch_size * 2 > MAX_TRAINING_BATCH_SIZE:
+            break
+        batch_size *= 2
+    
+    print(f"⏱️ [BANK {BANK_ID}] batch_size={batch_size}: {step_time * 1000:.1f}ms/step, "
+          f"~{estimated:.0f}s for {epochs} epochs (budget {time_budget:.0f}s)")
+    return batch_size
+
+class CancellationCallback(tf.keras.callbacks.Callback):
+    """Stops training as soon as the round is superseded."""
+    
+    def __init__(self, cancel_event):
+        super().__init__()
+        self.cancel_event = cancel_event
+    
+    def on_train_batch_end(self, batch, logs=None):
+        if self.cancel_event.is_set():
+            self.model.stop_training = True
+
+class TimeBudgetCallback(tf.keras.callbacks.Callback):
+    """Stops training once the wall-clock budget is used up."""
+    
+    def __init__(self, time_budget):
+        super().__init__()
+        self.time_budget = time_budget
+        self.start_time = None
+    
+    def on_train_begin(self, logs=None):
+        self.start_time = time.time()
+    
+    def on_train_batch_end(self, batch, logs=None):
+        if time.time() - self.start_time > self.time_budget:
+            print(f"⏰ [BANK {BANK_ID}] Training time budget of {self.time_budget:.0f}s used up, stopping early")
+            self.model.stop_training = True
+
+class EpochCheckpointCallback(tf.keras.callbacks.Callback):
+    """Saves the model and optimizer state every few epochs so a restarted client can resume the round."""
+    
+    def __init__(self, checkpoint_dir, plan):
+        super().__init__()
+        self.checkpoint_dir = checkpoint_dir
+        self.plan = plan
+    
+    def on_epoch_end(self, epoch, logs=None):
+        if (epoch + 1) % CHECKPOINT_INTERVAL_EPOCHS != 0 and epoch + 1 < self.plan["epochs"]:
+            return
+        
+        # Write to temporary files first so a crash mid-save never leaves a broken checkpoint
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        tmp_model = os.path.join(self.checkpoint_dir, "model.tmp.h5")
+        self.model.save(tmp_model, include_optimizer=True)
+        os.replace(tmp_model, os.path.join(self.checkpoint_dir, "model.h5"))
+        
+        tmp_state = os.path.join(self.checkpoint_dir, "state.json.tmp")
+        with open(tmp_state, "w") as f:
+            json.dump(dict(self.plan, epoch=epoch + 1, saved_at=time.time()), f)
+        os.replace(tmp_state, os.path.join(self.checkpoint_dir, "state.json"))
+
+class TrainingTelemetryCallback(tf.keras.callbacks.Callback):
+    """Records per-epoch wall time and the number of training steps actually run."""
+    
+    def __init__(self):
+        super().__init__()
+        self.epoch_seconds = []
+        self.steps = 0
+        self.epoch_start = None
+    
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch_start = time.perf_counter()
+    
+    def on_train_batch_end(self, batch, logs=None):
+        self.steps += 1
+    
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch_seconds.append(time.perf_counter() - self.epoch_start)
+
+def peak_rss_mb():
+    """Returns the peak resident set size of this process in MB (ru_maxrss is in KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def evaluate_model(model, val_data):
+    """Evaluates a model on in-memory (X, y) arrays or a tf.data validation dataset."""
+    if isinstance(val_data, tuple):
+        return model.evaluate(*val_data, verbose=0)
+    return model.evaluate(val_data, verbose=0)
+
 def load_training_data():
-    """Loads training data from the mounted volume."""
+    """Loads the (X_train, y_train, X_val, y_val) split of the training data from the mounted volume, or None."""
     try:
         # Look for CSV files in the data directory
-        csv_files = [f for f in os.listdir(DATA_DIR) if f.endswith('.csv')]
+        csv_files = list_data_shards()
         
         if not csv_files:
             print(f"⚠️ [BANK {BANK_ID}] No CSV files found in {DATA_DIR}")
-            return None, None
+            return None
+        
+        if len(csv_files) > 1:
+            print(f"⚠️ [BANK {BANK_ID}] {len(csv_files)} shards found but DATA_PIPELINE=cache only uses the first one")
             
-        # Use the first CSV file found (or you could use a specific naming convention)
-        csv_path = os.path.join(DATA_DIR, csv_files[0])
+        # The in-memory cache covers a single shard; use DATA_PIPELINE=stream for multiple shards
+        csv_path = csv_files[0]
         print(f"📂 [BANK {BANK_ID}] Loading data from {csv_path}")
         
-        # Load the CSV file
-        df = pd.read_csv(csv_path)
-        print(f"📊 [BANK {BANK_ID}] Loaded dataframe with shape: {df.shape}")
-        
-        # Basic preprocessing: assume last column is target
-        X = df.iloc[:, :-1].values
-        y = df.iloc[:, -1].values
+        # Load the scaled train/validation split from the preprocessing cache (memory-mapped)
+        start_time = time.time()
+        X_train, y_train, X_val, y_val = load_cached_dataset(csv_path)
         
-        # Normalize features
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
-        
-        print(f"✅ [BANK {BANK_ID}] Successfully loaded and preprocessed data with {X.shape[0]} samples and {X.shape[1]} features")
-        return X_scaled, y
+        print(f"✅ [BANK {BANK_ID}] Successfully loaded and preprocessed data with {len(y_train)} training and {len(y_val)} validation samples and {X_train.shape[1]} features in {time.time() - start_time:.2f}s")
+        return X_train, y_train, X_val, y_val
         
     except Exception as e:
         print(f"❌ [BANK {BANK_ID}] Error loading data: {e}")
-        return None, None
+        return None
 
-def train_model(round_id):
-    """Trains a model using real data or falls back to synthetic data if needed."""
+def train_model(round_id, initial_model_path=None, deadline=None, cancel_event=None, checkpoint=False):
+    """Trains a model using real data or falls back to synthetic data if needed, finishing before the deadline."""
     print(f"🏋️ [BANK {BANK_ID}] Training model for round {round_id}...")
     
     # Get adaptive training parameters
@@ -71,22 +581,28 @@ def train_model(round_id):
     use_regularization = params.get("use_regularization", False)
     dropout_rate = params.get("dropout_rate", 0.0)
     
-    print(f"🔧 [BANK {BANK_ID}] Training with: epochs={epochs}, batch_size={batch_size}, lr={learning_rate}")
+    # A checkpoint from before a restart fixes the training plan for the rest of the round
+    checkpoint_dir = os.path.join(CHECKPOINT_DIR, round_id) if checkpoint and CHECKPOINTS else None
+    resume_state = load_checkpoint_state(checkpoint_dir) if checkpoint_dir else None
+    if resume_state is not None:
+        batch_size = resume_state["batch_size"]
+        learning_rate = resume_state["learning_rate"]
     
-    # Try to load real data
-    X_data, y_data = load_training_data()
-    
-    # Fall back to synthetic data if needed
-    if X_data is None or y_data is None:
-        print(f"⚠️ [BANK {BANK_ID}] Falling back to synthetic data")
-        X_data = np.random.rand(1000, 30)
-        y_data = np.random.randint(0, 2, 1000)
+    print(f"🔧 [BANK {BANK_ID}] Training with: epochs={epochs}, batch_size={batch_size}, lr={learning_rate}")
     
-    # Split data into training and validation sets
-    X_train, X_val, y_train, y_val = train_test_split(X_data, y_data, test_size=0.2, random_state=42)
+    # Load training and validation data (streamed, cached or synthetic)
+    load_start = time.perf_counter()
+    train_args, val_data, input_shape, num_rows = prepare_training_data(batch_size)
     
-    # Determine input shape from the data
-    input_shape = X_train.shape[1]
+    # Bound the work per round on very large datasets by training on a weighted subset
+    subsample = None
+    if TRAIN_SUBSAMPLE in SUPPORTED_SAMPLERS and num_rows > TRAIN_SUBSAMPLE_SIZE:
+        if "y" in train_args:
+            train_args, subsample = subsample_training_data(train_args, round_id)
+            num_rows = len(subsample["indices"])
+        else:
+            print(f"ℹ️ [BANK {BANK_ID}] Subsampling applies to the in-memory data cache only, streaming all rows")
+    data_load_seconds = time.perf_counter() - load_start
     
     # Model architecture
     model = tf.keras.Sequential()
@@ -104,59 +620,240 @@ def train_model(round_id):
         
     model.add(tf.keras.layers.Dense(1, activation="sigmoid"))
     
+    # Start from the given global model if one is provided
+    if initial_model_path and resume_state is None:
+        try:
+            model.set_weights(tf.keras.models.load_model(initial_model_path).get_weights())
+            print(f"🌐 [BANK {BANK_ID}] Initialized local model from {initial_model_path}")
+            
+            # Fine-tuning a global model needs far fewer epochs than training from scratch
+            epochs = max(WARM_START_MIN_EPOCHS, int(round(epochs * WARM_START_EPOCH_FACTOR)))
+            print(f"🔥 [BANK {BANK_ID}] Warm start: reduced local training to {epochs} epochs")
+        except Exception as e:
+            print(f"⚠️ [BANK {BANK_ID}] Could not initialize from global model: {e}")
+    
     # Compile with specified learning rate
     optimizer = tf.keras.optimizers.Adam(learning_rate=learning_rate)
     model.compile(optimizer=optimizer, loss="binary_crossentropy", metrics=["accuracy"])
     
+    # Resume with the checkpointed weights and optimizer state after the last saved epoch
+    initial_epoch = 0
+    if resume_state is not None:
+        try:
+            model = tf.keras.models.load_model(os.path.join(checkpoint_dir, "model.h5"))
+            epochs = resume_state["epochs"]
+            initial_epoch = min(resume_state["epoch"], epochs)
+            print(f"♻️ [BANK {BANK_ID}] Resuming round {round_id} from epoch {initial_epoch}/{epochs}")
+        except Exception as e:
+            print(f"⚠️ [BANK {BANK_ID}] Could not load checkpoint for round {round_id}, starting over: {e}")
+    
+    # Stop when validation loss stops improving
+    callbacks = [tf.keras.callbacks.EarlyStopping(
+        monitor="val_loss", patience=EARLY_STOPPING_PATIENCE, restore_best_weights=True
+    )]
+    
+    # Fit training into the time left before the round deadline, keeping room for the upload
+    if deadline is not None:
+        time_budget = deadline - time.time() - upload_timing["seconds"] - DEADLINE_SAFETY_SECONDS
+        if time_budget <= 0:
+            print(f"⚠️ [BANK {BANK_ID}] Round {round_id} deadline is too close, training with a minimal time budget")
+            time_budget = 1.0
+        
+        new_batch_size = choose_batch_size(model, input_shape, num_rows, epochs - initial_epoch, batch_size, time_budget)
+        if new_batch_size != batch_size:
+            train_args = rebatch_training_data(train_args, new_batch_size)
+            batch_size = new_batch_size
+        callbacks.append(TimeBudgetCallback(time_budget))
+    
+    if cancel_event is not None:
+        callbacks.append(CancellationCallback(cancel_event))
+    
+    if checkpoint_dir is not None:
+        callbacks.append(EpochCheckpointCallback(checkpoint_dir, {
+            "round_id": round_id, "epochs": epochs, "batch_size": batch_size, "learning_rate": learning_rate
+        }))
+    
+    telemetry = TrainingTelemetryCallback()
+    callbacks.append(telemetry)
+    fit_start = time.perf_counter()
+    
     # Train the model
     history = model.fit(
-        X_train, y_train, 
+        **train_args,
         epochs=epochs, 
-        batch_size=batch_size, 
-        validation_data=(X_val, y_val),
+        initial_epoch=initial_epoch,
+        validation_data=val_data,
+        callbacks=callbacks,
         verbose=1
     )
     
+    train_seconds = time.perf_counter() - fit_start
+    
     # Evaluate the model
-    val_loss, val_accuracy = model.evaluate(X_val, y_val, verbose=0)
+    val_loss, val_accuracy = evaluate_model(model, val_data)
     print(f"📈 [BANK {BANK_ID}] Validation accuracy: {val_accuracy:.4f}")
     
     model_id = f"{BANK_ID}_{round_id}_{uuid.uuid4().hex[:8]}"
     model_path = os.path.join(MODEL_DIR, f"{model_id}.h5")
     model.save(model_path)
     
+    if subsample is not None and TRAIN_SUBSAMPLE == "importance":
+        try:
+            record_example_losses(model, train_args, subsample)
+        except Exception as e:
+            print(f"⚠️ [BANK {BANK_ID}] Could not record per-row losses: {e}")
+    
+    # Measured telemetry for the contribution (the ledger stores trainingStats as strings)
+    samples_trained = min(telemetry.steps * batch_size, num_rows * max(len(telemetry.epoch_seconds), 1))
+    epoch_seconds = telemetry.epoch_seconds or [train_seconds]
+    training_stats = {
+        "epochs": str(len(telemetry.epoch_seconds)),
+        "batch_size": str(batch_size),
+        "learning_rate": str(learning_rate),
+        "num_samples": str(num_rows),
+        "epoch_seconds": f"{sum(epoch_seconds) / len(epoch_seconds):.3f}",
+        "train_seconds": f"{train_seconds:.3f}",
+        "samples_per_second": f"{samples_trained / train_seconds if train_seconds > 0 else 0.0:.1f}",
+        "data_load_seconds": f"{data_load_seconds:.3f}",
+        "peak_rss_mb": f"{peak_rss_mb():.1f}"
+    }
+    
+    if initial_epoch > 0:
+        training_stats["resumed_from_epoch"] = str(initial_epoch)
+    
+    # Inverse-probability weights make the subset stand in for the whole training set
+    if subsample is not None:
+        training_stats.update({
+            "num_samples": str(subsample["population"]),
+            "sampled_samples": str(num_rows),
+            "sampler": subsample["method"],
+            "sample_weighting": "inverse_probability"
+        })
+    
     print(f"✅ [BANK {BANK_ID}] Model training complete. Model saved to {model_path}")
-    return model_path, model_id, val_accuracy
+    print(f"⏱️ [BANK {BANK_ID}] {training_stats['epochs']} epochs in {train_seconds:.1f}s "
+          f"({training_stats['samples_per_second']} samples/s, peak RSS {training_stats['peak_rss_mb']}MB)")
+    return model_path, model_id, val_accuracy, training_stats
+
+def upload_model(model_path, round_id, object_id=None):
+    """Streams the trained model to MinIO; returns (object_path, weight_hash)."""
+    print(f"📤 [BANK {BANK_ID}] Uploading model to MinIO for round {round_id}...")
+    
+    # The SHA-256 is computed while streaming, so the model is read from disk once
+    object_path, weight_hash = upload_file(MINIO_HANDLER_URL, model_path, round_id, object_id or BANK_ID, f"[BANK {BANK_ID}]")
+    
+    if object_path:
+        print(f"✅ [BANK {BANK_ID}] Model successfully uploaded to MinIO at {object_path}.")
+    else:
+        print(f"❌ [BANK {BANK_ID}] Failed to upload model")
+    return object_path, weight_hash
 
-def upload_model(model_path, round_id):
-    """Uploads trained model to MinIO."""
-    print(f"📤 [BANK {BANK_ID}] Requesting upload URL from minio-handler for round {round_id}...")
-    response = requests.post(f"{MINIO_HANDLER_URL}/upload", json={"roundId": round_id, "bankId": BANK_ID})
+def download_global_model(model_uri, expected_hash=None):
+    """Downloads a published global model from MinIO unless the cached copy is current, and returns the local path."""
+    object_dir = os.path.dirname(model_uri)
+    object_name = os.path.splitext(os.path.basename(model_uri))[0]
+    local_path = os.path.join(GLOBAL_MODEL_DIR, object_dir, f"{object_name}.h5")
+    meta_path = f"{local_path}.json"
     
+    meta = {}
+    if os.path.exists(local_path):
+        if os.path.exists(meta_path):
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+        else:
+            meta = {"sha256": compute_file_hash(local_path)}
+        
+        # Hash-conditional: the cached copy matches the hash recorded on the ledger
+        if expected_hash is not None and meta.get("sha256") == expected_hash:
+            return local_path
+    
+    response = requests.post(f"{MINIO_HANDLER_URL}/download", json={"roundId": object_dir, "bankId": object_name})
     if response.status_code != 200:
-        print(f"❌ [BANK {BANK_ID}] Failed to get upload URL: {response.text}")
-        return None, None
+        print(f"❌ [BANK {BANK_ID}] Failed to get global model download URL: {response.text}")
+        return None
     
-    upload_data = response.json()
-    upload_url = upload_data["uploadUrl"]
-    object_path = upload_data["objectPath"]
+    # ETag-conditional: without a ledger hash, MinIO decides whether the cached copy is current
+    # and answers 304 without a body if the object is unchanged
+    headers = {}
+    if expected_hash is None and meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
     
-    with open(model_path, "rb") as file:
-        upload_response = requests.put(upload_url, data=file)
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    tmp_path = f"{local_path}.tmp"
+    with requests.get(response.json()["downloadUrl"], headers=headers, stream=True) as model_response:
+        if model_response.status_code == 304:
+            print(f"🌐 [BANK {BANK_ID}] Global model {model_uri} unchanged, using cached copy")
+            return local_path
+        if model_response.status_code != 200:
+            print(f"❌ [BANK {BANK_ID}] Failed to download global model: {model_response.text}")
+            return None
+        
+        # Hash the body while streaming it to disk instead of buffering it in memory
+        sha256 = hashlib.sha256()
+        size = 0
+        with open(tmp_path, "wb") as f:
+            for chunk in model_response.iter_content(chunk_size=1024 * 1024):
+                sha256.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        etag = model_response.headers.get("ETag")
     
-    if upload_response.status_code == 200:
-        print(f"✅ [BANK {BANK_ID}] Model successfully uploaded to MinIO at {object_path}.")
-    else:
-        print(f"❌ [BANK {BANK_ID}] Failed to upload model: {upload_response.text}")
-        return None, None
+    model_hash = sha256.hexdigest()
+    if expected_hash and model_hash != expected_hash:
+        os.remove(tmp_path)
+        print(f"❌ [BANK {BANK_ID}] Global model {model_uri} hash mismatch (expected {expected_hash[:12]}, got {model_hash[:12]})")
+        return None
     
-    return object_path, upload_url
+    os.replace(tmp_path, local_path)
+    with open(meta_path, "w") as f:
+        json.dump({"model_uri": model_uri, "sha256": model_hash, "etag": etag}, f)
+    
+    print(f"🌐 [BANK {BANK_ID}] Downloaded global model {model_uri} ({size} bytes)")
+    return local_path
+
+def fetch_latest_global_model():
+    """Returns a local copy of the latest global model to warm-start from, or None to train from scratch."""
+    if not WARM_START:
+        return None
+    
+    with global_model_lock:
+        model_uri = global_model_state["model_uri"]
+        weight_hash = global_model_state["weight_hash"]
+    
+    if not model_uri:
+        print(f"ℹ️ [BANK {BANK_ID}] No global model published yet, training from scratch")
+        return None
+    
+    try:
+        return download_global_model(model_uri, weight_hash)
+    except Exception as e:
+        print(f"⚠️ [BANK {BANK_ID}] Could not fetch latest global model: {e}")
+        return None
 
-def submit_model_contribution(round_id, model_id, model_uri, model_path, accuracy=0.95):
+def save_latest_global_model():
+    """Persists the latest global model pointer so warm starts survive restarts."""
+    with global_model_lock:
+        latest = dict(global_model_state)
+    os.makedirs(GLOBAL_MODEL_DIR, exist_ok=True)
+    with open(LATEST_GLOBAL_FILE, "w") as f:
+        json.dump(latest, f)
+
+def load_latest_global_model():
+    """Restores the latest global model pointer saved by a previous run."""
+    if not os.path.exists(LATEST_GLOBAL_FILE):
+        return
+    try:
+        with open(LATEST_GLOBAL_FILE, "r") as f:
+            latest = json.load(f)
+        with global_model_lock:
+            global_model_state.update({key: latest.get(key) for key in global_model_state})
+        print(f"🌐 [BANK {BANK_ID}] Restored latest global model: {global_model_state['model_uri']}")
+    except Exception as e:
+        print(f"⚠️ [BANK {BANK_ID}] Could not restore latest global model: {e}")
+
+def submit_model_contribution(round_id, model_id, model_uri, model_hash, accuracy=0.95, training_stats=None):
     """Submits trained model metadata to the respective bank's Fabric API Gateway."""
     print(f"📩 [BANK {BANK_ID}] Submitting model contribution for round {round_id}...")
-    with open(model_path, "rb") as f:
-        model_hash = hashlib.sha256(f.read()).hexdigest()
     
     payload = {
         "id": model_id,
@@ -165,7 +862,7 @@ def submit_model_contribution(round_id, model_id, model_uri, model_path, accurac
         "weightHash": model_hash,
         "modelURI": model_uri,
         "accuracyMetrics": {"accuracy": accuracy},
-        "trainingStats": {"epochs": "5", "batch_size": "32"}
+        "trainingStats": training_stats or {}
     }
     
     response = requests.post(f"{FABRIC_API_URL}/models/contribution", json=payload)
@@ -175,14 +872,388 @@ def submit_model_contribution(round_id, model_id, model_uri, model_path, accurac
     else:
         print(f"❌ [BANK {BANK_ID}] Failed to submit contribution: {response.text}")
 
-def handle_round_started(round_data):
+def load_checkpoint_state(checkpoint_dir):
+    """Returns the saved training state of a round's checkpoint, or None if there is no complete checkpoint."""
+    state_path = os.path.join(checkpoint_dir, "state.json")
+    if not (os.path.exists(state_path) and os.path.exists(os.path.join(checkpoint_dir, "model.h5"))):
+        return None
+    try:
+        with open(state_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_round_checkpoint_job(round_data):
+    """Records the round being trained, so it can be requeued after a restart."""
+    checkpoint_dir = os.path.join(CHECKPOINT_DIR, round_data["round_id"])
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    with open(os.path.join(checkpoint_dir, "round.json"), "w") as f:
+        json.dump(round_data, f)
+
+def remove_round_checkpoint(round_id):
+    """Deletes a round's checkpoint once it is submitted, superseded or closed."""
+    shutil.rmtree(os.path.join(CHECKPOINT_DIR, round_id), ignore_errors=True)
+
+def fetch_open_round_ids():
+    """Returns the IDs of rounds that are not completed on the ledger, or None if the gateway is unreachable."""
+    for attempt in range(3):
+        try:
+            response = requests.get(f"{FABRIC_API_URL}/rounds/active", timeout=10)
+            if response.status_code == 200:
+                return {round_info.get("id") for round_info in (response.json() or [])}
+        except requests.RequestException:
+            pass
+        time.sleep(5)
+    return None
+
+def resume_interrupted_rounds():
+    """Requeues rounds that were being trained when the client stopped, if they are still open."""
+    if not CHECKPOINTS or not os.path.isdir(CHECKPOINT_DIR):
+        return
+    
+    jobs = []
+    for round_id in os.listdir(CHECKPOINT_DIR):
+        job_path = os.path.join(CHECKPOINT_DIR, round_id, "round.json")
+        if os.path.exists(job_path):
+            with open(job_path, "r") as f:
+                jobs.append((os.path.getmtime(job_path), json.load(f)))
+        else:
+            remove_round_checkpoint(round_id)
+    if not jobs:
+        return
+    
+    # Without the gateway, fall back to the deadline carried by the round
+    open_rounds = fetch_open_round_ids()
+    
+    resumable = []
+    for _, round_data in sorted(jobs, key=lambda job: job[0]):
+        round_id = round_data.get("round_id")
+        deadline = float(round_data["deadline"]) if round_data.get("deadline") else None
+        if (deadline is not None and deadline <= time.time()) or (open_rounds is not None and round_id not in open_rounds):
+            print(f"🗑️ [BANK {BANK_ID}] Round {round_id} closed while the client was down, discarding its checkpoint")
+            remove_round_checkpoint(round_id)
+            continue
+        resumable.append(round_data)
+    if not resumable:
+        return
+    
+    # Only the newest open round is resumed; it would supersede the older ones anyway
+    for round_data in resumable[:-1]:
+        print(f"🗑️ [BANK {BANK_ID}] Round {round_data.get('round_id')} superseded by a newer interrupted round, discarding its checkpoint")
+        remove_round_checkpoint(round_data.get("round_id"))
+    
+    round_data = resumable[-1]
+    print(f"♻️ [BANK {BANK_ID}] Found interrupted training for open round {round_data.get('round_id')}, resuming")
+    submit_training_job(dict(round_data, resumed=True))
+
+def handle_round_started(round_data, cancel_event):
     """Handles round start event and triggers training, upload, and submission."""
     round_id = round_data.get("round_id")
+    deadline = float(round_data["deadline"]) if round_data.get("deadline") else None
     print(f"🚀 [BANK {BANK_ID}] Training round {round_id} started!")
-    model_path, model_id, accuracy = train_model(round_id)
-    object_path, upload_url = upload_model(model_path, round_id)
-    if object_path and upload_url:
-        submit_model_contribution(round_id, model_id, object_path, model_path, accuracy)
+    
+    if AGGREGATION_MODE == "async":
+        run_async_training_loop(round_id, cancel_event)
+        return
+    
+    # Skip the round if the aggregator did not select this bank (a resumed round was already selected)
+    if not round_data.get("resumed"):
+        selected = wait_for_round_selection(round_id)
+        if selected is not None and BANK_ID not in selected:
+            print(f"⏭️ [BANK {BANK_ID}] Not selected for round {round_id}, skipping local training")
+            return
+    
+    if CHECKPOINTS:
+        save_round_checkpoint_job({key: value for key, value in round_data.items() if key != "resumed"})
+    
+    with training_slots:
+        model_path, model_id, accuracy, training_stats = train_model(
+            round_id, fetch_latest_global_model(), deadline, cancel_event, checkpoint=True
+        )
+    if cancel_event.is_set():
+        print(f"⏹️ [BANK {BANK_ID}] Round {round_id} superseded, discarding local model")
+        remove_round_checkpoint(round_id)
+        return
+    
+    upload_start = time.time()
+    object_path, weight_hash = upload_model(model_path, round_id)
+    if object_path:
+        upload_timing["seconds"] = time.time() - upload_start
+        training_stats["upload_seconds"] = f"{upload_timing['seconds']:.3f}"
+        submit_model_contribution(round_id, model_id, object_path, weight_hash, accuracy, training_stats)
+        remove_round_checkpoint(round_id)
+        
+        if deadline is not None:
+            print(f"🏁 [BANK {BANK_ID}] Submitted round {round_id} with {deadline - time.time():.0f}s to spare")
+
+def wait_for_round_selection(round_id):
+    """Waits briefly for the aggregator's participant selection; returns None if none was announced."""
+    deadline = time.time() + SELECTION_WAIT_SECONDS
+    with round_selections_condition:
+        while round_id not in round_selections:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                print(f"⚠️ [BANK {BANK_ID}] No participant selection announced for round {round_id}, training anyway")
+                return None
+            round_selections_condition.wait(remaining)
+        return round_selections[round_id]
+
+def handle_round_participants_updated(event_data):
+    """Records the participants the aggregator selected for a round."""
+    round_id = event_data.get("round_id")
+    participants = event_data.get("participants") or []
+    
+    with round_selections_condition:
+        round_selections[round_id] = participants
+        round_selections_condition.notify_all()
+    
+    status = "selected" if BANK_ID in participants else "not selected"
+    print(f"🎯 [BANK {BANK_ID}] Round {round_id} participants announced ({len(participants)} banks) - {status}")
+
+def run_async_training_loop(round_id, cancel_event):
+    """Trains continuously in async mode, starting each job from the latest published global version."""
+    for job in range(ASYNC_MAX_LOCAL_JOBS):
+        # Stop if a newer round has taken over
+        if cancel_event.is_set():
+            print(f"⏹️ [BANK {BANK_ID}] Async round {round_id} superseded, stopping local training")
+            return
+        
+        with global_model_lock:
+            if global_model_state["round_id"] == round_id:
+                base_version = global_model_state["version"]
+                base_model_uri = global_model_state["model_uri"]
+                base_hash = global_model_state["weight_hash"]
+            else:
+                base_version, base_model_uri, base_hash = 0, None, None
+        
+        if base_model_uri:
+            base_model_path = download_global_model(base_model_uri, base_hash)
+        else:
+            # Version 0 is the latest published global model, the same base the aggregator computes v0 deltas against
+            base_model_path = fetch_latest_global_model()
+        print(f"🔁 [BANK {BANK_ID}] Async job {job + 1}/{ASYNC_MAX_LOCAL_JOBS} for round {round_id} from global v{base_version}")
+        
+        with training_slots:
+            model_path, model_id, accuracy, training_stats = train_model(round_id, base_model_path, cancel_event=cancel_event)
+        if cancel_event.is_set():
+            continue
+        
+        # Tag the upload with the global version it started from
+        upload_start = time.time()
+        object_path, weight_hash = upload_model(model_path, f"{round_id}/async/v{base_version}", model_id)
+        if object_path:
+            training_stats["upload_seconds"] = f"{time.time() - upload_start:.3f}"
+            submit_model_contribution(round_id, model_id, object_path, weight_hash, accuracy, training_stats)
+    
+    print(f"🏁 [BANK {BANK_ID}] Finished {ASYNC_MAX_LOCAL_JOBS} async training jobs for round {round_id}")
+
+def handle_global_model_submitted(event_data):
+    """Tracks the latest global model version published by the aggregator."""
+    round_id = event_data.get("round_id")
+    model_uri = event_data.get("model_uri")
+    match = re.search(r"/v(\d+)/", model_uri or "")
+    version = int(match.group(1)) if match else 0
+    
+    with global_model_lock:
+        global_model_state["round_id"] = round_id
+        global_model_state["version"] = version
+        global_model_state["model_uri"] = model_uri
+        global_model_state["weight_hash"] = event_data.get("weight_hash")
+    save_latest_global_model()
+    
+    print(f"🌐 [BANK {BANK_ID}] New global model for round {round_id} (version {version}): {model_uri}")
+
+def iterate_validation_batches(val_data):
+    """Yields (X, y) numpy batches from in-memory validation arrays or a tf.data validation dataset."""
+    if isinstance(val_data, tuple):
+        X_val, y_val = val_data
+        for start in range(0, len(X_val), EVAL_BATCH_SIZE):
+            yield X_val[start:start + EVAL_BATCH_SIZE], np.asarray(y_val[start:start + EVAL_BATCH_SIZE])
+    else:
+        for X_batch, y_batch in val_data:
+            yield X_batch, y_batch.numpy()
+
+def compute_evaluation_counts(model, val_data):
+    """Runs batched inference and returns summable metrics: loss sum, confusion counts and per-threshold tp/fp."""
+    thresholds = np.array(EVAL_THRESHOLDS)
+    counts = {"num_samples": 0, "loss_sum": 0.0, "tp": 0, "fp": 0, "tn": 0, "fn": 0}
+    threshold_tp = np.zeros(len(thresholds), dtype=np.int64)
+    threshold_fp = np.zeros(len(thresholds), dtype=np.int64)
+    
+    for X_batch, y_batch in iterate_validation_batches(val_data):
+        y_true = y_batch.reshape(-1).astype(bool)
+        y_prob = np.clip(np.asarray(model.predict_on_batch(X_batch)).reshape(-1), 1e-7, 1 - 1e-7)
+        
+        counts["num_samples"] += len(y_true)
+        counts["loss_sum"] += float(-np.sum(np.where(y_true, np.log(y_prob), np.log(1 - y_prob))))
+        
+        y_pred = y_prob >= 0.5
+        counts["tp"] += int(np.sum(y_pred & y_true))
+        counts["fp"] += int(np.sum(y_pred & ~y_true))
+        counts["tn"] += int(np.sum(~y_pred & ~y_true))
+        counts["fn"] += int(np.sum(~y_pred & y_true))
+        
+        # Per-threshold counts let the pooled ROC/PR curves be rebuilt without any raw predictions
+        above = y_prob[None, :] >= thresholds[:, None]
+        threshold_tp += np.sum(above & y_true[None, :], axis=1)
+        threshold_fp += np.sum(above & ~y_true[None, :], axis=1)
+    
+    return counts, threshold_tp.tolist(), threshold_fp.tolist()
+
+def handle_global_model_published(event_data):
+    """Evaluates a newly published global model on this bank's validation split and reports the counts to the ledger."""
+    if not GLOBAL_EVALUATION:
+        return
+    
+    round_id = event_data.get("round_id")
+    model_uri = event_data.get("model_uri")
+    weight_hash = event_data.get("weight_hash")
+    if not model_uri:
+        return
+    
+    try:
+        model_path = download_global_model(model_uri, weight_hash)
+        if model_path is None:
+            return
+        
+        # Inference and the data cache share the training slot, like a training job
+        with training_slots:
+            model = tf.keras.models.load_model(model_path, compile=False)
+            eval_start = time.perf_counter()
+            _, val_data, _, _ = prepare_training_data(EVAL_BATCH_SIZE)
+            counts, threshold_tp, threshold_fp = compute_evaluation_counts(model, val_data)
+            eval_seconds = time.perf_counter() - eval_start
+    except Exception as e:
+        print(f"❌ [BANK {BANK_ID}] Global model evaluation for round {round_id} failed: {e}")
+        return
+    
+    if counts["num_samples"] == 0:
+        print(f"⚠️ [BANK {BANK_ID}] No validation rows to evaluate the global model for round {round_id}")
+        return
+    
+    evaluation = {
+        "modelURI": model_uri,
+        "weightHash": weight_hash or "",
+        "numSamples": counts["num_samples"],
+        "lossSum": counts["loss_sum"],
+        "truePositives": counts["tp"],
+        "falsePositives": counts["fp"],
+        "trueNegatives": counts["tn"],
+        "falseNegatives": counts["fn"],
+        "thresholds": EVAL_THRESHOLDS,
+        "thresholdTruePositives": threshold_tp,
+        "thresholdFalsePositives": threshold_fp
+    }
+    
+    accuracy = (counts["tp"] + counts["tn"]) / counts["num_samples"]
+    loss = counts["loss_sum"] / counts["num_samples"]
+    print(f"🧪 [BANK {BANK_ID}] Global model for round {round_id}: accuracy={accuracy:.4f}, loss={loss:.4f} "
+          f"on {counts['num_samples']} rows in {eval_seconds:.1f}s")
+    
+    try:
+        response = requests.post(f"{FABRIC_API_URL}/models/global/evaluation", json={
+            "roundId": round_id,
+            "participantId": BANK_ID,
+            "evaluation": evaluation
+        })
+        if response.status_code == 200:
+            print(f"✅ [BANK {BANK_ID}] Submitted global model evaluation for round {round_id}")
+        else:
+            print(f"❌ [BANK {BANK_ID}] Failed to submit global model evaluation: {response.text}")
+    except requests.RequestException as e:
+        print(f"❌ [BANK {BANK_ID}] Failed to submit global model evaluation: {e}")
+
+def submit_training_job(round_data):
+    """Queues a round for the training worker, skipping duplicates and superseding older rounds."""
+    round_id = round_data.get("round_id")
+    
+    with training_condition:
+        queued_rounds = [job.get("round_id") for job in training_state["queue"]]
+        if round_id == training_state["running_round"] or round_id in queued_rounds or round_id in training_state["finished_rounds"]:
+            print(f"🔂 [BANK {BANK_ID}] Ignoring duplicate ROUND_STARTED for round {round_id}")
+            return
+        
+        # The resume runs after the listener connects, so a round announced meanwhile is newer
+        if round_data.get("resumed") and (queued_rounds or training_state["running_round"] is not None):
+            print(f"⏭️ [BANK {BANK_ID}] Not resuming round {round_id}, a newer round is already queued or running")
+            remove_round_checkpoint(round_id)
+            return
+        
+        # A newer round supersedes queued and running training
+        for dropped in queued_rounds:
+            training_state["finished_rounds"].append(dropped)
+            print(f"🗑️ [BANK {BANK_ID}] Dropping queued round {dropped}, superseded by {round_id}")
+        training_state["queue"] = [round_data]
+        
+        if training_state["running_round"] is not None:
+            print(f"⏹️ [BANK {BANK_ID}] Cancelling training for round {training_state['running_round']}, superseded by {round_id}")
+            training_state["cancel_event"].set()
+        
+        training_condition.notify()
+
+def submit_evaluation_job(model_data):
+    """Queues a published global model for evaluation on the training worker, skipping duplicates."""
+    if not GLOBAL_EVALUATION:
+        return
+    model_uri = model_data.get("model_uri")
+    
+    with training_condition:
+        queued_models = [job.get("model_uri") for job in training_state["evaluations"]]
+        if model_uri in queued_models or model_uri in training_state["evaluated_models"]:
+            return
+        training_state["evaluations"].append(model_data)
+        training_condition.notify()
+
+def training_worker():
+    """Runs queued round jobs and global model evaluations one at a time so only one uses the container's CPU and memory."""
+    while True:
+        with training_condition:
+            while not training_state["queue"] and not training_state["evaluations"]:
+                training_condition.wait()
+            
+            # Rounds have deadlines, so evaluations only run while no round is waiting
+            model_data = None
+            if training_state["queue"]:
+                round_data = training_state["queue"].pop(0)
+                round_id = round_data.get("round_id")
+                cancel_event = threading.Event()
+                training_state["running_round"] = round_id
+                training_state["cancel_event"] = cancel_event
+            else:
+                model_data = training_state["evaluations"].pop(0)
+                training_state["evaluated_models"].append(model_data.get("model_uri"))
+        
+        if model_data is not None:
+            try:
+                handle_global_model_published(model_data)
+            except Exception as e:
+                print(f"❌ [BANK {BANK_ID}] Global model evaluation for round {model_data.get('round_id')} failed: {e}")
+            continue
+        
+        try:
+            handle_round_started(round_data, cancel_event)
+        except Exception as e:
+            print(f"❌ [BANK {BANK_ID}] Training job for round {round_id} failed: {e}")
+        finally:
+            with training_condition:
+                training_state["running_round"] = None
+                training_state["cancel_event"] = None
+                training_state["finished_rounds"].append(round_id)
+
+def submit_info_job(key, handler, event_data):
+    """Runs an informational handler on the small pool, skipping it if the same kind of job is already pending."""
+    with pending_info_lock:
+        if key in pending_info_jobs:
+            return
+        pending_info_jobs.add(key)
+    
+    def run():
+        # Later events of the same kind can queue again once this one has started
+        with pending_info_lock:
+            pending_info_jobs.discard(key)
+        handler(event_data)
+    
+    info_executor.submit(run)
 
 def on_message(ws, message):
     """Handles incoming WebSocket messages."""
@@ -192,60 +1263,148 @@ def on_message(ws, message):
         
         if event_type == "ROUND_STARTED":
             round_data = json.loads(event.get("data", "{}"))
-            threading.Thread(target=handle_round_started, args=(round_data,), daemon=True).start()
+            submit_training_job(round_data)
         
         elif event_type == "QUALITY_RECORDED":
             quality_data = json.loads(event.get("data", "{}"))
-            threading.Thread(target=handle_quality_recorded, args=(quality_data,), daemon=True).start()
+            # Deltas are applied inline so coalesced jobs never lose one; a sequence gap forces a full query
+            if not apply_quality_delta(quality_data):
+                print(f"🔄 [BANK {BANK_ID}] Quality cache out of sequence, reloading from the ledger")
+            submit_info_job("quality", handle_quality_recorded, quality_data)
             
         elif event_type == "REPUTATION_UPDATED":
             reputation_data = json.loads(event.get("data", "{}"))
-            threading.Thread(target=handle_reputation_updated, args=(reputation_data,), daemon=True).start()
+            # Filter other banks' reputation changes before doing any work
+            if reputation_data.get("participant_id") == BANK_ID:
+                if not apply_reputation_delta(reputation_data):
+                    print(f"🔄 [BANK {BANK_ID}] Reputation cache out of sequence, reloading from the ledger")
+                submit_info_job("reputation", handle_reputation_updated, reputation_data)
+        
+        elif event_type == "ROUND_PARTICIPANTS_UPDATED":
+            selection_data = json.loads(event.get("data", "{}"))
+            handle_round_participants_updated(selection_data)
+        
+        elif event_type in ("AGGREGATED_MODEL_SUBMITTED", "GLOBAL_MODEL_PUBLISHED"):
+            model_data = json.loads(event.get("data", "{}"))
+            handle_global_model_submitted(model_data)
+            submit_evaluation_job(model_data)
             
     except json.JSONDecodeError as e:
         print(f"❌ [BANK {BANK_ID}] Failed to parse WebSocket message: {e}")
 
+def on_open(ws):
+    """Drops the ledger read cache on (re)connect, since events may have been missed while disconnected."""
+    invalidate_ledger_cache("WebSocket connected")
+
 def start_websocket_listener():
     """Continuously listens for WebSocket events from the bank's Fabric API Gateway."""
     while True:
         try:
-            ws = websocket.WebSocketApp(FABRIC_API_WS, on_message=on_message)
+            ws = websocket.WebSocketApp(FABRIC_API_WS, on_message=on_message, on_open=on_open)
             ws.run_forever()
         except Exception as e:
             print(f"❌ [BANK {BANK_ID}] WebSocket error: {e}. Retrying in 5s...")
             time.sleep(5)
             
-def check_reputation():
-    """Retrieves the reputation for this bank from the blockchain."""
+def get_cached_ledger_record(kind):
+    """Returns a copy of a cached ledger record, or None if it is missing or older than the TTL."""
+    with ledger_cache_lock:
+        entry = ledger_cache[kind]
+        if entry["data"] is not None and time.time() - entry["loaded_at"] < LEDGER_CACHE_TTL_SECONDS:
+            return dict(entry["data"])
+    return None
+
+def store_ledger_record(kind, data):
+    """Stores a record loaded with a full gateway query."""
+    with ledger_cache_lock:
+        ledger_cache[kind]["data"] = data
+        ledger_cache[kind]["loaded_at"] = time.time()
+
+def invalidate_ledger_cache(reason):
+    """Forces the next reputation and quality lookups to query the gateway."""
+    with ledger_cache_lock:
+        for entry in ledger_cache.values():
+            entry["data"] = None
+    print(f"🧹 [BANK {BANK_ID}] Ledger read cache invalidated: {reason}")
+
+def apply_reputation_delta(event_data):
+    """Applies a REPUTATION_UPDATED payload to the cached reputation; returns False on a sequence gap."""
+    sequence = event_data.get("sequence")
+    
+    with ledger_cache_lock:
+        cached = ledger_cache["reputation"]["data"]
+        if cached is None:
+            return True  # Nothing cached yet, the next lookup loads the full record
+        if sequence is None:
+            ledger_cache["reputation"]["data"] = None
+            return False
+        
+        version = cached.get("version", 0)
+        if sequence <= version:
+            return True  # Replayed event, already applied
+        if sequence != version + 1:
+            ledger_cache["reputation"]["data"] = None
+            return False
+        
+        now = int(time.time())
+        change = {
+            "timestamp": now,
+            "oldScore": event_data.get("old_score", 0),
+            "newScore": event_data.get("new_score", 0),
+            "reason": event_data.get("reason", "Unknown"),
+            "roundID": event_data.get("round_id", "Unknown")
+        }
+        # Same retention as the chaincode (last 10 changes)
+        cached["history"] = ((cached.get("history") or []) + [change])[-10:]
+        cached["score"] = change["newScore"]
+        cached["lastUpdated"] = now
+        cached["version"] = sequence
+    return True
+
+def apply_quality_delta(event_data):
+    """Applies this bank's entry of a QUALITY_RECORDED payload to the cached quality data; returns False on a sequence gap."""
+    scores = event_data.get("participants") or {}
+    if BANK_ID not in scores:
+        return True  # This bank's record did not change
+    sequence = (event_data.get("sequences") or {}).get(BANK_ID)
+    
+    with ledger_cache_lock:
+        cached = ledger_cache["quality"]["data"]
+        if cached is None:
+            return True  # Nothing cached yet, the next lookup loads the full record
+        if sequence is None:
+            ledger_cache["quality"]["data"] = None
+            return False
+        
+        version = cached.get("version", 0)
+        if sequence <= version:
+            return True  # Replayed event, already applied
+        if sequence != version + 1:
+            ledger_cache["quality"]["data"] = None
+            return False
+        
+        # Mirror the chaincode and gateway bookkeeping
+        score = float(scores[BANK_ID])
+        history = ((cached.get("qualityHistory") or []) + [score])[-10:]
+        if score >= event_data.get("threshold", 0):
+            cached["acceptedCount"] = cached.get("acceptedCount", 0) + 1
+        else:
+            cached["rejectedCount"] = cached.get("rejectedCount", 0) + 1
+        cached["qualityHistory"] = history
+        cached["currentScore"] = sum(history[-3:]) / len(history[-3:])
+        cached["lastUpdated"] = int(time.time())
+        cached["version"] = sequence
+    return True
+
+def fetch_reputation():
+    """Queries the gateway for this bank's reputation record."""
     try:
         response = requests.get(f"{FABRIC_API_URL}/reputation?id={BANK_ID}")
         
         if response.status_code == 200:
             reputation_data = response.json()
-            
-            print(f"\n🌟 [BANK {BANK_ID}] Reputation Status:")
-            print(f"  Current Score: {reputation_data.get('score', 0):.4f}")
-            print(f"  Last Updated: {datetime.fromtimestamp(reputation_data.get('lastUpdated', 0)).strftime('%Y-%m-%d %H:%M:%S')}")
-            
-            # Print history if available
-            history = reputation_data.get('history', [])
-            if history:
-                print(f"  Reputation History (latest {len(history)} changes):")
-                for i, change in enumerate(reversed(history)):
-                    round_id = change.get("roundID", "unknown")
-                    reason = change.get("reason", "unknown")
-                    old_score = change.get("oldScore", 0)
-                    new_score = change.get("newScore", 0)
-                    change_time = datetime.fromtimestamp(change.get("timestamp", 0)).strftime('%Y-%m-%d %H:%M:%S')
-                    
-                    # Format with emoji based on whether reputation went up or down
-                    emoji = "⬆️" if new_score > old_score else "⬇️" if new_score < old_score else "↔️"
-                    print(f"    {emoji} {change_time}: {old_score:.4f} → {new_score:.4f} (Round: {round_id}, Reason: {reason})")
-            else:
-                print("  No reputation history available yet.")
-            
-            return reputation_data
-            
+            store_ledger_record("reputation", reputation_data)
+            return dict(reputation_data)
         else:
             print(f"❌ [BANK {BANK_ID}] Failed to retrieve reputation data: {response.text}")
             return None
@@ -254,6 +1413,35 @@ def check_reputation():
         print(f"❌ [BANK {BANK_ID}] Error checking reputation: {e}")
         return None
 
+def check_reputation():
+    """Retrieves the reputation for this bank from the read cache, or from the blockchain when stale."""
+    reputation_data = get_cached_ledger_record("reputation") or fetch_reputation()
+    if reputation_data is None:
+        return None
+    
+    print(f"\n🌟 [BANK {BANK_ID}] Reputation Status:")
+    print(f"  Current Score: {reputation_data.get('score', 0):.4f}")
+    print(f"  Last Updated: {datetime.fromtimestamp(reputation_data.get('lastUpdated', 0)).strftime('%Y-%m-%d %H:%M:%S')}")
+    
+    # Print history if available
+    history = reputation_data.get('history', [])
+    if history:
+        print(f"  Reputation History (latest {len(history)} changes):")
+        for i, change in enumerate(reversed(history)):
+            round_id = change.get("roundID", "unknown")
+            reason = change.get("reason", "unknown")
+            old_score = change.get("oldScore", 0)
+            new_score = change.get("newScore", 0)
+            change_time = datetime.fromtimestamp(change.get("timestamp", 0)).strftime('%Y-%m-%d %H:%M:%S')
+            
+            # Format with emoji based on whether reputation went up or down
+            emoji = "⬆️" if new_score > old_score else "⬇️" if new_score < old_score else "↔️"
+            print(f"    {emoji} {change_time}: {old_score:.4f} → {new_score:.4f} (Round: {round_id}, Reason: {reason})")
+    else:
+        print("  No reputation history available yet.")
+    
+    return reputation_data
+
 def handle_reputation_updated(event_data):
     """Handles reputation updated events from the blockchain."""
     try:
@@ -276,37 +1464,22 @@ def handle_reputation_updated(event_data):
         print(f"  Reason: {reason}")
         print(f"  Round: {round_id}")
         
-        # Retrieve full reputation data
+        # Served from the read cache, which on_message already updated from this event
         check_reputation()
         
     except Exception as e:
         print(f"❌ [BANK {BANK_ID}] Error handling reputation event: {e}")
 
             
-def check_model_quality_history():
-    """Retrieves the quality history for this bank from the blockchain."""
+def fetch_model_quality_history():
+    """Queries the gateway for this bank's quality history."""
     try:
         response = requests.get(f"{FABRIC_API_URL}/quality/participant")
         
         if response.status_code == 200:
             quality_data = response.json()
-            
-            print(f"\n🏅 [BANK {BANK_ID}] Quality History:")
-            print(f"  Current Score: {quality_data.get('currentScore', 0):.4f}")
-            print(f"  Models Accepted: {quality_data.get('acceptedCount', 0)}")
-            print(f"  Models Rejected: {quality_data.get('rejectedCount', 0)}")
-            
-            # Print history if available
-            history = quality_data.get('qualityHistory', [])
-            if history:
-                print(f"  Quality History (latest {len(history)} rounds):")
-                for i, score in enumerate(history):
-                    print(f"    Round {i+1}: {score:.4f}")
-            else:
-                print("  No quality history available yet.")
-            
-            return quality_data
-            
+            store_ledger_record("quality", quality_data)
+            return dict(quality_data)
         else:
             print(f"❌ [BANK {BANK_ID}] Failed to retrieve quality data: {response.text}")
             return None
@@ -315,6 +1488,28 @@ def check_model_quality_history():
         print(f"❌ [BANK {BANK_ID}] Error checking quality history: {e}")
         return None
 
+def check_model_quality_history():
+    """Retrieves the quality history for this bank from the read cache, or from the blockchain when stale."""
+    quality_data = get_cached_ledger_record("quality") or fetch_model_quality_history()
+    if quality_data is None:
+        return None
+    
+    print(f"\n🏅 [BANK {BANK_ID}] Quality History:")
+    print(f"  Current Score: {quality_data.get('currentScore', 0):.4f}")
+    print(f"  Models Accepted: {quality_data.get('acceptedCount', 0)}")
+    print(f"  Models Rejected: {quality_data.get('rejectedCount', 0)}")
+    
+    # Print history if available
+    history = quality_data.get('qualityHistory', [])
+    if history:
+        print(f"  Quality History (latest {len(history)} rounds):")
+        for i, score in enumerate(history):
+            print(f"    Round {i+1}: {score:.4f}")
+    else:
+        print("  No quality history available yet.")
+    
+    return quality_data
+
 def handle_quality_recorded(event_data):
     """Handles quality recorded events from the blockchain."""
     try:
@@ -329,7 +1524,7 @@ def handle_quality_recorded(event_data):
         print(f"  Average Quality: {avg_quality:.4f}")
         print(f"  Models: {accepted} accepted, {rejected} rejected")
         
-        # Check our own quality metrics
+        # Served from the read cache, which on_message already updated from this event
         check_model_quality_history()
         
     except Exception as e:
@@ -379,8 +1574,16 @@ def improve_model_training(round_id, quality_data=None):
 
 
 
-if __name__ == "__main__":
+def start_client():
+    """Starts the training worker and the WebSocket listener in background threads."""
     print(f"🏦 [BANK {BANK_ID}] Starting Federated Learning client...")
+    load_latest_global_model()
+    threading.Thread(target=training_worker, daemon=True).start()
     threading.Thread(target=start_websocket_listener, daemon=True).start()
+    # Resume in the background: the ledger lookup can take a while when the gateway is down
+    threading.Thread(target=resume_interrupted_rounds, daemon=True).start()
+
+if __name__ == "__main__":
+    start_client()
     while True:
         time.sleep(1)
\ No newline at end of file
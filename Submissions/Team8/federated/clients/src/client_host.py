@@ -0,0 +1,66 @@
+"""Runs several bank identities from client.py in one process, sharing TensorFlow and the training slots."""
+
+import os
+import sys
+import time
+import threading
+import importlib.util
+
+CLIENT_HOST_BANKS = [bank.strip() for bank in os.getenv("CLIENT_HOST_BANKS", "dbs,ocbc,ing").split(",") if bank.strip()]
+HOST_TRAINING_SLOTS = int(os.getenv("HOST_TRAINING_SLOTS", "1"))  # Trainings that may run at the same time across all banks
+HOST_DATA_ROOT = os.getenv("HOST_DATA_ROOT", "/data")  # Bank data in <root>/<bank>
+HOST_MODEL_ROOT = os.getenv("HOST_MODEL_ROOT", "/models")  # Bank models, caches and checkpoints in <root>/<bank>
+
+CLIENT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "client.py")
+
+def bank_environment(bank_id):
+    """Returns the environment variables client.py reads at import time for one bank."""
+    suffix = bank_id.upper()
+    env = {
+        "BANK_ID": bank_id,
+        "FABRIC_API_URL": os.getenv(f"FABRIC_API_URL_{suffix}", f"http://hlf-gateway-{bank_id}:8888"),
+        "FABRIC_API_WS": os.getenv(f"FABRIC_API_WS_{suffix}", f"ws://hlf-gateway-{bank_id}:8888/ws"),
+        "DATA_DIR": os.getenv(f"DATA_DIR_{suffix}", os.path.join(HOST_DATA_ROOT, bank_id)),
+        "MODEL_DIR": os.getenv(f"MODEL_DIR_{suffix}", os.path.join(HOST_MODEL_ROOT, bank_id)),
+    }
+    env["DATA_CACHE_DIR"] = os.getenv(f"DATA_CACHE_DIR_{suffix}", os.path.join(env["MODEL_DIR"], "data_cache"))
+    return env
+
+def load_bank_client(bank_id, training_slots):
+    """Imports a separate copy of client.py configured for one bank."""
+    env = bank_environment(bank_id)
+    saved = {key: os.environ.get(key) for key in env}
+
+    # client.py reads its configuration at import time, so the bank's environment only needs to hold during the import
+    os.environ.update(env)
+    try:
+        spec = importlib.util.spec_from_file_location(f"client_{bank_id}", CLIENT_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    module.training_slots = training_slots
+    return module
+
+if __name__ == "__main__":
+    if not CLIENT_HOST_BANKS:
+        print("❌ [HOST] CLIENT_HOST_BANKS is empty")
+        sys.exit(1)
+
+    print(f"🏢 [HOST] Starting {len(CLIENT_HOST_BANKS)} bank clients in one process: {', '.join(CLIENT_HOST_BANKS)}")
+    training_slots = threading.BoundedSemaphore(HOST_TRAINING_SLOTS)
+
+    # Import every bank first, so no bank thread is running while os.environ is being switched
+    clients = [load_bank_client(bank_id, training_slots) for bank_id in CLIENT_HOST_BANKS]
+
+    # Start banks in parallel, since each may wait for its gateway while resuming checkpoints
+    for client in clients:
+        threading.Thread(target=client.start_client, daemon=True).start()
+
+    while True:
+        time.sleep(1)
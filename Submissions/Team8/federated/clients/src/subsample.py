@@ -0,0 +1,113 @@
+"""Weighted per-round training subsets (stratified or importance) for banks with very large datasets."""
+
+import numpy as np
+
+SUPPORTED_SAMPLERS = ("stratified", "importance")
+
+def class_quotas(y, size):
+    """Splits the subset size across classes proportionally (largest remainder), at least one row per class."""
+    classes, counts = np.unique(y, return_counts=True)
+    exact = counts * size / counts.sum()
+    quotas = np.maximum(np.floor(exact).astype(np.int64), 1)
+
+    # Hand the rows lost to rounding to the classes with the largest remainders
+    remaining = size - quotas.sum()
+    if remaining > 0:
+        for idx in np.argsort(exact - np.floor(exact))[::-1][:remaining]:
+            quotas[idx] += 1
+    return classes, counts, np.minimum(quotas, counts)
+
+def stratified_reservoir_sample(y, size, rng, chunk_rows=1_000_000):
+    """
+    Picks `size` row indices with class-stratified reservoir sampling.
+
+    The labels are read once in chunks (they can be a memory-mapped array). Each class keeps
+    the rows with the smallest random keys seen so far, which is a uniform sample without
+    replacement within the class.
+
+    Returns:
+        (sorted indices, sample weights)
+    """
+    classes, counts, quotas = class_quotas(y, size)
+    reservoirs = {cls: (np.empty(0, dtype=np.int64), np.empty(0)) for cls in classes}
+
+    for start in range(0, len(y), chunk_rows):
+        y_chunk = np.asarray(y[start:start + chunk_rows])
+        for cls, quota in zip(classes, quotas):
+            chunk_idx = np.flatnonzero(y_chunk == cls) + start
+            idx, keys = reservoirs[cls]
+            idx = np.concatenate([idx, chunk_idx])
+            keys = np.concatenate([keys, rng.random(len(chunk_idx))])
+            if len(idx) > quota:
+                keep = np.argpartition(keys, quota - 1)[:quota]
+                idx, keys = idx[keep], keys[keep]
+            reservoirs[cls] = (idx, keys)
+
+    indices = []
+    weights = []
+    for cls, count, quota in zip(classes, counts, quotas):
+        indices.append(reservoirs[cls][0])
+        weights.append(np.full(quota, count / quota))
+
+    indices = np.concatenate(indices)
+    weights = np.concatenate(weights)
+    order = np.argsort(indices)
+    return indices[order], weights[order] / weights.mean()
+
+def importance_sample(losses, size, rng, uniform_mix=0.1):
+    """
+    Picks `size` row indices with probability proportional to their previous-round loss.
+
+    Rows without a recorded loss (NaN) are given the mean recorded loss. A `uniform_mix`
+    share of the probability mass is spread uniformly so low-loss rows are still revisited.
+    Rows are drawn with replacement, as required for unbiased inverse-probability weights.
+
+    Returns:
+        (sorted indices, sample weights)
+    """
+    losses = np.asarray(losses, dtype=np.float64)
+    known = ~np.isnan(losses)
+    fill = losses[known].mean() if known.any() else 1.0
+    scores = np.where(known, losses, fill) + 1e-6
+
+    num_rows = len(scores)
+    probabilities = (1 - uniform_mix) * scores / scores.sum() + uniform_mix / num_rows
+    probabilities /= probabilities.sum()
+
+    indices = np.sort(rng.choice(num_rows, size=size, replace=True, p=probabilities))
+    weights = 1.0 / (num_rows * probabilities[indices])
+    return indices, weights / weights.mean()
+
+def select_training_subset(method, y, size, losses=None, seed=None, uniform_mix=0.1):
+    """
+    Selects the training subset for one round.
+
+    Args:
+        method: One of SUPPORTED_SAMPLERS
+        y: Training labels (array or memory-mapped array)
+        size: Number of rows to train on
+        losses: Per-row losses from the previous round (NaN where unknown), for "importance"
+        seed: Random seed for the round
+        uniform_mix: Uniform share of the importance sampling distribution
+
+    Returns:
+        (indices, sample weights, method actually used)
+    """
+    if method not in SUPPORTED_SAMPLERS:
+        raise ValueError(f"Unknown sampler '{method}', expected one of {SUPPORTED_SAMPLERS}")
+
+    rng = np.random.default_rng(seed)
+
+    # Importance sampling needs losses from a previous round over the same rows
+    if method == "importance" and losses is not None and len(losses) == len(y) and not np.isnan(losses).all():
+        indices, weights = importance_sample(losses, size, rng, uniform_mix)
+        return indices, weights, "importance"
+
+    indices, weights = stratified_reservoir_sample(y, size, rng)
+    return indices, weights, "stratified"
+
+def binary_crossentropy_per_row(y_true, y_prob):
+    """Returns the per-row binary cross-entropy of sigmoid outputs."""
+    y_true = np.asarray(y_true, dtype=np.float64).reshape(-1)
+    y_prob = np.clip(np.asarray(y_prob, dtype=np.float64).reshape(-1), 1e-7, 1 - 1e-7)
+    return -(y_true * np.log(y_prob) + (1 - y_true) * np.log(1 - y_prob))
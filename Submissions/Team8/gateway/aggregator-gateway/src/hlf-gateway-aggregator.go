@@ -193,13 +193,60 @@ func listenForFabricEvents() {
 
 func handleFabricEvent(event *client.ChaincodeEvent) {
 	log.Printf("Fabric Event: %s - %s", event.EventName, string(event.Payload))
+
+	forwardEventToAggregator(event)
 	
 	switch event.EventName {
 	case "ROUND_STARTED":
 		handleRoundStarted(event.Payload)
 	case "MODEL_UPLOADED":
 		handleModelUploaded(event.Payload)
+	case "ROUND_PARTICIPANTS_UPDATED":
+		handleRoundParticipantsUpdated(event.Payload)
+	}
+}
+
+// forwardEventToAggregator passes a raw chaincode event to the Python aggregator.
+// The aggregator tracks rounds itself from ROUND_STARTED and MODEL_UPLOADED, in both
+// sync and async mode, so these events must reach it unchanged.
+func forwardEventToAggregator(event *client.ChaincodeEvent) {
+	message := map[string]string{
+		"event": event.EventName,
+		"data":  string(event.Payload),
+	}
+	msgJSON, err := json.Marshal(message)
+	if err != nil {
+		log.Printf("Failed to encode %s event for the aggregator: %v", event.EventName, err)
+		return
 	}
+	broadcastWebSocketMessage(msgJSON)
+}
+
+// handleRoundParticipantsUpdated replaces the expected participants with the announced selection
+func handleRoundParticipantsUpdated(payload []byte) {
+	var participantsEvent struct {
+		RoundID      string   `json:"round_id"`
+		Participants []string `json:"participants"`
+	}
+	if err := json.Unmarshal(payload, &participantsEvent); err != nil {
+		log.Printf("Failed to parse ROUND_PARTICIPANTS_UPDATED event: %v", err)
+		return
+	}
+
+	activeRoundsMutex.Lock()
+	defer activeRoundsMutex.Unlock()
+
+	roundInfo, exists := activeRounds[participantsEvent.RoundID]
+	if !exists {
+		roundInfo = &RoundInfo{
+			RoundID:     participantsEvent.RoundID,
+			Submissions: make(map[string]string),
+		}
+		activeRounds[participantsEvent.RoundID] = roundInfo
+	}
+	roundInfo.ExpectedParticipants = participantsEvent.Participants
+
+	log.Printf("Round %s now expects participants: %v", participantsEvent.RoundID, participantsEvent.Participants)
 }
 
 func handleRoundStarted(payload []byte) {
@@ -295,26 +342,9 @@ func handleModelUploaded(payload []byte) {
 	}
 
 	if allSubmitted {
-		log.Printf("All expected models received for round %s. Triggering aggregation...", roundID)
-		
-		// Prepare aggregation request
-		submissions := make(map[string]string)
-		for participant, uri := range roundInfo.Submissions {
-			submissions[participant] = uri
-		}
-		
-		aggregationRequest := map[string]interface{}{
-			"event":       "START_AGGREGATION",
-			"round_id":    roundID,
-			"submissions": submissions,
-		}
-		
-		// Send to Python aggregator
-		requestJSON, _ := json.Marshal(aggregationRequest)
-		broadcastWebSocketMessage(requestJSON)
-		
-		// Optional: Remove from active rounds after triggering aggregation
-		// delete(activeRounds, roundID)
+		// The aggregator sees the forwarded MODEL_UPLOADED events and starts aggregation itself;
+		// sending START_AGGREGATION as well would aggregate the round twice
+		log.Printf("All expected models received for round %s", roundID)
 	} else {
 		log.Printf("Waiting for more submissions for round %s (%d/%d received)", 
 			roundID, len(roundInfo.Submissions), len(roundInfo.ExpectedParticipants))
@@ -461,6 +491,42 @@ func updateReputationHandler(w http.ResponseWriter, r *http.Request) {
     json.NewEncoder(w).Encode(map[string]string{"status": "success"})
 }
 
+// updateRoundParticipantsHandler announces the participants selected for a round
+func updateRoundParticipantsHandler(w http.ResponseWriter, r *http.Request) {
+    if r.Method != http.MethodPost {
+        http.Error(w, "Method not allowed", http.StatusMethodNotAllowed)
+        return
+    }
+
+    var request struct {
+        RoundID      string   `json:"roundId"`
+        Participants []string `json:"participants"`
+    }
+
+    if err := json.NewDecoder(r.Body).Decode(&request); err != nil {
+        http.Error(w, "Invalid request body", http.StatusBadRequest)
+        return
+    }
+
+    participantsJSON, err := json.Marshal(request.Participants)
+    if err != nil {
+        http.Error(w, "Invalid participants", http.StatusBadRequest)
+        return
+    }
+
+    log.Printf("Announcing %d selected participants for round %s", len(request.Participants), request.RoundID)
+
+    _, err = contract.SubmitTransaction("UpdateRoundParticipants", request.RoundID, string(participantsJSON))
+    if err != nil {
+        log.Printf("Failed to update round participants: %v", err)
+        http.Error(w, fmt.Sprintf("Failed to update round participants: %v", err), http.StatusInternalServerError)
+        return
+    }
+
+    w.WriteHeader(http.StatusOK)
+    json.NewEncoder(w).Encode(map[string]string{"status": "success"})
+}
+
 // GetReputationHandler retrieves a participant's reputation data
 func getReputationHandler(w http.ResponseWriter, r *http.Request) {
     if r.Method != http.MethodGet {
@@ -621,6 +687,9 @@ func main() {
     router.HandleFunc("/reputation", getReputationHandler) 
     router.HandleFunc("/reputations", getAllReputationsHandler)
 
+    // Round participant selection
+    router.HandleFunc("/rounds/participants", updateRoundParticipantsHandler)
+
     log.Println("Starting Aggregator Gateway on port 8890...")
     log.Fatal(http.ListenAndServe(":8890", router))
 }
\ No newline at end of file
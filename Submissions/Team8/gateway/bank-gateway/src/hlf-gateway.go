@@ -8,6 +8,7 @@ import (
 	"log"
 	"net/http"
 	"os"
+	"strconv"
 	"strings"
 	"time"
 
@@ -31,6 +32,7 @@ type TrainingRound struct {
 	Initiator       string   `json:"initiator"`
 	StartTime       int64    `json:"startTime"`
 	EndTime         int64    `json:"endTime,omitempty"`
+	Deadline        int64    `json:"deadline,omitempty"`
 	Status          string   `json:"status"`
 	Participants    []string `json:"participants"`
 	Description     string   `json:"description"`
@@ -55,6 +57,7 @@ type ReputationRecord struct {
 	ParticipantID string    `json:"participantID"`
 	Score         float64   `json:"score"`
 	LastUpdated   int64     `json:"lastUpdated"`
+	Version       int64     `json:"version"`
 	History       []ReputationChange `json:"history"`
 }
 
@@ -300,9 +303,10 @@ func StartTrainingRound(w http.ResponseWriter, r *http.Request) {
 	log.Println("API: Start Training Round")
 
 	var request struct {
-		ID          string `json:"id"`
-		Initiator   string `json:"initiator"`
-		Description string `json:"description"`
+		ID             string `json:"id"`
+		Initiator      string `json:"initiator"`
+		Description    string `json:"description"`
+		TimeoutSeconds int    `json:"timeoutSeconds"`
 	}
 
 	err := json.NewDecoder(r.Body).Decode(&request)
@@ -312,7 +316,12 @@ func StartTrainingRound(w http.ResponseWriter, r *http.Request) {
 		return
 	}
 
-	_, err = contract.SubmitTransaction("CreateTrainingRound", request.ID, request.Initiator, request.Description)
+	// The deadline is recorded on the ledger so clients can budget their local training
+	if request.TimeoutSeconds <= 0 {
+		request.TimeoutSeconds = defaultRoundTimeoutSeconds()
+	}
+
+	_, err = contract.SubmitTransaction("CreateTrainingRound", request.ID, request.Initiator, request.Description, strconv.Itoa(request.TimeoutSeconds))
 	if err != nil {
 		log.Printf("Failed to start round: %v", err)
 		http.Error(w, fmt.Sprintf("Failed to start training round: %v", err), http.StatusInternalServerError)
@@ -331,6 +340,15 @@ func StartTrainingRound(w http.ResponseWriter, r *http.Request) {
 	w.Write(roundResult)
 }
 
+// defaultRoundTimeoutSeconds returns the round timeout configured for the aggregator (ROUND_TIMEOUT_MINUTES)
+func defaultRoundTimeoutSeconds() int {
+	minutes, err := strconv.Atoi(os.Getenv("ROUND_TIMEOUT_MINUTES"))
+	if err != nil || minutes <= 0 {
+		minutes = 3
+	}
+	return minutes * 60
+}
+
 func OptInBank(w http.ResponseWriter, r *http.Request) {
 	log.Println("API: Bank Opt-In")
 
@@ -555,6 +573,46 @@ func GetModelContribution(w http.ResponseWriter, r *http.Request) {
     http.Error(w, "Contribution not found", http.StatusNotFound)
 }
 
+// GetRoundModelHashes returns the recorded weight hash of every model object in a round, keyed by model URI
+func GetRoundModelHashes(w http.ResponseWriter, r *http.Request) {
+    roundID := mux.Vars(r)["roundId"]
+
+    result, err := contract.EvaluateTransaction("GetContributionsByRound", roundID)
+    if err != nil {
+        log.Printf("Failed to query contributions: %v", err)
+        http.Error(w, fmt.Sprintf("Failed to query contributions: %v", err), http.StatusInternalServerError)
+        return
+    }
+
+    var contributions []*ModelContribution
+    if err := json.Unmarshal(result, &contributions); err != nil {
+        http.Error(w, "Failed to parse contribution data", http.StatusInternalServerError)
+        return
+    }
+
+    hashes := map[string]string{}
+    for _, contribution := range contributions {
+        if contribution.ModelURI != "" && contribution.WeightHash != "" {
+            hashes[contribution.ModelURI] = contribution.WeightHash
+        }
+    }
+
+    // The aggregated model is recorded on the round itself
+    roundResult, err := contract.EvaluateTransaction("GetTrainingRound", roundID)
+    if err == nil {
+        var round TrainingRound
+        if json.Unmarshal(roundResult, &round) == nil && round.ModelURI != "" && round.ModelWeightHash != "" {
+            hashes[round.ModelURI] = round.ModelWeightHash
+        }
+    }
+
+    w.Header().Set("Content-Type", "application/json")
+    json.NewEncoder(w).Encode(map[string]interface{}{
+        "roundId": roundID,
+        "hashes":  hashes,
+    })
+}
+
 // GetParticipantReputation gets reputation data for a specific participant
 func GetParticipantReputation(w http.ResponseWriter, r *http.Request) {
     vars := mux.Vars(r)
@@ -627,6 +685,93 @@ func GetRoundQualityMetrics(w http.ResponseWriter, r *http.Request) {
     w.Write(result)
 }
 
+// SubmitGlobalModelEvaluation records this bank's evaluation of the published global model
+func SubmitGlobalModelEvaluation(w http.ResponseWriter, r *http.Request) {
+    log.Println("API: Submit Global Model Evaluation")
+
+    var request struct {
+        RoundID       string          `json:"roundId"`
+        ParticipantID string          `json:"participantId"`
+        Evaluation    json.RawMessage `json:"evaluation"`
+    }
+
+    err := json.NewDecoder(r.Body).Decode(&request)
+    if err != nil || request.RoundID == "" || request.ParticipantID == "" || len(request.Evaluation) == 0 {
+        log.Printf("Failed to parse request: %v", err)
+        http.Error(w, "Invalid request data", http.StatusBadRequest)
+        return
+    }
+
+    _, err = contract.SubmitTransaction("RecordGlobalModelEvaluation", request.RoundID, request.ParticipantID, string(request.Evaluation))
+    if err != nil {
+        log.Printf("Failed to record global model evaluation: %v", err)
+        http.Error(w, fmt.Sprintf("Failed to record global model evaluation: %v", err), http.StatusInternalServerError)
+        return
+    }
+
+    w.Header().Set("Content-Type", "application/json")
+    json.NewEncoder(w).Encode(map[string]string{"status": "success"})
+}
+
+// GetGlobalModelEvaluations returns every bank's evaluation of a round's global model, plus the pooled totals
+func GetGlobalModelEvaluations(w http.ResponseWriter, r *http.Request) {
+    roundID := mux.Vars(r)["roundId"]
+
+    result, err := contract.EvaluateTransaction("GetGlobalModelEvaluations", roundID)
+    if err != nil {
+        log.Printf("Failed to get global model evaluations: %v", err)
+        http.Error(w, fmt.Sprintf("Failed to get global model evaluations: %v", err), http.StatusInternalServerError)
+        return
+    }
+
+    var evaluations []struct {
+        NumSamples     int64   `json:"numSamples"`
+        LossSum        float64 `json:"lossSum"`
+        TruePositives  int64   `json:"truePositives"`
+        FalsePositives int64   `json:"falsePositives"`
+        TrueNegatives  int64   `json:"trueNegatives"`
+        FalseNegatives int64   `json:"falseNegatives"`
+    }
+    if err := json.Unmarshal(result, &evaluations); err != nil {
+        http.Error(w, "Failed to parse global model evaluations", http.StatusInternalServerError)
+        return
+    }
+
+    // Pool the counts; they add up exactly across banks
+    var samples, tp, fp, tn, fn int64
+    var lossSum float64
+    for _, evaluation := range evaluations {
+        samples += evaluation.NumSamples
+        lossSum += evaluation.LossSum
+        tp += evaluation.TruePositives
+        fp += evaluation.FalsePositives
+        tn += evaluation.TrueNegatives
+        fn += evaluation.FalseNegatives
+    }
+
+    pooled := map[string]interface{}{
+        "banks":      len(evaluations),
+        "numSamples": samples,
+    }
+    if samples > 0 {
+        pooled["loss"] = lossSum / float64(samples)
+        pooled["accuracy"] = float64(tp+tn) / float64(samples)
+    }
+    if tp+fp > 0 {
+        pooled["precision"] = float64(tp) / float64(tp+fp)
+    }
+    if tp+fn > 0 {
+        pooled["recall"] = float64(tp) / float64(tp+fn)
+    }
+
+    w.Header().Set("Content-Type", "application/json")
+    json.NewEncoder(w).Encode(map[string]interface{}{
+        "roundId":     roundID,
+        "evaluations": json.RawMessage(result),
+        "pooled":      pooled,
+    })
+}
+
 // GetQualityMetricsForParticipant gets quality metrics for a specific participant
 func GetQualityMetricsForParticipant(w http.ResponseWriter, r *http.Request) {
     vars := mux.Vars(r)
@@ -664,6 +809,7 @@ func GetQualityMetricsForParticipant(w http.ResponseWriter, r *http.Request) {
                 "rejectedCount": 0,
                 "lastUpdated": time.Now().Unix(),
                 "currentScore": 0.0,
+                "version": 0,
             }
             w.Header().Set("Content-Type", "application/json")
             json.NewEncoder(w).Encode(response)
@@ -681,6 +827,7 @@ func GetQualityMetricsForParticipant(w http.ResponseWriter, r *http.Request) {
         AcceptedCount  int       `json:"acceptedCount"`
         RejectedCount  int       `json:"rejectedCount"`
         LastUpdated    int64     `json:"lastUpdated"`
+        Version        int64     `json:"version"`
     }
 
     err = json.Unmarshal(result, &qualityData)
@@ -716,6 +863,7 @@ func GetQualityMetricsForParticipant(w http.ResponseWriter, r *http.Request) {
         "rejectedCount":  qualityData.RejectedCount,
         "lastUpdated":    qualityData.LastUpdated,
         "currentScore":   currentScore,
+        "version":        qualityData.Version,
     }
 
     w.Header().Set("Content-Type", "application/json")
@@ -739,9 +887,12 @@ func main() {
     router.HandleFunc("/banks/opt-out", OptOutBank).Methods("POST")
     router.HandleFunc("/models/contribution", SubmitContribution).Methods("POST")
     router.HandleFunc("/models/final", SubmitFinalModel).Methods("POST")
+    router.HandleFunc("/models/global/evaluation", SubmitGlobalModelEvaluation).Methods("POST")
 
     // Add endpoints for model contribution retrieval
     router.HandleFunc("/models/contribution", GetModelContribution).Methods("GET")
+    router.HandleFunc("/models/global/evaluation/{roundId}", GetGlobalModelEvaluations).Methods("GET")
+    router.HandleFunc("/models/hashes/{roundId}", GetRoundModelHashes).Methods("GET")
 
     // Add endpoints for reputation and quality
     router.HandleFunc("/reputation/{participantId}", GetParticipantReputation).Methods("GET")
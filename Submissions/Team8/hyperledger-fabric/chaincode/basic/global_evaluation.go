@@ -0,0 +1,107 @@
+package main
+
+import (
+	"encoding/json"
+	"fmt"
+	"time"
+
+	"github.com/hyperledger/fabric-contract-api-go/contractapi"
+)
+
+// GlobalModelEvaluation holds a bank's evaluation of a published global model on its local validation split.
+// Only counts and sums are stored, so evaluations from all banks can be pooled exactly.
+type GlobalModelEvaluation struct {
+	ID                      string    `json:"ID"`
+	RoundID                 string    `json:"roundID"`
+	ParticipantID           string    `json:"participantID"`
+	ModelURI                string    `json:"modelURI"`
+	WeightHash              string    `json:"weightHash"`
+	EvaluatedAt             int64     `json:"evaluatedAt"`
+	NumSamples              int64     `json:"numSamples"`
+	LossSum                 float64   `json:"lossSum"`
+	TruePositives           int64     `json:"truePositives"`
+	FalsePositives          int64     `json:"falsePositives"`
+	TrueNegatives           int64     `json:"trueNegatives"`
+	FalseNegatives          int64     `json:"falseNegatives"`
+	Thresholds              []float64 `json:"thresholds"`
+	ThresholdTruePositives  []int64   `json:"thresholdTruePositives"`
+	ThresholdFalsePositives []int64   `json:"thresholdFalsePositives"`
+}
+
+// RecordGlobalModelEvaluation stores a bank's evaluation of the global model for a round
+func (s *SmartContract) RecordGlobalModelEvaluation(ctx contractapi.TransactionContextInterface, roundID string,
+	participantID string, evaluationJSON string) error {
+
+	var evaluation GlobalModelEvaluation
+	err := json.Unmarshal([]byte(evaluationJSON), &evaluation)
+	if err != nil {
+		return fmt.Errorf("failed to parse evaluation: %v", err)
+	}
+
+	if len(evaluation.Thresholds) != len(evaluation.ThresholdTruePositives) ||
+		len(evaluation.Thresholds) != len(evaluation.ThresholdFalsePositives) {
+		return fmt.Errorf("threshold counts do not match the thresholds")
+	}
+
+	evaluation.ID = "GLOBAL_EVAL_" + roundID + "_" + participantID
+	evaluation.RoundID = roundID
+	evaluation.ParticipantID = participantID
+	evaluation.EvaluatedAt = time.Now().Unix()
+
+	evaluationBytes, err := json.Marshal(evaluation)
+	if err != nil {
+		return err
+	}
+
+	// One record per bank and round; a re-evaluation replaces the previous one
+	err = ctx.GetStub().PutState(evaluation.ID, evaluationBytes)
+	if err != nil {
+		return fmt.Errorf("failed to store global model evaluation: %v", err)
+	}
+
+	// Emit GLOBAL_MODEL_EVALUATED event
+	eventPayload := map[string]interface{}{
+		"round_id":       roundID,
+		"participant_id": participantID,
+		"num_samples":    evaluation.NumSamples,
+	}
+
+	eventJSON, _ := json.Marshal(eventPayload)
+	err = ctx.GetStub().SetEvent("GLOBAL_MODEL_EVALUATED", eventJSON)
+	if err != nil {
+		return fmt.Errorf("failed to emit GLOBAL_MODEL_EVALUATED event: %v", err)
+	}
+
+	return nil
+}
+
+// GetGlobalModelEvaluations returns all bank evaluations of the global model for a round
+func (s *SmartContract) GetGlobalModelEvaluations(ctx contractapi.TransactionContextInterface, roundID string) ([]*GlobalModelEvaluation, error) {
+	prefix := "GLOBAL_EVAL_" + roundID + "_"
+	resultsIterator, err := ctx.GetStub().GetStateByRange(prefix, prefix+"~")
+	if err != nil {
+		return nil, err
+	}
+	defer resultsIterator.Close()
+
+	evaluations := []*GlobalModelEvaluation{}
+	for resultsIterator.HasNext() {
+		queryResponse, err := resultsIterator.Next()
+		if err != nil {
+			return nil, err
+		}
+
+		var evaluation GlobalModelEvaluation
+		err = json.Unmarshal(queryResponse.Value, &evaluation)
+		if err != nil {
+			continue
+		}
+
+		// Round IDs can share a prefix, so match exactly
+		if evaluation.RoundID == roundID {
+			evaluations = append(evaluations, &evaluation)
+		}
+	}
+
+	return evaluations, nil
+}
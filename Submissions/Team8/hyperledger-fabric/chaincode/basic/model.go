@@ -6,6 +6,7 @@ type TrainingRound struct {
 	Initiator       string   `json:"initiator"`
 	StartTime       int64    `json:"startTime"`
 	EndTime         int64    `json:"endTime"`
+	Deadline        int64    `json:"deadline"` // Unix time by which contributions must be submitted
 	Status          string   `json:"status"` // "INITIATED", "IN_PROGRESS", "COMPLETED", "FAILED"
 	Participants    []string `json:"participants"`
 	ModelWeightHash string   `json:"modelWeightHash"` // Hash of final model weights
@@ -28,6 +28,7 @@ type ParticipantQualityData struct {
 	AcceptedCount  int       `json:"acceptedCount"`
 	RejectedCount  int       `json:"rejectedCount"`
 	LastUpdated    int64     `json:"lastUpdated"`
+	Version        int64     `json:"version"` // Incremented on every update, sent as the event sequence
 }
 
 // RecordQualityMetrics saves quality metrics for a training round
@@ -65,11 +66,13 @@ func (s *SmartContract) RecordQualityMetrics(ctx contractapi.TransactionContextI
 	}
 
 	// Update quality history for each participant
+	sequences := make(map[string]int64)
 	for participantID, qualityScore := range participantData {
-		err = s.updateParticipantQualityHistory(ctx, participantID, qualityScore, qualityScore >= threshold)
+		version, err := s.updateParticipantQualityHistory(ctx, participantID, qualityScore, qualityScore >= threshold)
 		if err != nil {
 			return fmt.Errorf("failed to update participant history: %v", err)
 		}
+		sequences[participantID] = version
 	}
 
 	// Update training round with quality metadata
@@ -104,6 +107,8 @@ func (s *SmartContract) RecordQualityMetrics(ctx contractapi.TransactionContextI
 		"average_quality": averageQuality,
 		"accepted_count":  acceptedCount,
 		"rejected_count":  rejectedCount,
+		"participants":    participantData,
+		"sequences":       sequences,
 	}
 
 	eventJSON, _ := json.Marshal(eventPayload)
@@ -115,9 +120,9 @@ func (s *SmartContract) RecordQualityMetrics(ctx contractapi.TransactionContextI
 	return nil
 }
 
-// updateParticipantQualityHistory updates quality history for a participant
+// updateParticipantQualityHistory updates quality history for a participant and returns the new version
 func (s *SmartContract) updateParticipantQualityHistory(ctx contractapi.TransactionContextInterface,
-	participantID string, qualityScore float64, accepted bool) error {
+	participantID string, qualityScore float64, accepted bool) (int64, error) {
 
 	// Get existing quality history
 	qualityDataJSON, err := ctx.GetStub().GetState("PARTICIPANT_QUALITY_" + participantID)
@@ -127,7 +132,7 @@ func (s *SmartContract) updateParticipantQualityHistory(ctx contractapi.Transact
 		// Parse existing data
 		err = json.Unmarshal(qualityDataJSON, &qualityData)
 		if err != nil {
-			return fmt.Errorf("failed to parse quality data: %v", err)
+			return 0, fmt.Errorf("failed to parse quality data: %v", err)
 		}
 	} else {
 		// Create new quality data
@@ -154,19 +159,20 @@ func (s *SmartContract) updateParticipantQualityHistory(ctx contractapi.Transact
 	}
 
 	qualityData.LastUpdated = time.Now().Unix()
+	qualityData.Version++
 
 	// Save updated data
 	updatedJSON, err := json.Marshal(qualityData)
 	if err != nil {
-		return fmt.Errorf("failed to marshal updated quality data: %v", err)
+		return 0, fmt.Errorf("failed to marshal updated quality data: %v", err)
 	}
 
 	err = ctx.GetStub().PutState("PARTICIPANT_QUALITY_"+participantID, updatedJSON)
 	if err != nil {
-		return fmt.Errorf("failed to store participant quality data: %v", err)
+		return 0, fmt.Errorf("failed to store participant quality data: %v", err)
 	}
 
-	return nil
+	return qualityData.Version, nil
 }
 
 // GetQualityMetricsForRound retrieves quality metrics for a specific round
@@ -14,6 +14,7 @@ type ReputationRecord struct {
 	ParticipantID string  `json:"participantID"`
 	Score         float64 `json:"score"`
 	LastUpdated   int64   `json:"lastUpdated"`
+	Version       int64   `json:"version"` // Incremented on every update, sent as the event sequence
 	History       []ReputationChange `json:"history"`
 }
 
@@ -91,9 +92,10 @@ func (s *SmartContract) UpdateParticipantReputation(ctx contractapi.TransactionC
 		reputationRecord.History = reputationRecord.History[len(reputationRecord.History)-10:]
 	}
 	
-	// Update the score and timestamp
+	// Update the score, timestamp and version
 	reputationRecord.Score = newScore
 	reputationRecord.LastUpdated = time.Now().Unix()
+	reputationRecord.Version++
 	
 	// Save updated record
 	recordJSON, err := json.Marshal(reputationRecord)
@@ -113,6 +115,7 @@ func (s *SmartContract) UpdateParticipantReputation(ctx contractapi.TransactionC
 		"new_score":      change.NewScore,
 		"reason":         change.Reason,
 		"round_id":       change.RoundID,
+		"sequence":       reputationRecord.Version,
 	}
 
 	eventJSON, _ := json.Marshal(eventPayload)
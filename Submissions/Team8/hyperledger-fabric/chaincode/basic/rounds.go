@@ -3,13 +3,14 @@ package main
 import (
 	"encoding/json"
 	"fmt"
+	"strconv"
 	"time"
 
 	"github.com/hyperledger/fabric-contract-api-go/contractapi"
 )
 
-// CreateTrainingRound starts a new federated learning round
-func (s *SmartContract) CreateTrainingRound(ctx contractapi.TransactionContextInterface, id string, initiator string, description string) error {
+// CreateTrainingRound starts a new federated learning round that accepts contributions for timeoutSeconds
+func (s *SmartContract) CreateTrainingRound(ctx contractapi.TransactionContextInterface, id string, initiator string, description string, timeoutSeconds int) error {
 	exists, err := s.TrainingRoundExists(ctx, id)
 	if err != nil {
 		return err
@@ -18,10 +19,16 @@ func (s *SmartContract) CreateTrainingRound(ctx contractapi.TransactionContextIn
 		return fmt.Errorf("the training round %s already exists", id)
 	}
 
+	if timeoutSeconds <= 0 {
+		return fmt.Errorf("timeoutSeconds must be positive, got %d", timeoutSeconds)
+	}
+
+	startTime := time.Now().Unix()
 	round := TrainingRound{
 		ID:           id,
 		Initiator:    initiator,
-		StartTime:    time.Now().Unix(),
+		StartTime:    startTime,
+		Deadline:     startTime + int64(timeoutSeconds),
 		Status:       "INITIATED",
 		Participants: []string{},
 		Description:  description,
@@ -42,6 +49,8 @@ func (s *SmartContract) CreateTrainingRound(ctx contractapi.TransactionContextIn
 		"round_id": id,
 		"initiator": initiator,
 		"description": description,
+		"deadline": strconv.FormatInt(round.Deadline, 10),
+		"timeout_seconds": strconv.Itoa(timeoutSeconds),
 	}
 	eventJSON, _ := json.Marshal(eventPayload)
 	err = ctx.GetStub().SetEvent("ROUND_STARTED", eventJSON)
@@ -92,6 +101,45 @@ func (s *SmartContract) UpdateTrainingRoundStatus(ctx contractapi.TransactionCon
 	return ctx.GetStub().PutState("ROUND_"+id, roundJSON)
 }
 
+// UpdateRoundParticipants sets the participants expected to submit models for a round
+func (s *SmartContract) UpdateRoundParticipants(ctx contractapi.TransactionContextInterface, id string, participantsJSON string) error {
+	round, err := s.GetTrainingRound(ctx, id)
+	if err != nil {
+		return err
+	}
+
+	var participants []string
+	err = json.Unmarshal([]byte(participantsJSON), &participants)
+	if err != nil {
+		return fmt.Errorf("failed to parse participants: %v", err)
+	}
+
+	round.Participants = participants
+
+	roundJSON, err := json.Marshal(round)
+	if err != nil {
+		return err
+	}
+
+	err = ctx.GetStub().PutState("ROUND_"+id, roundJSON)
+	if err != nil {
+		return err
+	}
+
+	// Emit ROUND_PARTICIPANTS_UPDATED event so clients know whether they were selected
+	eventPayload := map[string]interface{}{
+		"round_id":     id,
+		"participants": participants,
+	}
+	eventJSON, _ := json.Marshal(eventPayload)
+	err = ctx.GetStub().SetEvent("ROUND_PARTICIPANTS_UPDATED", eventJSON)
+	if err != nil {
+		return fmt.Errorf("failed to emit ROUND_PARTICIPANTS_UPDATED event: %v", err)
+	}
+
+	return nil
+}
+
 // GetAllTrainingRounds returns all training rounds found in world state
 func (s *SmartContract) GetAllTrainingRounds(ctx contractapi.TransactionContextInterface) ([]*TrainingRound, error) {
 	// Get all keys that start with ROUND_
@@ -0,0 +1,121 @@
+"""Benchmarks the aggregator's server optimizers by simulating federated rounds on the bank datasets."""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+# Set up paths using relative paths - go up from scripts/benchmark to the project root
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(BASE_DIR, "federated", "aggregator", "src"))
+
+from server_optimizer import SUPPORTED_OPTIMIZERS, init_optimizer_state, apply_server_update
+
+BANKS = ["dbs", "ocbc", "ing"]
+
+def load_bank_data(bank, max_samples=None):
+    """Loads and scales a bank's training data the same way client.py does."""
+    csv_path = os.path.join(BASE_DIR, "federated", "clients", "data", bank, "fraud_data.csv")
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"{csv_path} not found - run generate_fraud_data.py first")
+
+    df = pd.read_csv(csv_path, nrows=max_samples)
+    X = StandardScaler().fit_transform(df.iloc[:, :-1].values)
+    y = df.iloc[:, -1].values
+    return train_test_split(X, y, test_size=0.2, random_state=42)
+
+def load_eval_data(max_samples=None):
+    """Loads the combined evaluation dataset."""
+    csv_path = os.path.join(BASE_DIR, "scripts", "evaluation", "combined_fraud_data.csv")
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"{csv_path} not found - run generate_fraud_data.py first")
+
+    df = pd.read_csv(csv_path, nrows=max_samples)
+    X = StandardScaler().fit_transform(df.drop(columns=["Class"]).values)
+    y = df["Class"].values
+    return X, y
+
+def create_model(input_shape, learning_rate=0.001):
+    """Creates a model with the same architecture as in client.py."""
+    model = tf.keras.Sequential()
+    model.add(tf.keras.layers.Dense(64, activation="relu", input_shape=(input_shape,)))
+    model.add(tf.keras.layers.Dense(32, activation="relu"))
+    model.add(tf.keras.layers.Dense(1, activation="sigmoid"))
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+                  loss="binary_crossentropy", metrics=["accuracy"])
+    return model
+
+def run_simulation(optimizer, bank_data, X_eval, y_eval, args):
+    """Runs federated rounds with the given server optimizer and returns per-round accuracy."""
+    tf.keras.utils.set_random_seed(args.seed)
+
+    input_shape = X_eval.shape[1]
+    model = create_model(input_shape)
+    global_weights = model.get_weights()
+    state = init_optimizer_state(optimizer)
+    apply_server_update(state, global_weights, optimizer=optimizer)
+
+    accuracies = []
+    for round_num in range(1, args.rounds + 1):
+        client_weights = []
+        client_sizes = []
+        for bank in BANKS:
+            X_train, _, y_train, _ = bank_data[bank]
+            model.set_weights(global_weights)
+            model.fit(X_train, y_train, epochs=args.local_epochs, batch_size=args.batch_size, verbose=0)
+            client_weights.append(model.get_weights())
+            client_sizes.append(len(X_train))
+
+        # Sample-count weighted average of the client models
+        norm = np.array(client_sizes, dtype=np.float64) / sum(client_sizes)
+        avg_weights = [
+            sum(weights[layer_idx] * norm[idx] for idx, weights in enumerate(client_weights))
+            for layer_idx in range(len(client_weights[0]))
+        ]
+
+        global_weights = apply_server_update(
+            state, avg_weights, optimizer=optimizer, learning_rate=args.server_lr
+        )
+
+        model.set_weights(global_weights)
+        _, accuracy = model.evaluate(X_eval, y_eval, batch_size=4096, verbose=0)
+        accuracies.append(accuracy)
+        print(f"   [{optimizer}] round {round_num}: accuracy={accuracy:.4f}")
+
+    return accuracies
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark server-side optimizers for federated aggregation")
+    parser.add_argument("--optimizers", type=str, nargs="+", choices=SUPPORTED_OPTIMIZERS,
+                        default=list(SUPPORTED_OPTIMIZERS), help="Server optimizers to compare")
+    parser.add_argument("--rounds", type=int, default=10, help="Number of federated rounds to simulate")
+    parser.add_argument("--local-epochs", type=int, default=1, help="Local epochs per bank per round")
+    parser.add_argument("--batch-size", type=int, default=32, help="Local training batch size")
+    parser.add_argument("--server-lr", type=float, default=None, help="Server learning rate (defaults per optimizer)")
+    parser.add_argument("--target-accuracy", type=float, default=0.9, help="Target accuracy on the combined evaluation set")
+    parser.add_argument("--max-samples", type=int, default=None, help="Limit rows loaded per dataset")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+
+    args = parser.parse_args()
+
+    print("Loading datasets...")
+    bank_data = {bank: load_bank_data(bank, args.max_samples) for bank in BANKS}
+    X_eval, y_eval = load_eval_data(args.max_samples)
+
+    results = {}
+    for optimizer in args.optimizers:
+        print(f"\n🧭 Simulating {args.rounds} rounds with {optimizer}...")
+        start = time.time()
+        accuracies = run_simulation(optimizer, bank_data, X_eval, y_eval, args)
+        reached = next((idx + 1 for idx, acc in enumerate(accuracies) if acc >= args.target_accuracy), None)
+        results[optimizer] = (reached, max(accuracies), time.time() - start)
+
+    print(f"\n--- Rounds to reach {args.target_accuracy:.2%} accuracy on combined data ---")
+    for optimizer, (reached, best, elapsed) in results.items():
+        rounds_str = str(reached) if reached is not None else f">{args.rounds}"
+        print(f"{optimizer.ljust(10)}: rounds={rounds_str.ljust(6)} | best accuracy={best:.4f} | time={elapsed:.1f}s")
@@ -0,0 +1,106 @@
+"""Benchmarks per-round training subsets (TRAIN_SUBSAMPLE in client.py) against full-data training."""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+# Set up paths using relative paths - go up from scripts/benchmark to the project root
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(BASE_DIR, "federated", "clients", "src"))
+
+from subsample import SUPPORTED_SAMPLERS, select_training_subset, binary_crossentropy_per_row
+
+def load_bank_data(bank, scale=1, max_samples=None, seed=42):
+    """Loads, splits and scales a bank's data the same way client.py does, replicating the training split `scale` times."""
+    csv_path = os.path.join(BASE_DIR, "federated", "clients", "data", bank, "fraud_data.csv")
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"{csv_path} not found - run generate_fraud_data.py first")
+
+    df = pd.read_csv(csv_path, nrows=max_samples)
+    X_train, X_test, y_train, y_test = train_test_split(
+        df.iloc[:, :-1].values, df.iloc[:, -1].values, test_size=0.2, random_state=seed
+    )
+    scaler = StandardScaler().fit(X_train)
+    X_train = scaler.transform(X_train).astype(np.float32)
+    X_test = scaler.transform(X_test).astype(np.float32)
+
+    # Only the training split is replicated, so no near-copy of a training row reaches the test set.
+    # Replicas get a little noise so they are not exact duplicates
+    if scale > 1:
+        rng = np.random.default_rng(seed)
+        X_train = np.concatenate([X_train] + [X_train + rng.normal(0, 0.05, X_train.shape).astype(np.float32) for _ in range(scale - 1)])
+        y_train = np.concatenate([y_train] * scale)
+
+    return X_train, X_test, y_train, y_test
+
+def create_model(input_shape, learning_rate=0.001):
+    """Creates a model with the same architecture as in client.py."""
+    model = tf.keras.Sequential()
+    model.add(tf.keras.layers.Dense(64, activation="relu", input_shape=(input_shape,)))
+    model.add(tf.keras.layers.Dense(32, activation="relu"))
+    model.add(tf.keras.layers.Dense(1, activation="sigmoid"))
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+                  loss="binary_crossentropy", metrics=["accuracy"])
+    return model
+
+def run_strategy(strategy, X_train, y_train, X_test, y_test, args):
+    """Trains for the given number of rounds and returns (mean seconds per round, accuracy, loss)."""
+    tf.keras.utils.set_random_seed(args.seed)
+    model = create_model(X_train.shape[1])
+    losses = np.full(len(y_train), np.nan)
+
+    round_seconds = []
+    for round_num in range(1, args.rounds + 1):
+        start = time.perf_counter()
+        if strategy == "full":
+            model.fit(X_train, y_train, epochs=1, batch_size=args.batch_size, verbose=0)
+        else:
+            indices, weights, method = select_training_subset(
+                strategy, y_train, args.subsample_size, losses, seed=args.seed + round_num
+            )
+            model.fit(X_train[indices], y_train[indices], sample_weight=weights.astype(np.float32),
+                      epochs=1, batch_size=args.batch_size, verbose=0)
+            if strategy == "importance":
+                y_prob = model.predict(X_train[indices], batch_size=4096, verbose=0)
+                losses[indices] = binary_crossentropy_per_row(y_train[indices], y_prob)
+        round_seconds.append(time.perf_counter() - start)
+
+        loss, accuracy = model.evaluate(X_test, y_test, batch_size=4096, verbose=0)
+        print(f"   [{strategy}] round {round_num}: {round_seconds[-1]:.2f}s, accuracy={accuracy:.4f}, loss={loss:.4f}")
+
+    return float(np.mean(round_seconds)), accuracy, loss
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-round training subsets against full-data training")
+    parser.add_argument("--bank", type=str, default="dbs", help="Bank dataset to use")
+    parser.add_argument("--strategies", type=str, nargs="+", choices=("full",) + SUPPORTED_SAMPLERS,
+                        default=["full"] + list(SUPPORTED_SAMPLERS), help="Strategies to compare")
+    parser.add_argument("--scale", type=int, default=10, help="Replicate the dataset this many times")
+    parser.add_argument("--subsample-size", type=int, default=50000, help="Training rows per round for the samplers")
+    parser.add_argument("--rounds", type=int, default=5, help="Number of rounds (one local epoch each)")
+    parser.add_argument("--batch-size", type=int, default=256, help="Training batch size")
+    parser.add_argument("--max-samples", type=int, default=None, help="Limit rows loaded from the CSV")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+
+    args = parser.parse_args()
+
+    print("Loading dataset...")
+    X_train, X_test, y_train, y_test = load_bank_data(args.bank, args.scale, args.max_samples, args.seed)
+    print(f"{len(X_train)} training rows, {len(X_test)} test rows, fraud rate {y_train.mean():.2%}")
+
+    results = {}
+    for strategy in args.strategies:
+        print(f"\n🎯 Training {args.rounds} rounds with {strategy}...")
+        results[strategy] = run_strategy(strategy, X_train, y_train, X_test, y_test, args)
+
+    print(f"\n--- Per-round training time and final test metrics ({len(X_train)} training rows) ---")
+    full_seconds = results.get("full", (None,))[0]
+    for strategy, (seconds, accuracy, loss) in results.items():
+        speedup = f" | speedup={full_seconds / seconds:.1f}x" if full_seconds and strategy != "full" else ""
+        print(f"{strategy.ljust(10)}: {seconds:.2f}s/round | accuracy={accuracy:.4f} | loss={loss:.4f}{speedup}")
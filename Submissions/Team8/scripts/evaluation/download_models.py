@@ -1,37 +1,249 @@
-from minio import Minio
+"""Downloads model archives from MinIO for offline analysis, in parallel, resumably and verified by hash."""
+
 import os
+import json
+import time
+import hashlib
+import argparse
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# Define evaluation directory using relative path
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-eval_dir = os.path.join(BASE_DIR, "scripts", "evaluation")
-os.makedirs(eval_dir, exist_ok=True)
+# Set up paths using relative paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+EVAL_DIR = os.path.join(BASE_DIR, "scripts", "evaluation")
 
 # MinIO connection details
-MINIO_ENDPOINT = "localhost:9000"
-ACCESS_KEY = "fladmin"
-SECRET_KEY = "flsecret"
+MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", "localhost:9000")
+ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY", "fladmin")
+SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "flsecret")
 SECURE = False  # Set to True if using HTTPS
-ROUND_ID = "round:1"
-
-# Initialize MinIO client
-client = Minio(
-    MINIO_ENDPOINT,
-    access_key=ACCESS_KEY,
-    secret_key=SECRET_KEY,
-    secure=SECURE
-)
-
-# Download models
-def download_model(bucket_name, object_name, file_path):
+BUCKET = "models"
+
+CHUNK_SIZE = 1024 * 1024  # Bytes read and hashed at a time
+
+class MinioStore:
+    """Lists and reads objects in the models bucket."""
+
+    def __init__(self):
+        from minio import Minio
+        self.client = Minio(MINIO_ENDPOINT, access_key=ACCESS_KEY, secret_key=SECRET_KEY, secure=SECURE)
+
+    def list_objects(self, prefix):
+        """Yields (object name, size) for every object under a prefix."""
+        for obj in self.client.list_objects(BUCKET, prefix=prefix, recursive=True):
+            yield obj.object_name, obj.size
+
+    def read(self, object_name, offset=0):
+        """Yields the object's bytes from an offset, in chunks."""
+        response = self.client.get_object(BUCKET, object_name, offset=offset)
+        try:
+            for chunk in response.stream(CHUNK_SIZE):
+                yield chunk
+        finally:
+            response.close()
+            response.release_conn()
+
+class FilesystemStore:
+    """Stand-in for MinIO that serves a directory laid out like the bucket: <root>/<object name>."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def list_objects(self, prefix):
+        """Yields (object name, size) for every file under a prefix."""
+        for dir_path, _, file_names in os.walk(self.root):
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                object_name = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if object_name.startswith(prefix):
+                    yield object_name, os.path.getsize(path)
+
+    def read(self, object_name, offset=0):
+        """Yields the file's bytes from an offset, in chunks."""
+        with open(os.path.join(self.root, *object_name.split("/")), "rb") as f:
+            f.seek(offset)
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+def local_path(output_dir, object_name):
+    """Maps an object name to its local path."""
+    return os.path.join(output_dir, *object_name.replace(":", "_").split("/"))
+
+def file_sha256(path):
+    """Returns a file's SHA-256, cached in a sidecar while the file's size and mtime are unchanged."""
+    stat = os.stat(path)
+    sidecar = f"{path}.sha256.json"
+    if os.path.exists(sidecar):
+        with open(sidecar, "r") as f:
+            cached = json.load(f)
+        if cached.get("size") == stat.st_size and cached.get("mtime_ns") == stat.st_mtime_ns:
+            return cached["sha256"]
+
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    write_sha256_sidecar(path, sha256.hexdigest())
+    return sha256.hexdigest()
+
+def write_sha256_sidecar(path, digest):
+    stat = os.stat(path)
+    with open(f"{path}.sha256.json", "w") as f:
+        json.dump({"sha256": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}, f)
+
+def download_object(store, object_name, size, output_dir, expected_hash, retries):
+    """
+    Downloads one object, resuming a partial file and verifying its hash.
+
+    Returns:
+        (status, sha256, bytes transferred), status being "skipped", "downloaded", "resumed" or "failed"
+    """
+    path = local_path(output_dir, object_name)
+
+    # Already complete: the hash matches the ledger, or the size matches when no hash is known
+    if os.path.exists(path):
+        if expected_hash and file_sha256(path) == expected_hash:
+            return "skipped", expected_hash, 0
+        if not expected_hash and os.path.getsize(path) == size:
+            return "skipped", file_sha256(path), 0
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    part_path = f"{path}.part"
+    transferred = 0
+    resumed = False
+
+    for attempt in range(1, retries + 1):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if offset > size:
+            os.remove(part_path)
+            offset = 0
+        resumed = resumed or offset > 0
+
+        # Hash the bytes already on disk, then continue hashing as the rest streams in
+        sha256 = hashlib.sha256()
+        if offset:
+            with open(part_path, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    sha256.update(chunk)
+
+        try:
+            with open(part_path, "ab") as f:
+                for chunk in store.read(object_name, offset):
+                    f.write(chunk)
+                    sha256.update(chunk)
+                    transferred += len(chunk)
+        except Exception as e:
+            print(f"⚠️ {object_name}: attempt {attempt}/{retries} interrupted ({e}), will resume")
+            time.sleep(min(2 ** attempt, 30))
+            continue
+
+        digest = sha256.hexdigest()
+        if expected_hash and digest != expected_hash:
+            # A corrupt or stale partial file: start over from scratch
+            print(f"❌ {object_name}: hash mismatch (expected {expected_hash[:12]}, got {digest[:12]}), retrying from scratch")
+            os.remove(part_path)
+            continue
+
+        os.replace(part_path, path)
+        write_sha256_sidecar(path, digest)
+        return ("resumed" if resumed else "downloaded"), digest, transferred
+
+    return "failed", None, transferred
+
+def load_manifest_hashes(path):
+    """Reads expected hashes from a manifest: {object: sha256} or this script's {"objects": {object: {"sha256": ...}}}."""
+    with open(path, "r") as f:
+        manifest = json.load(f)
+    objects = manifest.get("objects", manifest)
+    return {name: entry["sha256"] if isinstance(entry, dict) else entry for name, entry in objects.items()}
+
+def fetch_ledger_hashes(ledger_url, round_id):
+    """Returns {model URI: weightHash} recorded on the ledger for a round."""
     try:
-        client.fget_object(bucket_name, object_name, file_path)
-        print(f"✅ Successfully downloaded {object_name} to {file_path}")
-    except Exception as e:
-        print(f"❌ Error downloading {object_name}: {e}")
+        response = requests.get(f"{ledger_url}/models/hashes/{round_id}", timeout=30)
+        if response.status_code == 200:
+            return response.json().get("hashes") or {}
+        print(f"⚠️ Could not get ledger hashes for {round_id}: {response.status_code} {response.text[:200]}")
+    except requests.RequestException as e:
+        print(f"⚠️ Could not get ledger hashes for {round_id}: {e}")
+    return {}
+
+def parse_rounds(rounds):
+    """Parses "5" or "1-300" into a list of round numbers."""
+    first, _, last = rounds.partition("-")
+    return list(range(int(first), int(last or first) + 1))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download model archives in parallel, resumably, with hash verification")
+    parser.add_argument("--rounds", type=str, default="1", help="Round number or range, e.g. 1-300")
+    parser.add_argument("--round-prefix", type=str, default="round:", help="Round ID prefix before the number")
+    parser.add_argument("--participants", type=str, nargs="+", default=None,
+                        help="Only these object names, e.g. dbs ocbc aggregator (default: all)")
+    parser.add_argument("--output", type=str, default=os.path.join(EVAL_DIR, "models"), help="Output directory")
+    parser.add_argument("--workers", type=int, default=8, help="Parallel downloads")
+    parser.add_argument("--retries", type=int, default=3, help="Attempts per object")
+    parser.add_argument("--ledger-url", type=str, default=None, help="Bank gateway URL to verify against, e.g. http://localhost:8881")
+    parser.add_argument("--manifest", type=str, default=None, help="Local manifest of expected hashes")
+    parser.add_argument("--source-dir", type=str, default=None, help="Directory standing in for the MinIO bucket")
+
+    args = parser.parse_args()
+
+    store = FilesystemStore(args.source_dir) if args.source_dir else MinioStore()
+    round_ids = [f"{args.round_prefix}{number}" for number in parse_rounds(args.rounds)]
+    expected = load_manifest_hashes(args.manifest) if args.manifest else {}
+
+    print(f"Listing objects for {len(round_ids)} rounds...")
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        listings = list(executor.map(lambda round_id: list(store.list_objects(f"{round_id}/")), round_ids))
+        if args.ledger_url:
+            for hashes in executor.map(lambda round_id: fetch_ledger_hashes(args.ledger_url, round_id), round_ids):
+                expected.update(hashes)
+
+    objects = [
+        (object_name, size) for listing in listings for object_name, size in listing
+        if not object_name.endswith((".part", ".sha256.json"))
+        and (args.participants is None or os.path.splitext(os.path.basename(object_name))[0] in args.participants)
+    ]
+    verified = sum(1 for object_name, _ in objects if object_name in expected)
+    print(f"Downloading {len(objects)} objects with {args.workers} workers ({verified} with a known hash)...")
+
+    start = time.time()
+    counts = {"skipped": 0, "downloaded": 0, "resumed": 0, "failed": 0}
+    total_bytes = 0
+    results = {}
+    results_lock = threading.Lock()
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(download_object, store, object_name, size, args.output, expected.get(object_name), args.retries): (object_name, size)
+            for object_name, size in objects
+        }
+        for future in as_completed(futures):
+            object_name, size = futures[future]
+            status, digest, transferred = future.result()
+            with results_lock:
+                counts[status] += 1
+                total_bytes += transferred
+                if digest:
+                    results[object_name] = {"sha256": digest, "size": size, "verified": object_name in expected}
+            if status == "failed":
+                print(f"❌ Failed to download {object_name}")
 
-# Download models to evaluation directory
-print("Downloading models from MinIO...")
-download_model("models", f"{ROUND_ID}/aggregator.weights", f"{eval_dir}/aggregator.weights")
-download_model("models", f"{ROUND_ID}/ocbc.weights", f"{eval_dir}/ocbc.weights")
+    os.makedirs(args.output, exist_ok=True)
+    manifest_path = os.path.join(args.output, "manifest.json")
+    previous = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r") as f:
+            previous = json.load(f).get("objects", {})
+    with open(f"{manifest_path}.tmp", "w") as f:
+        json.dump({"objects": {**previous, **results}}, f, indent=2, sort_keys=True)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
 
-print("✅ Download complete!")
\ No newline at end of file
+    elapsed = time.time() - start
+    print(f"\n✅ Done in {elapsed:.1f}s: {counts['downloaded']} downloaded, {counts['resumed']} resumed, "
+          f"{counts['skipped']} already present, {counts['failed']} failed "
+          f"({total_bytes / 1024 / 1024:.1f}MB, {total_bytes / 1024 / 1024 / max(elapsed, 1e-9):.1f}MB/s)")
@@ -0,0 +1,236 @@
+"""Evaluates every participant and aggregated model across a range of rounds into one tidy CSV table."""
+
+import os
+import re
+import time
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(CURRENT_DIR, ".sweep_cache")
+
+def create_model(input_shape):
+    """Creates a model with the same architecture as in client.py, for weight-only files."""
+    model = tf.keras.Sequential()
+    model.add(tf.keras.layers.Dense(64, activation="relu", input_shape=(input_shape,)))
+    model.add(tf.keras.layers.Dense(32, activation="relu"))
+    model.add(tf.keras.layers.Dense(1, activation="sigmoid"))
+    return model
+
+def load_scaled_dataset(csv_path, chunk_rows):
+    """Returns memory-mapped (X, y) for an evaluation CSV, scaling and caching it on first use."""
+    stat = os.stat(csv_path)
+    key = hashlib.sha1(f"{os.path.abspath(csv_path)}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+    cache_dir = os.path.join(CACHE_DIR, f"{os.path.splitext(os.path.basename(csv_path))[0]}-{key}")
+    X_path = os.path.join(cache_dir, "X.npy")
+    y_path = os.path.join(cache_dir, "y.npy")
+
+    if not (os.path.exists(X_path) and os.path.exists(y_path)):
+        # First pass: row count and per-feature mean/variance, chunk by chunk (Chan et al.)
+        count, mean, m2 = 0, None, None
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+            values = chunk.drop(columns=["Class"]).values.astype(np.float64)
+            n = len(values)
+            chunk_mean = values.mean(axis=0)
+            chunk_m2 = ((values - chunk_mean) ** 2).sum(axis=0)
+            if mean is None:
+                count, mean, m2 = n, chunk_mean, chunk_m2
+            else:
+                delta = chunk_mean - mean
+                total = count + n
+                mean = mean + delta * n / total
+                m2 = m2 + chunk_m2 + delta ** 2 * count * n / total
+                count = total
+        scale = np.sqrt(m2 / count)
+        scale[scale == 0] = 1.0
+
+        # Second pass: write scaled features straight into the memory-mapped cache
+        os.makedirs(cache_dir, exist_ok=True)
+        X_out = np.lib.format.open_memmap(f"{X_path}.tmp.npy", mode="w+", dtype=np.float32, shape=(count, len(mean)))
+        y_out = np.lib.format.open_memmap(f"{y_path}.tmp.npy", mode="w+", dtype=np.int8, shape=(count,))
+        offset = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+            n = len(chunk)
+            X_out[offset:offset + n] = (chunk.drop(columns=["Class"]).values - mean) / scale
+            y_out[offset:offset + n] = chunk["Class"].values
+            offset += n
+        X_out.flush()
+        y_out.flush()
+        del X_out, y_out
+        os.replace(f"{X_path}.tmp.npy", X_path)
+        os.replace(f"{y_path}.tmp.npy", y_path)
+        print(f"🗂️ Cached scaled {os.path.basename(csv_path)} ({count} rows)")
+
+    return np.load(X_path, mmap_mode="r"), np.load(y_path, mmap_mode="r")
+
+def find_models(models_dir, first_round, last_round):
+    """Lists (round_id, round_number, model_name, path) for every model in the round range."""
+    models = []
+    for round_id in os.listdir(models_dir):
+        round_dir = os.path.join(models_dir, round_id)
+        match = re.search(r"(\d+)$", round_id)
+        if not os.path.isdir(round_dir) or match is None:
+            continue
+        round_number = int(match.group(1))
+        if not first_round <= round_number <= last_round:
+            continue
+        for file_name in sorted(os.listdir(round_dir)):
+            if file_name.endswith(".weights"):
+                models.append((round_id, round_number, file_name[:-len(".weights")], os.path.join(round_dir, file_name)))
+    return sorted(models, key=lambda model: (model[1], model[2]))
+
+def load_model(path, input_shape):
+    """Loads a saved model, or weights into the client architecture; returns None if neither works."""
+    try:
+        return tf.keras.models.load_model(path, compile=False)
+    except Exception:
+        try:
+            model = create_model(input_shape)
+            model.load_weights(path)
+            return model
+        except Exception as e:
+            print(f"⚠️ Skipping unreadable model {path}: {e}")
+            return None
+
+def predict_scores(model, X, batch_size):
+    """Runs batched inference over a (memory-mapped) feature matrix."""
+    scores = np.empty(len(X), dtype=np.float32)
+    for start in range(0, len(X), batch_size):
+        batch = np.asarray(X[start:start + batch_size])
+        scores[start:start + len(batch)] = np.asarray(model.predict_on_batch(batch)).reshape(-1)
+    return scores
+
+def threshold_metrics(scores, y, thresholds):
+    """
+    Computes confusion counts at every threshold, ROC AUC and log loss from a single sort of the scores.
+
+    Returns:
+        (dict of per-threshold count arrays, roc_auc, log_loss)
+    """
+    y = np.asarray(y, dtype=np.int64)
+    order = np.argsort(scores, kind="stable")
+    sorted_scores = scores[order]
+    positives_below = np.concatenate([[0], np.cumsum(y[order])])  # Positives among the k lowest scores
+
+    num_rows = len(y)
+    num_positive = int(positives_below[-1])
+    num_negative = num_rows - num_positive
+
+    # Rows with score >= t are predicted fraud: they are everything above the insertion point of t
+    below = np.searchsorted(sorted_scores, thresholds, side="left")
+    tp = num_positive - positives_below[below]
+    fp = (num_rows - below) - tp
+    counts = {"tp": tp, "fp": fp, "fn": num_positive - tp, "tn": num_negative - fp}
+
+    # ROC AUC from the same sort: average rank of positives (ties share their mean rank)
+    ranks = np.empty(num_rows, dtype=np.float64)
+    _, first, tie_counts = np.unique(sorted_scores, return_index=True, return_counts=True)
+    ranks[order] = np.repeat(first + (tie_counts + 1) / 2.0, tie_counts)
+    roc_auc = ((ranks[y == 1].sum() - num_positive * (num_positive + 1) / 2.0) / (num_positive * num_negative)
+               if num_positive and num_negative else float("nan"))
+
+    clipped = np.clip(scores.astype(np.float64), 1e-7, 1 - 1e-7)
+    log_loss = float(-np.mean(np.where(y == 1, np.log(clipped), np.log(1 - clipped))))
+    return counts, roc_auc, log_loss
+
+def results_rows(round_id, round_number, model_name, dataset, thresholds, counts, roc_auc, log_loss, seconds):
+    """Builds the tidy result rows for one model on one dataset."""
+    tp, fp, tn, fn = (counts[key].astype(np.float64) for key in ("tp", "fp", "tn", "fn"))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+        fpr = np.where(fp + tn > 0, fp / (fp + tn), 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+
+    return pd.DataFrame({
+        "round_id": round_id,
+        "round": round_number,
+        "model": model_name,
+        "dataset": dataset,
+        "threshold": thresholds,
+        "tp": counts["tp"], "fp": counts["fp"], "tn": counts["tn"], "fn": counts["fn"],
+        "accuracy": (tp + tn) / (tp + fp + tn + fn),
+        "precision": precision,
+        "recall": recall,
+        "fpr": fpr,
+        "f1": f1,
+        "roc_auc": roc_auc,
+        "log_loss": log_loss,
+        "inference_seconds": seconds
+    })
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate all participant and aggregated models across rounds")
+    parser.add_argument("--models-dir", type=str, required=True,
+                        help="Local mirror of the models bucket: <round_id>/<participant>.weights")
+    parser.add_argument("--datasets", type=str, nargs="+", default=None,
+                        help="Evaluation CSVs (default: *_fraud_data.csv in scripts/evaluation)")
+    parser.add_argument("--rounds", type=str, default="1-1000000", help="Round range to evaluate, e.g. 1-120")
+    parser.add_argument("--thresholds", type=int, default=99, help="Number of evenly spaced thresholds in (0, 1)")
+    parser.add_argument("--batch-size", type=int, default=8192, help="Rows per inference batch")
+    parser.add_argument("--chunk-rows", type=int, default=200000, help="Rows per chunk when scaling datasets")
+    parser.add_argument("--output", type=str, default=os.path.join(CURRENT_DIR, "sweep_results.csv"), help="Results table")
+    parser.add_argument("--overwrite", action="store_true", help="Re-evaluate rounds already in the results table")
+
+    args = parser.parse_args()
+
+    first_round, _, last_round = args.rounds.partition("-")
+    first_round, last_round = int(first_round), int(last_round or first_round)
+    thresholds = np.round(np.linspace(0, 1, args.thresholds + 2)[1:-1], 6)
+
+    dataset_paths = args.datasets or sorted(
+        os.path.join(CURRENT_DIR, f) for f in os.listdir(CURRENT_DIR) if f.endswith("_fraud_data.csv")
+    )
+    if not dataset_paths:
+        parser.error("No evaluation datasets found - run generate_fraud_data.py first or pass --datasets")
+
+    print("Loading datasets...")
+    datasets = {}
+    for path in dataset_paths:
+        name = os.path.basename(path).replace("_fraud_data.csv", "").replace(".csv", "")
+        datasets[name] = load_scaled_dataset(path, args.chunk_rows)
+
+    # Keep earlier results and skip the rounds they already cover
+    existing = None
+    done = set()
+    if os.path.exists(args.output) and not args.overwrite:
+        existing = pd.read_csv(args.output)
+        done = set(zip(existing["round_id"], existing["model"]))
+
+    models = [model for model in find_models(args.models_dir, first_round, last_round) if (model[0], model[2]) not in done]
+    print(f"Evaluating {len(models)} models on {len(datasets)} datasets at {len(thresholds)} thresholds "
+          f"({len(done)} already in {os.path.basename(args.output)})...")
+
+    start = time.time()
+    frames = [existing] if existing is not None else []
+    input_shape = next(iter(datasets.values()))[0].shape[1]
+    for idx, (round_id, round_number, model_name, path) in enumerate(models, 1):
+        model = load_model(path, input_shape)
+        if model is None:
+            continue
+        for dataset, (X, y) in datasets.items():
+            inference_start = time.perf_counter()
+            scores = predict_scores(model, X, args.batch_size)
+            counts, roc_auc, log_loss = threshold_metrics(scores, y, thresholds)
+            frames.append(results_rows(round_id, round_number, model_name, dataset, thresholds, counts,
+                                       roc_auc, log_loss, time.perf_counter() - inference_start))
+        tf.keras.backend.clear_session()
+        print(f"   [{idx}/{len(models)}] {round_id}/{model_name}")
+
+    if not frames:
+        print("Nothing to evaluate.")
+    else:
+        results = pd.concat(frames, ignore_index=True).sort_values(["round", "model", "dataset", "threshold"])
+        tmp_output = f"{args.output}.tmp"
+        results.to_csv(tmp_output, index=False)
+        os.replace(tmp_output, args.output)
+        print(f"\n✅ Evaluated {len(models)} models in {time.time() - start:.1f}s, results in {args.output}")
+
+        # Aggregated model quality per round at the default threshold
+        summary = results[(results["model"] == "aggregator") & np.isclose(results["threshold"], 0.5)]
+        if not summary.empty:
+            print("\n--- Aggregated model at threshold 0.5 ---")
+            print(summary.pivot_table(index="round", columns="dataset", values="f1").round(4).to_string())
@@ -1,183 +1,290 @@
-import pandas as pd
-import numpy as np
+"""Generates the synthetic bank fraud datasets used for training and evaluation."""
+
 import os
+import time
+import zipfile
+import argparse
+import importlib.util
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Set up paths using relative paths - go up from scripts/generate-dataset to the project root
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Try multiple possible paths for creditcard.csv
-possible_paths = [
+POSSIBLE_SOURCE_PATHS = [
     os.path.join(BASE_DIR, "federated", "clients", "data", "creditcard.csv"),
     os.path.join(BASE_DIR, "Submissions", "Team8", "federated", "clients", "data", "creditcard.csv"),
     # Add a direct path option for when script is run from Submissions directory
     os.path.join(".", "federated", "clients", "data", "creditcard.csv")
 ]
 
-file_path = None
-for path in possible_paths:
-    if os.path.exists(path):
-        file_path = path
-        print(f"Found creditcard.csv at: {path}")
-        break
-
-# Check if file exists and provide helpful error if not
-if file_path is None:
-    print("Could not find creditcard.csv. Creating synthetic data instead...")
-    # Create synthetic data as fallback
-    columns = [f"V{i}" for i in range(1, 29)]
-    df = pd.DataFrame(np.random.randn(10000, 28), columns=columns)
-    df["Time"] = np.random.randint(0, 24 * 3600, 10000)
-    df["Amount"] = np.random.exponential(scale=100, size=10000)
-    df["Class"] = np.random.choice([0, 1], size=10000, p=[0.95, 0.05])
-else:
-    df = pd.read_csv(file_path)
-
-# Normalize transaction amount
-df["Amount"] = (df["Amount"] - df["Amount"].mean()) / df["Amount"].std()
-df["Time"] = df["Time"] % (24 * 3600)  # Convert time into a 24-hour cycle
-
-# More sophisticated fraud data generation function with distinct patterns per bank
-def generate_fraud_data(bank_name, num_samples=50000, fraud_ratio=0.5, random_seed=None):
-    """
-    Generates synthetic fraud data with distinct patterns per bank.
-    
-    Each bank specializes in detecting different types of fraud:
-    - DBS: Time-based fraud (unusual transaction times)
-    - OCBC: Amount-based fraud (unusual transaction amounts)
-    - ING: Feature correlation fraud (unusual relationships between features)
-    """
-    if random_seed is not None:
-        np.random.seed(random_seed)
-    
-    # Sample non-fraudulent transactions from the original dataset
-    legitimate_samples = df[df['Class'] == 0].sample(n=int(num_samples * (1-fraud_ratio)), 
-                                                    random_state=np.random.randint(0, 1000)).copy()
-    
-    # Create synthetic fraudulent transactions
-    num_fraud = int(num_samples * fraud_ratio)
-    
-    if bank_name == "DBS":
-        # DBS specializes in detecting time-based fraud
-        fraud_samples = df.sample(n=num_fraud, random_state=np.random.randint(0, 1000)).copy()
-        
-        # Make fraud happen during unusual hours (late night)
-        night_hours = (3 * 3600) + np.random.randint(-1200, 1200, size=num_fraud)  # Around 3 AM
-        fraud_samples["Time"] = night_hours
-        
+TRAIN_DIR = os.path.join(BASE_DIR, "federated", "clients", "data")
+EVAL_DIR = os.path.join(BASE_DIR, "scripts", "evaluation")
+
+BANKS = ("DBS", "OCBC", "ING")
+SUPPORTED_FORMATS = ("csv", "parquet", "npz")
+
+# Source transactions, loaded once per worker process
+source = {}
+
+def find_source_path():
+    """Returns the path of creditcard.csv, or None if it cannot be found."""
+    return next((path for path in POSSIBLE_SOURCE_PATHS if os.path.exists(path)), None)
+
+def load_source(source_path, seed):
+    """Loads and normalizes the source transactions as NumPy arrays (synthetic if creditcard.csv is missing)."""
+    if source_path is None:
+        # Same seed in every worker, so all workers see the same synthetic source
+        rng = np.random.default_rng(seed)
+        df = pd.DataFrame(rng.standard_normal((10000, 28)), columns=[f"V{i}" for i in range(1, 29)])
+        df["Time"] = rng.integers(0, 24 * 3600, 10000)
+        df["Amount"] = rng.exponential(scale=100, size=10000)
+        df["Class"] = rng.choice([0, 1], size=10000, p=[0.95, 0.05])
+    else:
+        df = pd.read_csv(source_path)
+
+    # Normalize transaction amount
+    df["Amount"] = (df["Amount"] - df["Amount"].mean()) / df["Amount"].std()
+    df["Time"] = df["Time"] % (24 * 3600)  # Convert time into a 24-hour cycle
+
+    features = df.drop(columns=["Class"])
+    X = features.values.astype(np.float64)
+    return {
+        "columns": list(features.columns),
+        "index": {column: idx for idx, column in enumerate(features.columns)},
+        "all": X,
+        "legitimate": X[df["Class"].values == 0]
+    }
+
+def init_worker(source_path, seed):
+    """Loads the source transactions into the worker process."""
+    source.update(load_source(source_path, seed))
+
+def apply_fraud_pattern(bank, X, rng):
+    """Turns sampled transactions into the bank's fraud pattern, in place."""
+    col = source["index"]
+    n = len(X)
+
+    if bank == "DBS":
+        # DBS specializes in detecting time-based fraud: unusual hours (around 3 AM)
+        X[:, col["Time"]] = (3 * 3600) + rng.integers(-1200, 1200, size=n)
+
         # Modify V1-V3 features in a specific way
-        fraud_samples["V1"] = fraud_samples["V1"] * np.random.uniform(-1.5, -0.8, size=num_fraud)
-        fraud_samples["V3"] = fraud_samples["V3"] * np.random.uniform(-1.2, -0.5, size=num_fraud)
-        
-    # For OCBC amount-based fraud
-    elif bank_name == "OCBC":
-        fraud_samples = df.sample(n=num_fraud, random_state=np.random.randint(0, 1000)).copy()
-        
-        # Generate different amount patterns
-        amount_pattern = np.random.randint(0, 3, size=num_fraud)
-        fraud_amounts = np.zeros(num_fraud)
-        
-        # Pattern 1: Small specific amounts
-        mask1 = amount_pattern == 0
-        fraud_amounts[mask1] = np.random.uniform(4, 5, size=mask1.sum())
-        
-        # Pattern 2: Medium specific amounts
-        mask2 = amount_pattern == 1
-        fraud_amounts[mask2] = np.random.uniform(20, 25, size=mask2.sum())
-        
-        # Pattern 3: Large specific amounts
-        mask3 = amount_pattern == 2
-        fraud_amounts[mask3] = np.random.uniform(95, 100, size=mask3.sum())
-        
-        # Apply the amounts
-        fraud_samples["Amount"] = fraud_amounts
-        
+        X[:, col["V1"]] *= rng.uniform(-1.5, -0.8, size=n)
+        X[:, col["V3"]] *= rng.uniform(-1.2, -0.5, size=n)
+
+    elif bank == "OCBC":
+        # OCBC specializes in amount-based fraud: small, medium and large specific amounts
+        low = np.array([4.0, 20.0, 95.0])
+        pattern = rng.integers(0, 3, size=n)
+        X[:, col["Amount"]] = rng.uniform(low[pattern], low[pattern] + np.array([1.0, 5.0, 5.0])[pattern])
+
         # Modify V4-V6 features in a specific way
-        fraud_samples["V4"] = fraud_samples["V4"] * np.random.uniform(-2.0, -1.0, size=num_fraud)
-        fraud_samples["V6"] = fraud_samples["V6"] * np.random.uniform(-1.8, -0.9, size=num_fraud)
-        
-    elif bank_name == "ING":
-        # ING specializes in detecting feature correlation fraud
-        fraud_samples = df.sample(n=num_fraud, random_state=np.random.randint(0, 1000)).copy()
-        
-        # Create unusual correlations between features
-        base = np.random.normal(0, 1, size=num_fraud)
-        fraud_samples["V7"] = base * 3 + np.random.normal(0, 0.5, size=num_fraud)
-        fraud_samples["V8"] = -base * 2 + np.random.normal(0, 0.5, size=num_fraud)
-        fraud_samples["V9"] = base * 1.5 + np.random.normal(0, 0.5, size=num_fraud)
-        
+        X[:, col["V4"]] *= rng.uniform(-2.0, -1.0, size=n)
+        X[:, col["V6"]] *= rng.uniform(-1.8, -0.9, size=n)
+
+    elif bank == "ING":
+        # ING specializes in feature correlation fraud: unusual correlations between features
+        base = rng.normal(0, 1, size=n)
+        X[:, col["V7"]] = base * 3 + rng.normal(0, 0.5, size=n)
+        X[:, col["V8"]] = -base * 2 + rng.normal(0, 0.5, size=n)
+        X[:, col["V9"]] = base * 1.5 + rng.normal(0, 0.5, size=n)
+
         # Make transactions from unusual locations (approximated by these features)
-        fraud_samples["V11"] = fraud_samples["V11"] * np.random.uniform(-1.5, -0.7, size=num_fraud)
-        fraud_samples["V12"] = fraud_samples["V12"] * np.random.uniform(-1.5, -0.7, size=num_fraud)
-    
-    # Set the class label
-    fraud_samples["Class"] = 1
-    legitimate_samples["Class"] = 0
-    
-    # Combine legitimate and fraudulent transactions
-    bank_df = pd.concat([legitimate_samples, fraud_samples])
-    
-    # Shuffle the dataset
-    bank_df = bank_df.sample(frac=1).reset_index(drop=True)
-    
-    return bank_df
-
-# Define directories using relative paths
-dbs_train_dir = os.path.join(BASE_DIR, "federated", "clients", "data", "dbs")
-ing_train_dir = os.path.join(BASE_DIR, "federated", "clients", "data", "ing")
-ocbc_train_dir = os.path.join(BASE_DIR, "federated", "clients", "data", "ocbc")
-eval_dir = os.path.join(BASE_DIR, "scripts", "evaluation")
-
-# Ensure directories exist
-os.makedirs(dbs_train_dir, exist_ok=True)
-os.makedirs(ing_train_dir, exist_ok=True)
-os.makedirs(ocbc_train_dir, exist_ok=True)
-os.makedirs(eval_dir, exist_ok=True)
-
-print("Generating training datasets with specialized fraud patterns...")
-
-# Increased dataset size for training (100,000 samples)
-dbs_train_data = generate_fraud_data("DBS", num_samples=100000, fraud_ratio=0.5, random_seed=42)
-ocbc_train_data = generate_fraud_data("OCBC", num_samples=100000, fraud_ratio=0.5, random_seed=43)
-ing_train_data = generate_fraud_data("ING", num_samples=100000, fraud_ratio=0.5, random_seed=44)
-
-# Save training datasets to respective bank folders (using os.path.join for cross-platform compatibility)
-dbs_train_data.to_csv(os.path.join(dbs_train_dir, "fraud_data.csv"), index=False)
-ocbc_train_data.to_csv(os.path.join(ocbc_train_dir, "fraud_data.csv"), index=False)
-ing_train_data.to_csv(os.path.join(ing_train_dir, "fraud_data.csv"), index=False)
-
-print(f"✅ Training datasets generated with 50/50 class balance:")
-print(f"   DBS: {len(dbs_train_data)} samples ({dbs_train_data['Class'].sum()} fraud)")
-print(f"   OCBC: {len(ocbc_train_data)} samples ({ocbc_train_data['Class'].sum()} fraud)")
-print(f"   ING: {len(ing_train_data)} samples ({ing_train_data['Class'].sum()} fraud)")
-
-print("\nGenerating evaluation datasets...")
-
-# Reset random seed for evaluation datasets
-np.random.seed(None)
-
-# Generate evaluation datasets with the same specialized patterns
-dbs_eval_data = generate_fraud_data("DBS", num_samples=50000, fraud_ratio=0.5)
-ocbc_eval_data = generate_fraud_data("OCBC", num_samples=50000, fraud_ratio=0.5)
-ing_eval_data = generate_fraud_data("ING", num_samples=50000, fraud_ratio=0.5)
-
-# Generate a combined dataset with all three fraud patterns
-# Taking 20,000 samples from each bank's evaluation data
-combined_eval_data = pd.concat([
-    dbs_eval_data.sample(20000),
-    ocbc_eval_data.sample(20000),
-    ing_eval_data.sample(20000)
-])
-
-# Save evaluation datasets (using os.path.join for cross-platform compatibility)
-dbs_eval_data.to_csv(os.path.join(eval_dir, "dbs_fraud_data.csv"), index=False)
-ocbc_eval_data.to_csv(os.path.join(eval_dir, "ocbc_fraud_data.csv"), index=False)
-ing_eval_data.to_csv(os.path.join(eval_dir, "ing_fraud_data.csv"), index=False)
-combined_eval_data.to_csv(os.path.join(eval_dir, "combined_fraud_data.csv"), index=False)
-
-print(f"✅ Evaluation datasets generated with 50/50 class balance:")
-print(f"   DBS: {len(dbs_eval_data)} samples ({dbs_eval_data['Class'].sum()} fraud)")
-print(f"   OCBC: {len(ocbc_eval_data)} samples ({ocbc_eval_data['Class'].sum()} fraud)")
-print(f"   ING: {len(ing_eval_data)} samples ({ing_eval_data['Class'].sum()} fraud)")
-print(f"   Combined: {len(combined_eval_data)} samples ({combined_eval_data['Class'].sum()} fraud)")
-
-print("\n📊 Dataset generation complete!")
\ No newline at end of file
+        X[:, col["V11"]] *= rng.uniform(-1.5, -0.7, size=n)
+        X[:, col["V12"]] *= rng.uniform(-1.5, -0.7, size=n)
+
+    return X
+
+def generate_chunk(bank, num_rows, fraud_ratio, rng):
+    """Generates one shuffled chunk of a bank's dataset; returns (features, labels)."""
+    num_fraud = int(num_rows * fraud_ratio)
+    num_legitimate = num_rows - num_fraud
+
+    # Draw with replacement, so datasets can be far larger than the source
+    legitimate = source["legitimate"][rng.integers(0, len(source["legitimate"]), size=num_legitimate)]
+    fraud = apply_fraud_pattern(bank, source["all"][rng.integers(0, len(source["all"]), size=num_fraud)], rng)
+
+    X = np.concatenate([legitimate, fraud])
+    y = np.concatenate([np.zeros(num_legitimate, dtype=np.int8), np.ones(num_fraud, dtype=np.int8)])
+    order = rng.permutation(num_rows)
+    return X[order], y[order]
+
+class NpzStreamWriter:
+    """Writes X and y into an .npz archive chunk by chunk; only the int8 labels are held in memory."""
+
+    def __init__(self, path, num_rows, columns):
+        self.archive = zipfile.ZipFile(path, "w", zipfile.ZIP_STORED, allowZip64=True)
+        self.columns = columns
+        self.labels = np.empty(num_rows, dtype=np.int8)
+        self.offset = 0
+        self.features = self.archive.open("X.npy", "w", force_zip64=True)
+        np.lib.format.write_array_header_1_0(self.features, {
+            "descr": np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+            "fortran_order": False,
+            "shape": (num_rows, len(columns))
+        })
+
+    def write(self, X, y):
+        self.features.write(np.ascontiguousarray(X, dtype=np.float32).tobytes())
+        self.labels[self.offset:self.offset + len(y)] = y
+        self.offset += len(y)
+
+    def close(self):
+        self.features.close()
+        with self.archive.open("y.npy", "w", force_zip64=True) as f:
+            np.lib.format.write_array(f, self.labels)
+        with self.archive.open("columns.npy", "w") as f:
+            np.lib.format.write_array(f, np.array(self.columns))
+        self.archive.close()
+
+class DatasetWriter:
+    """Appends chunks to every requested output format, renaming the files into place on close."""
+
+    def __init__(self, base_path, formats, num_rows, columns):
+        self.columns = columns + ["Class"]
+        self.paths = {fmt: f"{base_path}.{fmt}" for fmt in formats}
+        self.tmp_paths = {fmt: f"{path}.tmp" for fmt, path in self.paths.items()}
+        self.csv_file = open(self.tmp_paths["csv"], "w", newline="") if "csv" in formats else None
+        self.parquet_writer = None
+        self.npz_writer = NpzStreamWriter(self.tmp_paths["npz"], num_rows, columns) if "npz" in formats else None
+
+    def write(self, X, y):
+        if self.csv_file is not None or "parquet" in self.paths:
+            df = pd.DataFrame(X, columns=self.columns[:-1])
+            df["Class"] = y.astype(np.int64)
+
+            if self.csv_file is not None:
+                df.to_csv(self.csv_file, header=self.csv_file.tell() == 0, index=False)
+
+            if "parquet" in self.paths:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if self.parquet_writer is None:
+                    self.parquet_writer = pq.ParquetWriter(self.tmp_paths["parquet"], table.schema)
+                self.parquet_writer.write_table(table)
+
+        if self.npz_writer is not None:
+            self.npz_writer.write(X, y)
+
+    def close(self):
+        if self.csv_file is not None:
+            self.csv_file.close()
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+        if self.npz_writer is not None:
+            self.npz_writer.close()
+        for fmt, path in self.paths.items():
+            os.replace(self.tmp_paths[fmt], path)
+
+    def abort(self):
+        """Closes and deletes the partial files, leaving any previous output in place."""
+        for handle in (self.csv_file, self.parquet_writer):
+            if handle is not None:
+                handle.close()
+        if self.npz_writer is not None:
+            self.npz_writer.features.close()
+            self.npz_writer.archive.close()
+        for tmp_path in self.tmp_paths.values():
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+def generate_dataset(job):
+    """
+    Generates one dataset in chunks and writes it in the requested formats.
+
+    A job with several banks (the combined evaluation set) takes an equal share of
+    every chunk from each bank's pattern.
+
+    Returns:
+        (dataset name, rows, fraud rows, seconds)
+    """
+    start = time.time()
+    rng = np.random.default_rng(job["seed"])
+    writer = DatasetWriter(job["base_path"], job["formats"], job["num_rows"], source["columns"])
+
+    fraud_rows = 0
+    try:
+        for chunk_start in range(0, job["num_rows"], job["chunk_rows"]):
+            chunk_rows = min(job["chunk_rows"], job["num_rows"] - chunk_start)
+
+            # Split the chunk across the job's banks
+            shares = np.full(len(job["banks"]), chunk_rows // len(job["banks"]))
+            shares[:chunk_rows % len(job["banks"])] += 1
+            parts = [generate_chunk(bank, int(rows), job["fraud_ratio"], rng) for bank, rows in zip(job["banks"], shares) if rows]
+
+            X = np.concatenate([part[0] for part in parts])
+            y = np.concatenate([part[1] for part in parts])
+            if len(parts) > 1:
+                order = rng.permutation(len(y))
+                X, y = X[order], y[order]
+
+            writer.write(X, y)
+            fraud_rows += int(y.sum())
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+    return job["name"], job["num_rows"], fraud_rows, time.time() - start
+
+def build_jobs(args):
+    """Lists the training, evaluation and combined datasets to generate, each with its own RNG stream."""
+    jobs = []
+    for bank in args.banks:
+        jobs.append({"name": f"{bank} training", "banks": [bank], "num_rows": args.train_rows,
+                     "base_path": os.path.join(TRAIN_DIR, bank.lower(), "fraud_data")})
+    for bank in args.banks:
+        jobs.append({"name": f"{bank} evaluation", "banks": [bank], "num_rows": args.eval_rows,
+                     "base_path": os.path.join(EVAL_DIR, f"{bank.lower()}_fraud_data")})
+    jobs.append({"name": "Combined evaluation", "banks": list(args.banks), "num_rows": args.combined_rows_per_bank * len(args.banks),
+                 "base_path": os.path.join(EVAL_DIR, "combined_fraud_data")})
+
+    # Independent child streams: each dataset is the same whatever the number of workers
+    seeds = np.random.SeedSequence(args.seed).spawn(len(jobs))
+    for job, seed in zip(jobs, seeds):
+        job.update(seed=seed, fraud_ratio=args.fraud_ratio, chunk_rows=args.chunk_rows, formats=args.formats)
+    return [job for job in jobs if job["num_rows"] > 0]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic bank fraud datasets in parallel, chunk by chunk")
+    parser.add_argument("--banks", type=str, nargs="+", choices=BANKS, default=list(BANKS), help="Banks to generate")
+    parser.add_argument("--train-rows", type=int, default=100000, help="Training rows per bank")
+    parser.add_argument("--eval-rows", type=int, default=50000, help="Evaluation rows per bank")
+    parser.add_argument("--combined-rows-per-bank", type=int, default=20000, help="Rows per bank in the combined evaluation set")
+    parser.add_argument("--fraud-ratio", type=float, default=0.5, help="Fraction of fraudulent rows")
+    parser.add_argument("--chunk-rows", type=int, default=100000, help="Rows generated and written at a time (bounds memory)")
+    parser.add_argument("--formats", type=str, nargs="+", choices=SUPPORTED_FORMATS, default=["csv"], help="Output formats")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--seed", type=int, default=42, help="Root random seed")
+
+    args = parser.parse_args()
+
+    if "parquet" in args.formats and importlib.util.find_spec("pyarrow") is None:
+        parser.error("Parquet output requires pyarrow (pip install pyarrow)")
+
+    source_path = find_source_path()
+    if source_path is None:
+        print("Could not find creditcard.csv. Creating synthetic data instead...")
+    else:
+        print(f"Found creditcard.csv at: {source_path}")
+
+    jobs = build_jobs(args)
+    for job in jobs:
+        os.makedirs(os.path.dirname(job["base_path"]), exist_ok=True)
+
+    print(f"Generating {len(jobs)} datasets with {min(args.workers, len(jobs))} workers "
+          f"({', '.join(args.formats)}, {args.chunk_rows} rows per chunk)...")
+
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=min(args.workers, len(jobs)), initializer=init_worker,
+                             initargs=(source_path, args.seed)) as executor:
+        futures = [executor.submit(generate_dataset, job) for job in jobs]
+        for future in as_completed(futures):
+            name, rows, fraud_rows, seconds = future.result()
+            print(f"✅ {name}: {rows} samples ({fraud_rows} fraud) in {seconds:.1f}s")
+
+    print(f"\n📊 Dataset generation complete in {time.time() - start:.1f}s!")
@@ -10,6 +10,59 @@ It creates synthetic data with various quality issues that will result in
 poor models when used for training, causing the bank's reputation to decrease.
 """
 
+PROBLEM_TYPES = ("noisy", "biased", "missing", "outliers", "constant", "random")
+
+PROBLEM_DESCRIPTIONS = {
+    "noisy": "Adding extreme noise to destroy signal patterns...",
+    "biased": "Creating heavily biased data (imbalanced classes)...",
+    "missing": "Introducing missing values (NaN)...",
+    "outliers": "Adding extreme outliers...",
+    "constant": "Reducing feature variability (near-constant features)...",
+    "random": "Creating completely random data with no patterns..."
+}
+
+def apply_quality_problem(problem_type, X, y, rng):
+    """
+    Applies a quality problem to a feature matrix and labels, vectorized over the whole matrix.
+    
+    Args:
+        problem_type: One of PROBLEM_TYPES
+        X: Float feature matrix (rows x features), modified in place where possible
+        y: Label array, or None if there are no labels yet
+        rng: numpy Generator
+    
+    Returns:
+        (X, y)
+    """
+    if problem_type == "noisy":
+        # Extreme noise that destroys signal
+        X += rng.normal(0, 3.0, X.shape)
+    
+    elif problem_type == "biased":
+        # Make it mostly fraudulent (opposite of real data)
+        y = (rng.random(len(X)) < 0.99).astype(np.int64)
+    
+    elif problem_type == "missing":
+        # 30% of all feature values missing
+        X[rng.random(X.shape) < 0.3] = np.nan
+    
+    elif problem_type == "outliers":
+        # 10% of all feature values blown up 100x
+        X[rng.random(X.shape) < 0.1] *= 100
+    
+    elif problem_type == "constant":
+        # Near-constant features, tiny variations avoid numerical issues
+        X = np.nanmean(X, axis=0) + rng.normal(0, 0.0001, X.shape)
+    
+    elif problem_type == "random":
+        # Complete random data with no patterns
+        X = rng.standard_normal(X.shape)
+    
+    else:
+        raise ValueError(f"Unknown problem type '{problem_type}', expected one of {PROBLEM_TYPES}")
+    
+    return X, y
+
 def generate_poor_quality_data(bank_name, problem_type="noisy", output_dir=None):
     """
     Generates data with specific quality issues to test reputation system.
@@ -71,51 +124,19 @@ def generate_poor_quality_data(bank_name, problem_type="noisy", output_dir=None)
         print("Creating synthetic data instead...")
         bank_df = create_synthetic_data(10000)
     
-    # Apply quality problems based on type
-    if problem_type == "noisy":
-        # Extreme noise that destroys signal
-        print("Adding extreme noise to destroy signal patterns...")
-        for col in bank_df.columns[:-1]:  # Exclude target column
-            noise = np.random.normal(0, 3.0, len(bank_df))
-            bank_df[col] = bank_df[col] + noise
-        
-    elif problem_type == "biased":
-        # Create heavily biased data (almost all one class)
-        print("Creating heavily biased data (imbalanced classes)...")
-        if "Class" in bank_df.columns:
-            # Make it mostly fraudulent (opposite of real data)
-            bank_df["Class"] = np.random.choice([0, 1], size=len(bank_df), p=[0.01, 0.99])
-        else:
-            # If no "Class" column, create a target column with extreme bias
-            bank_df["target"] = np.random.choice([0, 1], size=len(bank_df), p=[0.01, 0.99])
-        
-    elif problem_type == "missing":
-        # Introduce many missing values (NaN)
-        print("Introducing missing values (NaN)...")
-        for col in bank_df.columns[:-1]:  # Exclude target column
-            mask = np.random.choice([True, False], size=len(bank_df), p=[0.3, 0.7])
-            bank_df.loc[mask, col] = np.nan
-            
-    elif problem_type == "outliers":
-        # Add extreme outliers
-        print("Adding extreme outliers...")
-        for col in bank_df.columns[:-1]:  # Exclude target column
-            mask = np.random.choice([True, False], size=len(bank_df), p=[0.1, 0.9])
-            bank_df.loc[mask, col] = bank_df[col] * 100
-            
-    elif problem_type == "constant":
-        # Make features near-constant (very low variability)
-        print("Reducing feature variability (near-constant features)...")
-        for col in bank_df.columns[:-1]:  # Exclude target column
-            mean_val = bank_df[col].mean()
-            # Add tiny variations to avoid numerical issues
-            bank_df[col] = mean_val + np.random.normal(0, 0.0001, len(bank_df))
-            
-    elif problem_type == "random":
-        # Complete random data with no patterns
-        print("Creating completely random data with no patterns...")
-        for col in bank_df.columns[:-1]:  # Exclude target column
-            bank_df[col] = np.random.randn(len(bank_df))
+    # Apply quality problems based on type, to all feature columns at once
+    print(PROBLEM_DESCRIPTIONS[problem_type])
+    target = "Class" if "Class" in bank_df.columns else "target"
+    feature_columns = [col for col in bank_df.columns if col != target]
+    X, y = apply_quality_problem(
+        problem_type,
+        bank_df[feature_columns].values.astype(np.float64),
+        bank_df[target].values if target in bank_df.columns else None,
+        np.random.default_rng()
+    )
+    bank_df[feature_columns] = X
+    if y is not None:
+        bank_df[target] = y
     
     # Ensure the target column is named correctly
     if "Class" not in bank_df.columns and "target" not in bank_df.columns:
@@ -163,7 +184,7 @@ if __name__ == "__main__":
     parser.add_argument("--bank", type=str, choices=["DBS", "OCBC", "ING"], required=True, 
                         help="Bank name to generate data for")
     parser.add_argument("--problem", type=str, 
-                        choices=["noisy", "biased", "missing", "outliers", "constant", "random"], 
+                        choices=PROBLEM_TYPES, 
                         default="noisy", help="Type of quality problem to introduce")
     parser.add_argument("--output", type=str, default=None, 
                         help="Output directory to save generated data")
@@ -0,0 +1,184 @@
+"""Generates datasets for a whole simulated federation from a scenario file (see scenarios/)."""
+
+import os
+import json
+import time
+import argparse
+import numpy as np
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from generate_fraud_data import (BASE_DIR, BANKS, SUPPORTED_FORMATS, DatasetWriter, find_source_path,
+                                 init_worker, generate_chunk, source)
+from generate_poor_data import PROBLEM_TYPES, apply_quality_problem
+
+PROFILES = ("honest",) + PROBLEM_TYPES
+
+def load_scenario(path):
+    """Loads a scenario file and fills in defaults."""
+    with open(path, "r") as f:
+        scenario = json.load(f)
+
+    scenario.setdefault("rows_per_bank", 10000)
+    scenario.setdefault("fraud_ratio", 0.5)
+    scenario.setdefault("seed", 42)
+    scenario.setdefault("bank_prefix", "bank")
+    scenario.setdefault("fraud_patterns", list(BANKS))
+
+    if not scenario.get("name") or int(scenario.get("num_banks", 0)) < 1:
+        raise ValueError("A scenario needs a name and num_banks >= 1")
+    unknown = set(scenario.get("profiles", {})) - set(PROFILES)
+    if unknown or sum(scenario.get("profiles", {}).values()) <= 0:
+        raise ValueError(f"Scenario profiles must be positive shares of {PROFILES} (unknown: {sorted(unknown)})")
+    return scenario
+
+def assign_profiles(num_banks, shares, rng):
+    """Returns one profile per bank, with counts matching the shares exactly (largest remainder), in random order."""
+    names = list(shares)
+    weights = np.array([shares[name] for name in names], dtype=np.float64)
+    exact = weights / weights.sum() * num_banks
+    counts = np.floor(exact).astype(np.int64)
+    for idx in np.argsort(exact - counts)[::-1][:num_banks - counts.sum()]:
+        counts[idx] += 1
+
+    profiles = np.repeat(names, counts)
+    return list(profiles[rng.permutation(num_banks)])
+
+def bank_rows(rows_per_bank, num_banks, rng):
+    """Returns the number of rows per bank: fixed, or log-uniform between [min, max]."""
+    if isinstance(rows_per_bank, list):
+        low, high = rows_per_bank
+        return np.exp(rng.uniform(np.log(low), np.log(high), num_banks)).astype(np.int64).tolist()
+    return [int(rows_per_bank)] * num_banks
+
+def build_jobs(scenario, output_dir, args):
+    """Creates one generation job per bank, each with its own RNG stream."""
+    rng = np.random.default_rng(scenario["seed"])
+    num_banks = int(scenario["num_banks"])
+    profiles = assign_profiles(num_banks, scenario["profiles"], rng)
+    rows = bank_rows(scenario["rows_per_bank"], num_banks, rng)
+    seeds = np.random.SeedSequence(scenario["seed"]).spawn(num_banks)
+    width = len(str(num_banks))
+
+    jobs = []
+    for idx in range(num_banks):
+        bank_id = f"{scenario['bank_prefix']}{idx + 1:0{width}d}"
+        jobs.append({
+            "bank_id": bank_id,
+            "profile": profiles[idx],
+            "fraud_pattern": scenario["fraud_patterns"][idx % len(scenario["fraud_patterns"])],
+            "num_rows": rows[idx],
+            "fraud_ratio": scenario["fraud_ratio"],
+            "chunk_rows": args.chunk_rows,
+            "formats": args.formats,
+            "base_path": os.path.join(output_dir, bank_id, "fraud_data"),
+            "seed": seeds[idx]
+        })
+    return jobs
+
+def generate_bank(job):
+    """Generates one bank's dataset chunk by chunk, applying its problem profile to every chunk."""
+    start = time.time()
+    rng = np.random.default_rng(job["seed"])
+    os.makedirs(os.path.dirname(job["base_path"]), exist_ok=True)
+    writer = DatasetWriter(job["base_path"], job["formats"], job["num_rows"], source["columns"])
+
+    fraud_rows = 0
+    missing_values = 0
+    try:
+        for chunk_start in range(0, job["num_rows"], job["chunk_rows"]):
+            chunk_rows = min(job["chunk_rows"], job["num_rows"] - chunk_start)
+            X, y = generate_chunk(job["fraud_pattern"], chunk_rows, job["fraud_ratio"], rng)
+            if job["profile"] != "honest":
+                X, y = apply_quality_problem(job["profile"], X, y, rng)
+
+            writer.write(X, y)
+            fraud_rows += int(y.sum())
+            missing_values += int(np.isnan(X).sum())
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+    return {
+        "bank_id": job["bank_id"],
+        "rows": job["num_rows"],
+        "fraud_rows": fraud_rows,
+        "missing_values": missing_values,
+        "seconds": time.time() - start
+    }
+
+def write_manifest(scenario, jobs, results, output_dir, formats):
+    """Writes the ground truth for every bank to manifest.json."""
+    banks = []
+    for job in jobs:
+        result = results[job["bank_id"]]
+        banks.append({
+            "bank_id": job["bank_id"],
+            "profile": job["profile"],
+            "honest": job["profile"] == "honest",
+            "expected_outcome": "accept" if job["profile"] == "honest" else "reject",
+            "fraud_pattern": job["fraud_pattern"],
+            "rows": result["rows"],
+            "fraud_rows": result["fraud_rows"],
+            "missing_values": result["missing_values"],
+            "data_dir": job["bank_id"]
+        })
+
+    profile_counts = {profile: sum(1 for bank in banks if bank["profile"] == profile) for profile in scenario["profiles"]}
+    manifest = {
+        "scenario": scenario["name"],
+        "generated_at": datetime.now().isoformat(),
+        "seed": scenario["seed"],
+        "num_banks": len(banks),
+        "fraud_ratio": scenario["fraud_ratio"],
+        "formats": formats,
+        "profiles": profile_counts,
+        "banks": banks
+    }
+
+    tmp_path = os.path.join(output_dir, "manifest.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(output_dir, "manifest.json"))
+    return manifest
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate datasets for a simulated federation from a scenario file")
+    parser.add_argument("scenario", type=str, help="Path to the scenario JSON file")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Output directory (default: federated/clients/data/scenarios/<name>)")
+    parser.add_argument("--chunk-rows", type=int, default=100000, help="Rows generated and written at a time (bounds memory)")
+    parser.add_argument("--formats", type=str, nargs="+", choices=SUPPORTED_FORMATS, default=["csv"], help="Output formats")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+
+    args = parser.parse_args()
+
+    scenario = load_scenario(args.scenario)
+    output_dir = args.output or os.path.join(BASE_DIR, "federated", "clients", "data", "scenarios", scenario["name"])
+    os.makedirs(output_dir, exist_ok=True)
+
+    source_path = find_source_path()
+    if source_path is None:
+        print("Could not find creditcard.csv. Creating synthetic data instead...")
+
+    jobs = build_jobs(scenario, output_dir, args)
+    print(f"Generating scenario '{scenario['name']}': {len(jobs)} banks with {min(args.workers, len(jobs))} workers...")
+
+    start = time.time()
+    results = {}
+    with ProcessPoolExecutor(max_workers=min(args.workers, len(jobs)), initializer=init_worker,
+                             initargs=(source_path, scenario["seed"])) as executor:
+        futures = [executor.submit(generate_bank, job) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            results[result["bank_id"]] = result
+            if len(results) % max(1, len(jobs) // 10) == 0 or len(results) == len(jobs):
+                print(f"   {len(results)}/{len(jobs)} banks generated")
+
+    manifest = write_manifest(scenario, jobs, results, output_dir, args.formats)
+
+    print(f"\n✅ Scenario '{scenario['name']}' generated in {time.time() - start:.1f}s at {output_dir}")
+    for profile, count in manifest["profiles"].items():
+        print(f"   {profile.ljust(10)}: {count} banks")
+    print(f"\n📊 Ground truth written to {os.path.join(output_dir, 'manifest.json')}")
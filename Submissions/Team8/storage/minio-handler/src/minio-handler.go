@@ -6,7 +6,9 @@ import (
 	"fmt"
 	"log"
 	"net/http"
+	"net/url"
 	"os"
+	"strconv"
 	"time"
 
 	"github.com/minio/minio-go/v7"
@@ -50,6 +52,122 @@ func UploadModel(w http.ResponseWriter, r *http.Request) {
 	json.NewEncoder(w).Encode(response)
 }
 
+// multipartRequest identifies a multipart upload of a per-bank model object
+type multipartRequest struct {
+	RoundID    string               `json:"roundId"`
+	BankID     string               `json:"bankId"`
+	UploadID   string               `json:"uploadId"`
+	PartNumber int                  `json:"partNumber"`
+	Parts      []minio.CompletePart `json:"parts"`
+}
+
+func decodeMultipartRequest(w http.ResponseWriter, r *http.Request) (*multipartRequest, string, bool) {
+	var request multipartRequest
+	if err := json.NewDecoder(r.Body).Decode(&request); err != nil {
+		http.Error(w, "Invalid request data", http.StatusBadRequest)
+		return nil, "", false
+	}
+	return &request, fmt.Sprintf("%s/%s.weights", request.RoundID, request.BankID), true
+}
+
+func writeJSON(w http.ResponseWriter, response interface{}) {
+	w.Header().Set("Content-Type", "application/json")
+	json.NewEncoder(w).Encode(response)
+}
+
+// Start a multipart upload for large model files
+func StartMultipartUpload(w http.ResponseWriter, r *http.Request) {
+	_, objectName, ok := decodeMultipartRequest(w, r)
+	if !ok {
+		return
+	}
+
+	core := minio.Core{Client: minioClient}
+	uploadID, err := core.NewMultipartUpload(context.Background(), minioBucket, objectName, minio.PutObjectOptions{})
+	if err != nil {
+		http.Error(w, fmt.Sprintf("Failed to start multipart upload: %v", err), http.StatusInternalServerError)
+		return
+	}
+
+	writeJSON(w, map[string]string{
+		"uploadId":   uploadID,
+		"objectPath": objectName,
+	})
+}
+
+// Presign the upload of a single part
+func PresignUploadPart(w http.ResponseWriter, r *http.Request) {
+	request, objectName, ok := decodeMultipartRequest(w, r)
+	if !ok {
+		return
+	}
+	if request.UploadID == "" || request.PartNumber < 1 {
+		http.Error(w, "uploadId and partNumber are required", http.StatusBadRequest)
+		return
+	}
+
+	params := url.Values{}
+	params.Set("uploadId", request.UploadID)
+	params.Set("partNumber", strconv.Itoa(request.PartNumber))
+
+	presignedURL, err := minioClient.Presign(context.Background(), http.MethodPut, minioBucket, objectName, time.Hour, params)
+	if err != nil {
+		http.Error(w, fmt.Sprintf("Failed to generate part upload URL: %v", err), http.StatusInternalServerError)
+		return
+	}
+
+	writeJSON(w, map[string]string{"uploadUrl": presignedURL.String()})
+}
+
+// List the parts already uploaded, so an interrupted upload can resume
+func ListUploadedParts(w http.ResponseWriter, r *http.Request) {
+	request, objectName, ok := decodeMultipartRequest(w, r)
+	if !ok {
+		return
+	}
+
+	core := minio.Core{Client: minioClient}
+	parts := []map[string]interface{}{}
+	marker := 0
+	for {
+		result, err := core.ListObjectParts(context.Background(), minioBucket, objectName, request.UploadID, marker, 1000)
+		if err != nil {
+			http.Error(w, fmt.Sprintf("Failed to list uploaded parts: %v", err), http.StatusNotFound)
+			return
+		}
+		for _, part := range result.ObjectParts {
+			parts = append(parts, map[string]interface{}{
+				"partNumber": part.PartNumber,
+				"etag":       part.ETag,
+				"size":       part.Size,
+			})
+		}
+		if !result.IsTruncated {
+			break
+		}
+		marker = result.NextPartNumberMarker
+	}
+
+	writeJSON(w, map[string]interface{}{"parts": parts})
+}
+
+// Complete a multipart upload from the uploaded part ETags
+func CompleteMultipartUpload(w http.ResponseWriter, r *http.Request) {
+	request, objectName, ok := decodeMultipartRequest(w, r)
+	if !ok {
+		return
+	}
+
+	core := minio.Core{Client: minioClient}
+	_, err := core.CompleteMultipartUpload(context.Background(), minioBucket, objectName, request.UploadID, request.Parts, minio.PutObjectOptions{})
+	if err != nil {
+		http.Error(w, fmt.Sprintf("Failed to complete multipart upload: %v", err), http.StatusInternalServerError)
+		return
+	}
+
+	writeJSON(w, map[string]string{"objectPath": objectName})
+}
+
 // Handle per-bank model weight downloads
 func DownloadModel(w http.ResponseWriter, r *http.Request) {
 	var request struct {
@@ -159,6 +277,10 @@ func main() {
 
 	// Register endpoints
 	router.HandleFunc("/upload", UploadModel)
+	router.HandleFunc("/upload/multipart/start", StartMultipartUpload)
+	router.HandleFunc("/upload/multipart/part", PresignUploadPart)
+	router.HandleFunc("/upload/multipart/parts", ListUploadedParts)
+	router.HandleFunc("/upload/multipart/complete", CompleteMultipartUpload)
 	router.HandleFunc("/download", DownloadModel)
 	router.HandleFunc("/download-global", DownloadGlobalModel) // New route
 